@@ -1,8 +1,10 @@
 # backend/app/main.py
+import asyncio
 import logging
 import os
 import time
 import uuid
+from contextlib import asynccontextmanager
 
 import httpx
 
@@ -14,19 +16,46 @@ setup_logging()
 from fastapi import Depends, FastAPI, Request
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from app.routers import recipes, pantry, shopping, vision, donation, profile
 from app.routers.barcode import router as barcode_router
-from app.services.auth import get_current_user, limiter
+from app.services import http_clients, metrics
+from app.services.auth import get_current_user, limiter, request_state_var
+from app.services.circuit_breaker import circuit_states
+from app.services.disconnect import CancelOnDisconnect
+from app.services.openai_client import OPENAI_MODELS_URL
 
 logger = logging.getLogger("app.request")
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Pooled outbound clients live for the whole process: built + pre-warmed
+    # before the first request, closed on shutdown.
+    await http_clients.startup()
+    # With several workers, each publishes its metrics snapshot for the others' scrapes.
+    flusher = asyncio.create_task(metrics.flush_periodically()) if metrics.MULTIPROC_DIR else None
+    recipes.recipes_generated_counter.start()
+    try:
+        yield
+    finally:
+        if flusher is not None:
+            flusher.cancel()
+        # Queued recipe jobs fail with 503 rather than hang their pollers.
+        await recipes.recipe_jobs.shutdown()
+        # After the jobs: they may still have added to it.
+        await recipes.recipes_generated_counter.close()
+        metrics.write_snapshot()
+        await http_clients.shutdown()
+
+
 app = FastAPI(
     title="GroceryGenius API",
     description="AI-powered grocery assistant API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Per-user rate limiting (slowapi) — limits are declared on the AI routes
@@ -59,21 +88,31 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
 async def request_context(request: Request, call_next):
     request_id = str(uuid.uuid4())
     token = request_id_var.set(request_id)
+    state_token = request_state_var.set(request.state)
     start = time.perf_counter()
     status_code = 500
+    metrics.http_requests_in_flight.inc(method=request.method)
     try:
         response = await call_next(request)
         status_code = response.status_code
         response.headers["X-Request-ID"] = request_id
         return response
     finally:
-        duration_ms = (time.perf_counter() - start) * 1000
+        seconds = time.perf_counter() - start
+        duration_ms = seconds * 1000
+        metrics.http_requests_in_flight.dec(method=request.method)
+        # The matched route's template, set by routing; raw paths would explode cardinality.
+        route = request.scope.get("route")
+        metrics.http_request_duration.observe(
+            seconds, method=request.method, route=getattr(route, "path", "unmatched"), status=status_code,
+        )
         # user_id is stashed on request.state by get_current_user
         user_id = getattr(request.state, "user_id", None) or "-"
         logger.info(
             "%s %s status=%s duration_ms=%.0f user=%s",
             request.method, request.url.path, status_code, duration_ms, user_id,
         )
+        request_state_var.reset(state_token)
         request_id_var.reset(token)
 
 
@@ -98,9 +137,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["X-Request-ID"],
+    expose_headers=["X-Request-ID", "X-Cache"],
 )
 
+# Outermost: a client that disconnects mid-generation stops the OpenAI wait
+# (see services/disconnect.py).
+app.add_middleware(CancelOnDisconnect)
+
 # Include routers
 app.include_router(recipes.router, prefix="/recipes", tags=["recipes"], dependencies=auth_required)
 app.include_router(pantry.router, prefix="/pantry", tags=["pantry"], dependencies=auth_required)
@@ -114,25 +157,35 @@ app.include_router(profile.router, prefix="/profile", tags=["profile"])
 # monitors poll this frequently, so every check here must be cheap and side-effect-free.
 HEALTH_CHECK_TIMEOUT = httpx.Timeout(3.0)
 
+# The probes run in the threadpool (health is a sync route), so they share
+# small pooled sync clients. keepalive_expiry outlasts a typical monitor
+# interval, so most polls reuse the previous poll's connection.
+_HEALTH_LIMITS = httpx.Limits(max_connections=4, max_keepalive_connections=2, keepalive_expiry=300.0)
+http_clients.register_upstream("supabase_health", http_clients.UpstreamConfig(
+    timeout=HEALTH_CHECK_TIMEOUT, limits=_HEALTH_LIMITS, sync=True,
+))
+http_clients.register_upstream("openai_health", http_clients.UpstreamConfig(
+    timeout=HEALTH_CHECK_TIMEOUT, limits=_HEALTH_LIMITS, sync=True,
+))
+
 
 def _check_supabase() -> str:
     """
     Lightweight Supabase reachability probe: hit the PostgREST base with the anon
     apikey. Not a full auth round-trip (no token validation) and read-only.
 
-    Per the CLAUDE.md gotcha, no client is created at import time — the HTTP client
-    is created here, per call. Returns "ok" or "error"; never raises.
+    Per the CLAUDE.md gotcha, no client is created at import time — the pooled
+    HTTP client is built lazily by http_clients. Returns "ok" or "error"; never raises.
     """
     supabase_url = os.getenv("SUPABASE_URL", "")
     supabase_anon_key = os.getenv("SUPABASE_ANON_KEY", "")
     if not supabase_url or not supabase_anon_key:
         return "error"
     try:
-        with httpx.Client(timeout=HEALTH_CHECK_TIMEOUT) as client:
-            resp = client.get(
-                f"{supabase_url.rstrip('/')}/rest/v1/",
-                headers={"apikey": supabase_anon_key},
-            )
+        resp = http_clients.get_sync_client("supabase_health").get(
+            f"{supabase_url.rstrip('/')}/rest/v1/",
+            headers={"apikey": supabase_anon_key},
+        )
         # PostgREST answers the base path with 2xx/3xx/4xx once it's reachable;
         # a 5xx means the backing service is unhealthy.
         return "ok" if resp.status_code < 500 else "error"
@@ -151,11 +204,10 @@ def _check_openai() -> str:
     if not api_key:
         return "error"
     try:
-        with httpx.Client(timeout=HEALTH_CHECK_TIMEOUT) as client:
-            resp = client.get(
-                "https://api.openai.com/v1/models",
-                headers={"Authorization": f"Bearer {api_key}"},
-            )
+        resp = http_clients.get_sync_client("openai_health").get(
+            OPENAI_MODELS_URL,
+            headers={"Authorization": f"Bearer {api_key}"},
+        )
         return "ok" if resp.status_code < 500 else "error"
     except Exception:
         logger.warning("health check: openai unreachable", exc_info=False)
@@ -169,7 +221,8 @@ def health():
 
     Reports app liveness plus downstream dependency reachability. A failing
     dependency is reported as "error" in the body but never 500s the endpoint,
-    so uptime monitors keep getting a parseable response.
+    so uptime monitors keep getting a parseable response. `circuits` reports
+    each upstream circuit breaker as closed / open / half_open.
     """
     # Each sub-check is defensively wrapped: even an unexpected error in a helper
     # is reported as "error" rather than failing the whole endpoint.
@@ -191,4 +244,21 @@ def health():
             # TODO: Redis check once tasks 7/8 land
             "redis": "not_configured",
         },
+        "circuits": circuit_states(),
     }
+
+
+# Optional bearer token for scrapers; unset leaves /metrics open like /health.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics_endpoint(request: Request):
+    """
+    Prometheus text exposition: HTTP latency by route/status, in-flight gauges,
+    OpenAI latency by route/model, token and estimated-USD counters. Merged
+    across uvicorn workers when METRICS_MULTIPROC_DIR is set (see metrics.py).
+    """
+    if METRICS_TOKEN and request.headers.get("Authorization") != f"Bearer {METRICS_TOKEN}":
+        return JSONResponse(status_code=401, content={"detail": "Invalid metrics token"})
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
@@ -4,14 +4,15 @@ from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel, Field
 import binascii
 import logging
-import os
-import time
 import base64
 import json
 import httpx
-from openai import OpenAI
 from app.services.auth import limiter, AI_LIGHT_LIMIT
-from app.services.openai_client import log_openai_usage
+from app.services.adaptive_limiter import LimiterTimeout, limiter_timeout_http_error
+from app.services.circuit_breaker import CircuitOpenError, circuit_open_http_error, get_breaker
+from app.services.http_clients import UpstreamConfig, get_async_client, register_upstream
+from app.services.openai_client import call_chat_messages
+from app.services.token_budget import TokenBudgetExceeded, token_budget_http_error
 from app.services.upload_validation import validate_image_bytes
 
 try:
@@ -27,9 +28,14 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+OFF_PRODUCT_URL = "https://world.openfoodfacts.org/api/v2/product/{barcode}.json"
 
-def _openai_client() -> OpenAI:
-    return OpenAI(api_key=os.getenv("OPENAI_API_KEY"), timeout=90.0, max_retries=2)
+register_upstream("openfoodfacts", UpstreamConfig(
+    timeout=httpx.Timeout(5.0),
+    limits=httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60.0),
+    warm_url="https://world.openfoodfacts.org/",
+))
+get_breaker("openfoodfacts")
 
 
 class BarcodeImageRequest(BaseModel):
@@ -69,10 +75,8 @@ def _map_off_category(categories_tags: list) -> str:
     return "other"
 
 
-async def _ai_clean_name(barcode: str, raw_name: str = None, route: str = "barcode._ai_clean_name") -> dict:
+async def _ai_clean_name(barcode: str, raw_name: str = None) -> dict:
     """Use GPT-4o to identify or clean a product name from a barcode number."""
-    client = _openai_client()
-
     if raw_name:
         user_msg = (
             f"Barcode: {barcode}\n"
@@ -82,8 +86,7 @@ async def _ai_clean_name(barcode: str, raw_name: str = None, route: str = "barco
     else:
         user_msg = f"Barcode: {barcode}\n\nWhat grocery product is this?"
 
-    start = time.perf_counter()
-    response = client.chat.completions.create(
+    content = await call_chat_messages(
         model="gpt-4o",
         messages=[
             {
@@ -108,13 +111,14 @@ async def _ai_clean_name(barcode: str, raw_name: str = None, route: str = "barco
         response_format={"type": "json_object"},
         temperature=0.1,
         max_tokens=100,
+        # Its own label (not the calling route's): the hedging p95 and token
+        # sizing for this short call mustn't mix with the gpt-4o digit read.
+        route="barcode.ai_clean_name",
     )
-    log_openai_usage(response.model, (time.perf_counter() - start) * 1000, response.usage, route=route)
-
-    return json.loads(response.choices[0].message.content)
+    return json.loads(content)
 
 
-async def _lookup_product_by_number(barcode: str, route: str = "barcode._lookup_product_by_number") -> dict:
+async def _lookup_product_by_number(barcode: str) -> dict:
     """
     Look up a product by its barcode number.
     1. Try Open Food Facts (free, no key, huge food database)
@@ -125,10 +129,13 @@ async def _lookup_product_by_number(barcode: str, route: str = "barcode._lookup_
         resp = None
         for attempt in range(2):  # one retry
             try:
-                async with httpx.AsyncClient(timeout=5.0) as client:
-                    resp = await client.get(
-                        f"https://world.openfoodfacts.org/api/v2/product/{barcode}.json"
-                    )
+                # An open circuit raises CircuitOpenError here, which skips
+                # straight to the GPT-4o fallback below.
+                with get_breaker("openfoodfacts").guard():
+                    client = get_async_client("openfoodfacts")
+                    resp = await client.get(OFF_PRODUCT_URL.format(barcode=barcode))
+                    if resp.status_code >= 500:
+                        resp.raise_for_status()  # counts against the breaker
                 break
             except (httpx.ConnectError, httpx.TimeoutException) as exc:
                 if attempt == 1:
@@ -144,10 +151,20 @@ async def _lookup_product_by_number(barcode: str, route: str = "barcode._lookup_
                     or product.get("generic_name")
                 )
                 if raw_name and raw_name.strip():
-                    ai = await _ai_clean_name(barcode, raw_name, route=route)
-                    category = ai.get("category") or _map_off_category(
-                        product.get("categories_tags") or []
-                    )
+                    off_category = _map_off_category(product.get("categories_tags") or [])
+                    try:
+                        ai = await _ai_clean_name(barcode, raw_name)
+                    except Exception as e:
+                        # Circuit open, budget spent, ...: the OFF match is
+                        # still good, just not cleaned up.
+                        logger.warning("Product name cleaning failed, using OFF name: %s", e)
+                        return {
+                            "barcode": barcode,
+                            "name": raw_name.strip(),
+                            "category": off_category,
+                            "confidence": "medium",
+                        }
+                    category = ai.get("category") or off_category
                     clean = ai.get("name") or raw_name
                     logger.debug("OFF match: '%s' -> '%s'", raw_name, clean)
                     return {
@@ -161,7 +178,7 @@ async def _lookup_product_by_number(barcode: str, route: str = "barcode._lookup_
 
     # --- GPT-4o fallback ---
     try:
-        ai = await _ai_clean_name(barcode, route=route)
+        ai = await _ai_clean_name(barcode)
         logger.debug("GPT-4o identified: '%s' (confidence: %s)", ai.get("name"), ai.get("confidence"))
         return {
             "barcode": barcode,
@@ -224,9 +241,7 @@ async def vision_barcode_lookup(request: Request, payload: BarcodeImageRequest):
 
         # --- Stage 1b: GPT-4o vision — read digits only, not identify product ---
         if not barcode_number:
-            client = _openai_client()
-            start = time.perf_counter()
-            vision_resp = client.chat.completions.create(
+            raw = await call_chat_messages(
                 model="gpt-4o",
                 messages=[
                     {
@@ -253,9 +268,8 @@ async def vision_barcode_lookup(request: Request, payload: BarcodeImageRequest):
                 ],
                 max_tokens=30,
                 temperature=0,
+                route="barcode.vision_barcode_lookup",
             )
-            log_openai_usage(vision_resp.model, (time.perf_counter() - start) * 1000, vision_resp.usage, route="barcode.vision_barcode_lookup")
-            raw = vision_resp.choices[0].message.content.strip()
             digits_only = "".join(c for c in raw if c.isdigit())
             if len(digits_only) >= 8:
                 barcode_number = digits_only
@@ -273,12 +287,18 @@ async def vision_barcode_lookup(request: Request, payload: BarcodeImageRequest):
             }
 
         # --- Stage 2: Look up product by the decoded number ---
-        result = await _lookup_product_by_number(barcode_number, route="barcode.vision_barcode_lookup")
+        result = await _lookup_product_by_number(barcode_number)
         result["source"] = "vision"
         return result
 
     except HTTPException:
         raise
+    except CircuitOpenError as e:
+        raise circuit_open_http_error(e)
+    except LimiterTimeout as e:
+        raise limiter_timeout_http_error(e)
+    except TokenBudgetExceeded as e:
+        raise token_budget_http_error(e)
     except Exception as e:
         logger.error("Vision barcode lookup error", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Vision lookup failed: {str(e)}")
@@ -289,7 +309,7 @@ async def vision_barcode_lookup(request: Request, payload: BarcodeImageRequest):
 async def ai_barcode_lookup(request: Request, payload: BarcodeRequest):
     """Look up a product by its barcode number (Open Food Facts → GPT-4o)."""
     try:
-        result = await _lookup_product_by_number(payload.barcode, route="barcode.ai_barcode_lookup")
+        result = await _lookup_product_by_number(payload.barcode)
         result["source"] = "ai"
         return result
     except Exception as e:
@@ -6,7 +6,10 @@ from pydantic import BaseModel, Field
 import logging
 import json
 from app.services.auth import limiter, AI_LIGHT_LIMIT
+from app.services.adaptive_limiter import LimiterTimeout, limiter_timeout_http_error
+from app.services.circuit_breaker import CircuitOpenError, circuit_open_http_error
 from app.services.openai_client import call_chat_completion
+from app.services.token_budget import TokenBudgetExceeded, token_budget_http_error
 from app.services.ingredient_parsing import clean_ingredient_lines, strip_json_code_fences
 
 logger = logging.getLogger(__name__)
@@ -64,9 +67,15 @@ async def match_ingredients(request: Request, payload: MatchIngredientsRequest):
     user_prompt = f"Recipe ingredients:\n{ingredients_text}\n\nPantry items:\n{pantry_text}"
 
     try:
-        raw = await call_chat_completion(system_prompt, user_prompt, max_tokens=2000, temperature=0.1, route="pantry.match_ingredients")
+        raw = await call_chat_completion(system_prompt, user_prompt, max_tokens=2000, temperature=0.1, route="pantry.match_ingredients", size_hint=len(lines))
         raw = strip_json_code_fences(raw)
         return json.loads(raw)
+    except CircuitOpenError as e:
+        raise circuit_open_http_error(e)
+    except LimiterTimeout as e:
+        raise limiter_timeout_http_error(e)
+    except TokenBudgetExceeded as e:
+        raise token_budget_http_error(e)
     except Exception:
         logger.error("match-ingredients error", exc_info=True)
         raise HTTPException(status_code=500, detail="Failed to match ingredients")
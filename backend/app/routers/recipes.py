@@ -1,16 +1,27 @@
 ﻿# backend/app/routers/recipes.py
+import asyncio
 import json
 import logging
 import os
-from fastapi import APIRouter, BackgroundTasks, HTTPException, Query, Request
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
 from typing_extensions import Annotated
 from pydantic import BaseModel, Field, field_validator
 from supabase import create_client
-from app.services.auth import limiter, AI_HEAVY_LIMIT, AI_LIGHT_LIMIT
-from app.services.openai_client import call_chat_completion
-from app.services.recipe_parser import parse_recipes_text
-from app.services.ingredient_parsing import clean_ingredient_lines, strip_json_code_fences
+from app.services.batched_counter import BatchedCounter
+from app.services.auth import current_user_id, limiter, AI_HEAVY_LIMIT, AI_LIGHT_LIMIT
+from app.services.adaptive_limiter import LimiterTimeout, limiter_timeout_http_error
+from app.services.circuit_breaker import CircuitOpenError, circuit_open_http_error
+from app.services.job_queue import JobQueue, JobQueueFull, job_queue_full_http_error
+from app.services import recipe_cache, recipe_similarity, translation_memory
+from app.services.openai_client import call_chat_completion, call_chat_messages, stream_chat_completion
+from app.services.token_budget import TokenBudgetExceeded, token_budget_http_error
+from app.services.recipe_parser import IncrementalRecipeParser, parse_recipes_text
+from app.services.ingredient_parsing import (
+    INGREDIENT_PARSE_MIN_CONFIDENCE, clean_ingredient_lines, merge_parsed_ingredients, parse_ingredient_line,
+    strip_json_code_fences,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -20,19 +31,42 @@ SUPABASE_URL = os.getenv("SUPABASE_URL", "")
 SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY", "")
 
 
-def _increment_recipes_generated(n: int) -> None:
-    """Best-effort bump of the app-wide `recipes_generated` counter
-    (public.app_stats). Runs as a background task after the response is sent,
-    with the service role — the increment_recipes_generated RPC is restricted to
-    service_role so clients can't inflate the number. Never raises: an
-    impact-metric write must not affect the user's recipe request."""
+RECIPES_COUNTER_FLUSH_SECONDS = float(os.getenv("RECIPES_COUNTER_FLUSH_SECONDS", "30"))
+RECIPES_COUNTER_FLUSH_THRESHOLD = int(os.getenv("RECIPES_COUNTER_FLUSH_THRESHOLD", "100"))
+RECIPES_COUNTER_MAX_BACKOFF_SECONDS = 600.0
+_service_client = None
+
+
+def _write_recipes_generated(n: int) -> None:
+    """Add `n` to the app-wide `recipes_generated` counter (public.app_stats)
+    with the service role — the increment_recipes_generated RPC is restricted
+    to service_role so clients can't inflate the number. One client is built
+    on first use and reused. Raises on failure so the batch is retried; a
+    no-op without service credentials."""
+    global _service_client
     if n <= 0 or not SUPABASE_URL or not SUPABASE_SERVICE_KEY:
         return
-    try:
-        sb = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
-        sb.rpc("increment_recipes_generated", {"n": n}).execute()
-    except Exception:
-        logger.warning("failed to increment recipes_generated counter", exc_info=True)
+    if _service_client is None:
+        _service_client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
+    _service_client.rpc("increment_recipes_generated", {"n": n}).execute()
+
+
+# Generations add to this in memory; it writes the sum every
+# RECIPES_COUNTER_FLUSH_SECONDS (or RECIPES_COUNTER_FLUSH_THRESHOLD recipes),
+# and on shutdown. Started and closed by the app lifespan.
+recipes_generated_counter = BatchedCounter(
+    "recipes_generated", _write_recipes_generated,
+    interval=RECIPES_COUNTER_FLUSH_SECONDS, threshold=RECIPES_COUNTER_FLUSH_THRESHOLD,
+    max_backoff=RECIPES_COUNTER_MAX_BACKOFF_SECONDS,
+)
+
+
+def _increment_recipes_generated(n: int) -> None:
+    """Best-effort bump of the app-wide `recipes_generated` counter. Only
+    adds to recipes_generated_counter, so it's cheap enough to call inline,
+    and never raises: an impact-metric write must not affect the user's
+    recipe request."""
+    recipes_generated_counter.add(n)
 
 class Ingredients(BaseModel):
     # 30 was an outlier vs. every other list-of-strings field in this codebase
@@ -49,29 +83,20 @@ LANGUAGE_NAMES = {
     "de": "German", "zh": "Chinese", "ja": "Japanese",
 }
 
-# Registered at BOTH "" (/recipes) and "/" (/recipes/) so that neither path
-# 307-redirects to the other. Starlette's redirect_slashes would otherwise send
-# /recipes -> /recipes/, and browsers drop the Authorization header when
-# following that redirect, so the retried request arrives tokenless and 401s.
-# That broke recipe generation for clients posting to /recipes (see the
-# trailing-slash comment in frontend RecipeSection.tsx). The frontend now
-# requests the canonical path, but this alias is what rescues clients still
-# running an older cached bundle — they keep posting to /recipes and, without
-# it, would stay broken until their bundle updated. This is the only
-# collection-root route in the API; every other route has a named sub-path and
-# so never redirects.
-@router.post("", include_in_schema=False, response_model=List[dict])
-@router.post("/", response_model=List[dict])
-@limiter.limit(AI_HEAVY_LIMIT)
-async def generate_recipes(request: Request, payload: Ingredients, background_tasks: BackgroundTasks, dietary: Optional[str] = Query(None), language: Optional[str] = Query(None), difficulty: Optional[str] = Query(None)):
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+NO_INGREDIENTS_RECIPE = {"name": "No ingredients provided", "instructions": "Please provide at least one ingredient."}
+
+
+def _resolve_recipe_request(payload: Ingredients, language: Optional[str]):
+    """(specific_recipe, ingredient_list, lang_name), or None without ingredients."""
     ingredients = [i.strip() for i in payload.ingredients if i.strip()]
     if not ingredients:
-        return [{"name": "No ingredients provided", "instructions": "Please provide at least one ingredient."}]
+        return None
 
     # Check if first ingredient is a specific recipe request (longer text)
     specific_recipe = None
     ingredient_list = ingredients
-    
+
     if len(ingredients) > 0 and len(ingredients[0].split()) > 3:
         specific_recipe = ingredients[0]
         ingredient_list = ingredients[1:] if len(ingredients) > 1 else []
@@ -79,7 +104,11 @@ async def generate_recipes(request: Request, payload: Ingredients, background_ta
     # Resolve language name for the prompt
     lang_code = (language or "en").split("-")[0].lower()
     lang_name = LANGUAGE_NAMES.get(lang_code, "English")
+    return specific_recipe, ingredient_list, lang_name
+
 
+def _recipe_prompts(specific_recipe: Optional[str], ingredient_list: List[str], strict: bool, dietary: Optional[str], lang_name: str, difficulty: Optional[str]):
+    """(system_prompt, user_prompt) for a recipe generation request."""
     # Enhanced system message for health and budget focus
     difficulty_requirement = f"\nIMPORTANT: ALL 3 recipes MUST be {difficulty.capitalize()} difficulty. Set the \"difficulty\" field to \"{difficulty.capitalize()}\" for every recipe." if difficulty else ""
     system_prompt = f"""You are a professional nutritionist and chef assistant. You create detailed recipes with exact measurements and nutritional information.
@@ -99,12 +128,12 @@ Output structured JSON format for easy parsing."""
     if specific_recipe:
         recipe_request = f"Create a recipe for: {specific_recipe}"
         if ingredient_list:
-            if payload.strict:
+            if strict:
                 recipe_request += f"\nUse ONLY these exact ingredients (no substitutions or additions): {', '.join(ingredient_list)}"
             else:
                 recipe_request += f"\nIncorporate these ingredients when possible: {', '.join(ingredient_list)}"
     else:
-        if payload.strict:
+        if strict:
             recipe_request = f"Using ONLY these exact ingredients (no substitutions, additions, or extra pantry staples): {', '.join(ingredient_list)}"
         else:
             recipe_request = f"Using these ingredients: {', '.join(ingredient_list)}"
@@ -145,40 +174,271 @@ CRITICAL: Return ONLY a valid JSON array with this exact structure:
   {{second recipe}},
   {{third recipe}}
 ]"""
+    return system_prompt, user_prompt
+
+
+def _placeholder_recipe(number: int) -> dict:
+    """Stands in for a recipe the model didn't deliver, so clients always get 3."""
+    return {
+        "name": f"Recipe {number}",
+        "ingredients": "See instructions for ingredients",
+        "instructions": "Recipe generation incomplete. Please try again.",
+        "prep_time": "15 min",
+        "cook_time": "20 min",
+        "difficulty": "Easy",
+        "servings": 2,
+        "nutrition": {"calories": 300, "protein": 15, "carbs": 35, "fat": 8, "fiber": 5, "sodium": 400},
+        "health_benefits": "Nutritious meal",
+        "budget_tip": "Use seasonal ingredients"
+    }
+
+
+# Registered at BOTH "" (/recipes) and "/" (/recipes/) so that neither path
+# 307-redirects to the other. Starlette's redirect_slashes would otherwise send
+# /recipes -> /recipes/, and browsers drop the Authorization header when
+# following that redirect, so the retried request arrives tokenless and 401s.
+# That broke recipe generation for clients posting to /recipes (see the
+# trailing-slash comment in frontend RecipeSection.tsx). The frontend now
+# requests the canonical path, but this alias is what rescues clients still
+# running an older cached bundle — they keep posting to /recipes and, without
+# it, would stay broken until their bundle updated. This is the only
+# collection-root route in the API; every other route has a named sub-path and
+# so never redirects.
+@router.post("", include_in_schema=False, response_model=List[dict])
+@router.post("/", response_model=List[dict])
+@limiter.limit(AI_HEAVY_LIMIT)
+async def generate_recipes(request: Request, response: Response, payload: Ingredients, dietary: Optional[str] = Query(None), language: Optional[str] = Query(None), difficulty: Optional[str] = Query(None), similar: bool = Query(False)):
+    resolved = _resolve_recipe_request(payload, language)
+    if resolved is None:
+        return [NO_INGREDIENTS_RECIPE]
+    recipes, cache_status, generated = await _generate_recipe_set(resolved, payload.strict, dietary, difficulty, similar)
+    response.headers["X-Cache"] = cache_status
+    # Count the real recipes generated toward the app-wide recipes_generated
+    # impact counter.
+    if generated is not None:
+        _increment_recipes_generated(generated)
+    return recipes
+
+
+async def _generate_recipe_set(resolved, strict: bool, dietary: Optional[str], difficulty: Optional[str], similar: bool):
+    """(recipes, X-Cache value, real recipes generated or None on a cache hit)
+    for a resolved POST /recipes/ request. Raises HTTPException."""
+    specific_recipe, ingredient_list, lang_name = resolved
+
+    # Popular pantries repeat constantly; serve a recent answer for the same
+    # canonical request (see recipe_cache.py). Hits don't bump the impact
+    # counter — nothing new was generated.
+    cache_key = recipe_cache.recipe_cache_key(specific_recipe, ingredient_list, strict, dietary, lang_name, difficulty)
+    cached = await recipe_cache.lookup(cache_key)
+    if cached is not None:
+        return cached, "HIT", None
+    # ?similar=true: a cached answer for a pantry that differs by a staple or
+    # two is good enough (see recipe_similarity.py).
+    if similar:
+        match = await recipe_similarity.find_similar(specific_recipe, ingredient_list, strict, dietary, lang_name, difficulty)
+        if match is not None:
+            return match[0], "SIMILAR", None
+
+    system_prompt, user_prompt = _recipe_prompts(specific_recipe, ingredient_list, strict, dietary, lang_name, difficulty)
 
     try:
         raw = await call_chat_completion(system_prompt, user_prompt, max_tokens=4000, temperature=0.7, route="recipes.generate_recipes")
         recipes = parse_recipes_text(raw, expected=3)
 
-        # Count the real recipes parsed (before any placeholder padding below)
-        # toward the app-wide recipes_generated impact counter. Fires after the
-        # response is sent, so it adds no latency.
+        # Real recipes parsed, before any placeholder padding below.
         real_recipe_count = min(len(recipes), 3)
-        background_tasks.add_task(_increment_recipes_generated, real_recipe_count)
+        if real_recipe_count == 3:
+            await recipe_cache.store(cache_key, recipes[:3])
+            recipe_similarity.remember(cache_key, specific_recipe, ingredient_list, strict, dietary, lang_name, difficulty)
 
         # Ensure we have exactly 3 recipes
-        if len(recipes) < 3:
-            # Generate additional recipes if needed
-            while len(recipes) < 3:
-                recipes.append({
-                    "name": f"Recipe {len(recipes) + 1}",
-                    "ingredients": "See instructions for ingredients",
-                    "instructions": "Recipe generation incomplete. Please try again.",
-                    "prep_time": "15 min",
-                    "cook_time": "20 min",
-                    "difficulty": "Easy",
-                    "servings": 2,
-                    "nutrition": {"calories": 300, "protein": 15, "carbs": 35, "fat": 8, "fiber": 5, "sodium": 400},
-                    "health_benefits": "Nutritious meal",
-                    "budget_tip": "Use seasonal ingredients"
-                })
-        
-        return recipes[:3]  # Return exactly 3 recipes
+        while len(recipes) < 3:
+            recipes.append(_placeholder_recipe(len(recipes) + 1))
+
+        return recipes[:3], "MISS", real_recipe_count  # Return exactly 3 recipes
+    except CircuitOpenError as e:
+        raise circuit_open_http_error(e)
+    except LimiterTimeout as e:
+        raise limiter_timeout_http_error(e)
+    except TokenBudgetExceeded as e:
+        raise token_budget_http_error(e)
     except Exception as e:
         logger.error("OpenAI call or parsing error", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Failed to generate recipes: {str(e)}")
 
 
+def _ndjson(event: dict) -> bytes:
+    return (json.dumps(event) + "\n").encode("utf-8")
+
+
+class _UpstreamStreamingResponse(StreamingResponse):
+    """StreamingResponse that closes the upstream stream once the response is
+    over, even when the client left (or sending failed) before the body was
+    first iterated and its own cleanup never ran. Closing twice is a no-op."""
+
+    def __init__(self, content, upstream, **kwargs):
+        super().__init__(content, **kwargs)
+        self.upstream = upstream
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.upstream.aclose()
+
+
+@router.post("/stream")
+@limiter.limit(AI_HEAVY_LIMIT)
+async def stream_recipes(request: Request, payload: Ingredients, dietary: Optional[str] = Query(None), language: Optional[str] = Query(None), difficulty: Optional[str] = Query(None)):
+    """
+    Streaming sibling of POST /recipes/ (same body and query parameters) that
+    sends each recipe as soon as its JSON object closes, instead of after the
+    whole ~4000-token generation. Newline-delimited JSON, one event per line:
+
+        {"type": "recipe", "index": 0, "recipe": {...}}
+        {"type": "done", "count": 3}
+        {"type": "error", "detail": "..."}   generation failed mid-stream
+
+    Recipes are normalized like parse_recipes_text's, and placeholders pad the
+    stream to 3 before "done" exactly as POST /recipes/ pads its list.
+    Failures before the first token (circuit open, token budget, upstream
+    errors) are ordinary HTTP errors, as on POST /recipes/.
+    """
+    resolved = _resolve_recipe_request(payload, language)
+    if resolved is None:
+        return StreamingResponse(
+            iter([_ndjson({"type": "recipe", "index": 0, "recipe": NO_INGREDIENTS_RECIPE}), _ndjson({"type": "done", "count": 1})]),
+            media_type=NDJSON_MEDIA_TYPE,
+        )
+    specific_recipe, ingredient_list, lang_name = resolved
+
+    cache_key = recipe_cache.recipe_cache_key(specific_recipe, ingredient_list, payload.strict, dietary, lang_name, difficulty)
+    cached = await recipe_cache.lookup(cache_key)
+    if cached is not None:
+        events = [_ndjson({"type": "recipe", "index": i, "recipe": r}) for i, r in enumerate(cached)]
+        events.append(_ndjson({"type": "done", "count": len(cached)}))
+        return StreamingResponse(iter(events), media_type=NDJSON_MEDIA_TYPE, headers={"X-Cache": "HIT"})
+
+    system_prompt, user_prompt = _recipe_prompts(specific_recipe, ingredient_list, payload.strict, dietary, lang_name, difficulty)
+    deltas = stream_chat_completion(system_prompt, user_prompt, max_tokens=4000, temperature=0.7, route="recipes.generate_recipes")
+    # Wait for the first token before committing to a 200, so that upstream
+    # failures still map to the same status codes as the non-streaming route.
+    try:
+        first = await anext(deltas, "")
+    except CircuitOpenError as e:
+        raise circuit_open_http_error(e)
+    except LimiterTimeout as e:
+        raise limiter_timeout_http_error(e)
+    except TokenBudgetExceeded as e:
+        raise token_budget_http_error(e)
+    except Exception as e:
+        logger.error("OpenAI streaming call error", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Failed to generate recipes: {str(e)}")
+
+    async def events():
+        parser = IncrementalRecipeParser(expected=3)
+        parts = []
+        recipes = []
+        delta = first
+        try:
+            while delta is not None:
+                parts.append(delta)
+                for recipe in parser.feed(delta):
+                    recipes.append(recipe)
+                    yield _ndjson({"type": "recipe", "index": len(recipes) - 1, "recipe": recipe})
+                delta = await anext(deltas, None)
+        except Exception as e:
+            logger.error("OpenAI streaming call error", exc_info=True)
+            yield _ndjson({"type": "error", "detail": f"Failed to generate recipes: {str(e)}"})
+            return
+        finally:
+            await deltas.aclose()
+
+        if not recipes:
+            # The model ignored the JSON format; the full parser's fallbacks
+            # still recover something from the finished text.
+            for recipe in parse_recipes_text("".join(parts), expected=3):
+                recipes.append(recipe)
+                yield _ndjson({"type": "recipe", "index": len(recipes) - 1, "recipe": recipe})
+
+        real_recipe_count = min(len(recipes), 3)
+        _increment_recipes_generated(real_recipe_count)
+        if real_recipe_count == 3:
+            await recipe_cache.store(cache_key, recipes[:3])
+            recipe_similarity.remember(cache_key, specific_recipe, ingredient_list, payload.strict, dietary, lang_name, difficulty)
+
+        while len(recipes) < 3:
+            recipes.append(_placeholder_recipe(len(recipes) + 1))
+            yield _ndjson({"type": "recipe", "index": len(recipes) - 1, "recipe": recipes[-1]})
+        yield _ndjson({"type": "done", "count": len(recipes)})
+
+    return _UpstreamStreamingResponse(events(), deltas, media_type=NDJSON_MEDIA_TYPE, headers={"X-Cache": "MISS"})
+
+
+# Recipe generation as a job (services/job_queue.py): the result survives the
+# client dropping off, and is kept RECIPE_JOB_TTL_SECONDS for it to come back.
+RECIPE_JOB_WORKERS = int(os.getenv("RECIPE_JOB_WORKERS", "4"))
+RECIPE_JOB_MAX_QUEUED = int(os.getenv("RECIPE_JOB_MAX_QUEUED", "100"))
+RECIPE_JOB_TTL_SECONDS = float(os.getenv("RECIPE_JOB_TTL_SECONDS", "900"))
+RECIPE_JOB_MAX_WAIT_SECONDS = 30.0
+recipe_jobs = JobQueue("recipes", RECIPE_JOB_WORKERS, RECIPE_JOB_MAX_QUEUED, RECIPE_JOB_TTL_SECONDS)
+
+
+@router.post("/jobs", status_code=202)
+@limiter.limit(AI_HEAVY_LIMIT)
+async def submit_recipe_job(request: Request, response: Response, payload: Ingredients, dietary: Optional[str] = Query(None), language: Optional[str] = Query(None), difficulty: Optional[str] = Query(None), similar: bool = Query(False)):
+    """
+    Queue a POST /recipes/ generation (same body and query parameters) and
+    return its job right away: 202 {"job_id": ..., "status": "queued", ...}.
+    Poll GET /recipes/jobs/{job_id} for the result.
+
+    Submitting a request identical to one of your own unexpired jobs returns
+    that job (200) instead of generating again, so a client that lost track
+    of its job id doesn't pay twice. 503 with Retry-After when the queue is full.
+    """
+    resolved = _resolve_recipe_request(payload, language)
+    if resolved is None:
+        key = None
+    else:
+        specific_recipe, ingredient_list, lang_name = resolved
+        key = (recipe_cache.recipe_cache_key(specific_recipe, ingredient_list, payload.strict, dietary, lang_name, difficulty), similar)
+
+    async def run():
+        if resolved is None:
+            return [NO_INGREDIENTS_RECIPE]
+        recipes, _, generated = await _generate_recipe_set(resolved, payload.strict, dietary, difficulty, similar)
+        if generated is not None:
+            _increment_recipes_generated(generated)
+        return recipes
+
+    try:
+        job, created = recipe_jobs.submit(current_user_id(), key, run)
+    except JobQueueFull as e:
+        raise job_queue_full_http_error(e)
+    if not created:
+        response.status_code = 200
+    response.headers["Location"] = f"/recipes/jobs/{job.id}"
+    return job.to_dict()
+
+
+@router.get("/jobs/{job_id}")
+async def get_recipe_job(job_id: str, wait: float = Query(0, ge=0, le=RECIPE_JOB_MAX_WAIT_SECONDS)):
+    """
+    A recipe job: {"job_id", "status": queued|running|succeeded|failed,
+    "created_at", "finished_at", "result" (succeeded) or "error" (failed:
+    {"status_code", "detail"}, what POST /recipes/ would have answered)}.
+
+    `wait` long-polls: hold the request up to that many seconds for the job
+    to finish instead of returning its current state. 404 for unknown,
+    expired or other users' jobs.
+    """
+    job = recipe_jobs.get(job_id, current_user_id())
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    await recipe_jobs.wait(job, wait)
+    return job.to_dict()
+
+
 class TranslateNamesRequest(BaseModel):
     names: List[Annotated[str, Field(max_length=200)]] = Field(max_length=50)
     language: str = Field(min_length=1, max_length=10)
@@ -186,17 +446,25 @@ class TranslateNamesRequest(BaseModel):
 @router.post("/translate-names", response_model=List[str])
 @limiter.limit(AI_LIGHT_LIMIT)
 async def translate_recipe_names(request: Request, payload: TranslateNamesRequest):
-    """Translate a list of recipe names to the target language using OpenAI."""
+    """
+    Translate a list of recipe names to the target language using OpenAI.
+    Names already in the translation memory aren't sent again.
+    """
     if not payload.names:
         return []
     lang_code = payload.language.split("-")[0].lower()
     lang_name = LANGUAGE_NAMES.get(lang_code, "English")
 
-    names_list = "\n".join(f"{i+1}. {name}" for i, name in enumerate(payload.names))
+    known = await translation_memory.lookup_many(payload.names, lang_name)
+    missing = [name for name in dict.fromkeys(payload.names) if name not in known]
+    if not missing:
+        return [known[name] for name in payload.names]
+
+    names_list = "\n".join(f"{i+1}. {name}" for i, name in enumerate(missing))
     system = f"You are a translator. Translate recipe names to {lang_name}. Keep them as proper recipe names (not literal translations if that sounds unnatural). Return ONLY a numbered list in the same order, one name per line, with no extra text."
     user = f"Translate these recipe names to {lang_name}:\n{names_list}"
     try:
-        raw = await call_chat_completion(system, user, max_tokens=500, temperature=0.3, route="recipes.translate_recipe_names")
+        raw = await call_chat_completion(system, user, max_tokens=500, temperature=0.3, route="recipes.translate_recipe_names", size_hint=len(missing))
         lines = [l.strip() for l in raw.strip().splitlines() if l.strip()]
         # Strip numbering from lines like "1. Nombre"
         translated = []
@@ -204,13 +472,15 @@ async def translate_recipe_names(request: Request, payload: TranslateNamesReques
             clean = line.lstrip("0123456789. ").strip()
             if clean:
                 translated.append(clean)
-        # Pad with originals if count mismatch
-        while len(translated) < len(payload.names):
-            translated.append(payload.names[len(translated)])
-        return translated[:len(payload.names)]
+        fresh = dict(zip(missing, translated))
+        # A count mismatch means the lines may not line up with the names;
+        # use them (padded with originals) but don't remember them.
+        if len(translated) == len(missing):
+            await translation_memory.store_many(fresh, lang_name)
+        return [known.get(name) or fresh.get(name) or name for name in payload.names]
     except Exception:
         logger.error("Translation error", exc_info=True)
-        return payload.names
+        return [known.get(name, name) for name in payload.names]
 
 
 class TranslateFullRecipesRequest(BaseModel):
@@ -229,44 +499,179 @@ class TranslateFullRecipesRequest(BaseModel):
                 raise ValueError("recipe object is too large")
         return recipes
 
+# Recipe fields translate-full sends for translation; everything else round-trips as-is.
+TRANSLATABLE_FIELDS = ("name", "ingredients", "instructions", "difficulty", "health_benefits", "budget_tip")
+# Per-request fan-out of the per-recipe calls. Each call also holds a slot in
+# the route's adaptive limiter, so this only caps one request's share.
+TRANSLATE_FULL_CONCURRENCY = 4
+# Requests whose fields total at most this many characters of JSON go out as
+# one packed call (0 disables packing). Bigger ones fan out, since a single long
+# completion would be slower than parallel short ones.
+TRANSLATE_FULL_PACKED_MAX_CHARS = int(os.getenv("TRANSLATE_FULL_PACKED_MAX_CHARS", "4000"))
+
+
+# Translated (and remembered) line by line, so a recipe sharing most of its
+# ingredient lines with earlier ones only sends the new lines.
+MULTILINE_FIELDS = ("ingredients", "instructions")
+
+
+def _translation_units(recipe: dict) -> dict:
+    """
+    The recipe's translatable text as {unit key: text}. A unit is a whole field
+    ("name") or one non-blank line of a multi-line field ("ingredients.3",
+    keyed by line number). Texts are stripped.
+    """
+    units = {}
+    for k, v in recipe.items():
+        if k not in TRANSLATABLE_FIELDS or not isinstance(v, str) or not v.strip():
+            continue
+        if k in MULTILINE_FIELDS:
+            for n, line in enumerate(v.split("\n")):
+                if line.strip():
+                    units[f"{k}.{n}"] = line.strip()
+        else:
+            units[k] = v.strip()
+    return units
+
+
+def _apply_translations(recipe: dict, translations: dict) -> dict:
+    """The recipe with each unit in `translations` replaced (inverse of _translation_units)."""
+    result = dict(recipe)
+    for k, v in recipe.items():
+        if k not in TRANSLATABLE_FIELDS or not isinstance(v, str):
+            continue
+        if k in MULTILINE_FIELDS:
+            lines = v.split("\n")
+            for n, line in enumerate(lines):
+                if f"{k}.{n}" in translations:
+                    indent = line[:len(line) - len(line.lstrip())]
+                    lines[n] = indent + translations[f"{k}.{n}"]
+            result[k] = "\n".join(lines)
+        elif k in translations:
+            result[k] = translations[k]
+    return result
+
+
+def _strip_json_fence(raw: str) -> str:
+    raw = raw.strip()
+    if raw.startswith("```"):
+        raw = raw.split("```")[1]
+        if raw.startswith("json"):
+            raw = raw[4:]
+    return raw
+
+
+async def _translate_fields(fields: dict, lang_name: str) -> dict:
+    """One recipe's fields, translated. Raises on any failure."""
+    system = (
+        f"You are a professional translator. Translate ONLY the provided JSON field values to {lang_name}. "
+        "Return ONLY valid JSON with exactly the same keys. Do not add or remove keys. "
+        "Preserve numbers, units, and formatting (newlines, numbering in steps)."
+    )
+    fields_json = json.dumps(fields, ensure_ascii=False)
+    user = f"Translate these recipe fields to {lang_name}:\n{fields_json}"
+    # Output is about as long as the input, so size by its length.
+    raw = await call_chat_completion(system, user, max_tokens=2000, temperature=0.3, route="recipes.translate_full_recipes", size_hint=len(fields_json))
+    translated = json.loads(_strip_json_fence(raw))
+    if not isinstance(translated, dict):
+        raise ValueError("translation is not a JSON object")
+    return translated
+
+
+async def _translate_fields_packed(fields_by_index: dict, lang_name: str) -> dict:
+    """
+    Several recipes' fields in one JSON-mode call, keyed by index. Returns
+    {index: translated fields} for the recipes that came back usable (only the
+    keys that were sent); the caller retries the rest one by one. Raises if the
+    call itself fails.
+    """
+    system = (
+        f"You are a professional translator. Translate ONLY the string values of every recipe in the provided JSON object to {lang_name}. "
+        "The object maps recipe indexes to objects of recipe fields. "
+        "Return ONLY a valid JSON object with exactly the same indexes and keys. Do not add or remove keys. "
+        "Preserve numbers, units, and formatting (newlines, numbering in steps)."
+    )
+    packed_json = json.dumps({str(i): fields for i, fields in fields_by_index.items()}, ensure_ascii=False)
+    user = f"Translate these recipes' fields to {lang_name}:\n{packed_json}"
+    raw = await call_chat_messages(
+        [{"role": "system", "content": system}, {"role": "user", "content": user}],
+        max_tokens=4000, temperature=0.3, response_format={"type": "json_object"},
+        route="recipes.translate_full_recipes.packed", size_hint=len(packed_json),
+    )
+    answers = json.loads(_strip_json_fence(raw))
+    translated = {}
+    for i, fields in fields_by_index.items():
+        answer = answers.get(str(i)) if isinstance(answers, dict) else None
+        if isinstance(answer, dict):
+            kept = {k: v for k, v in answer.items() if k in fields and isinstance(v, str)}
+            if kept:
+                translated[i] = kept
+    return translated
+
+
 @router.post("/translate-full")
 @limiter.limit(AI_HEAVY_LIMIT)
 async def translate_full_recipes(request: Request, payload: TranslateFullRecipesRequest):
-    """Translate all text fields of recipe objects to the target language."""
+    """
+    Translate all text fields of recipe objects to the target language.
+
+    Fields (and each line of ingredients/instructions) already in the
+    translation memory are reused; only the rest is sent. Small requests are
+    translated in one packed call; otherwise, and for any recipe the packed
+    answer didn't cover, one call per recipe runs concurrently (at most
+    TRANSLATE_FULL_CONCURRENCY at a time). A recipe whose translation fails is
+    returned unchanged.
+    """
     if not payload.recipes:
         return []
     lang_code = payload.language.split("-")[0].lower()
     lang_name = LANGUAGE_NAMES.get(lang_code, "English")
 
-    translated_recipes = []
-    for recipe in payload.recipes:
-        fields_to_translate = {
-            k: v for k, v in recipe.items()
-            if k in ("name", "ingredients", "instructions", "difficulty", "health_benefits", "budget_tip")
-            and isinstance(v, str) and v.strip()
-        }
-        if not fields_to_translate:
-            translated_recipes.append(recipe)
-            continue
-        system = (
-            f"You are a professional translator. Translate ONLY the provided JSON field values to {lang_name}. "
-            "Return ONLY valid JSON with exactly the same keys. Do not add or remove keys. "
-            "Preserve numbers, units, and formatting (newlines, numbering in steps)."
-        )
-        user = f"Translate these recipe fields to {lang_name}:\n{json.dumps(fields_to_translate, ensure_ascii=False)}"
+    units = [_translation_units(recipe) for recipe in payload.recipes]
+    known = await translation_memory.lookup_many((text for u in units for text in u.values()), lang_name)
+    pending = {}
+    for i, u in enumerate(units):
+        missing = {key: text for key, text in u.items() if text not in known}
+        if missing:
+            pending[i] = missing
+    translated = {}
+
+    packed_size = len(json.dumps(list(pending.values()), ensure_ascii=False))
+    if len(pending) > 1 and packed_size <= TRANSLATE_FULL_PACKED_MAX_CHARS:
         try:
-            raw = await call_chat_completion(system, user, max_tokens=2000, temperature=0.3, route="recipes.translate_full_recipes")
-            raw = raw.strip()
-            if raw.startswith("```"):
-                raw = raw.split("```")[1]
-                if raw.startswith("json"):
-                    raw = raw[4:]
-            translated_fields = json.loads(raw)
-            translated_recipes.append({**recipe, **translated_fields})
+            translated = await _translate_fields_packed(pending, lang_name)
         except Exception:
-            logger.error("Full recipe translation error", exc_info=True)
-            translated_recipes.append(recipe)
-    return translated_recipes
+            logger.warning("Packed recipe translation failed; translating one by one", exc_info=True)
+
+    semaphore = asyncio.Semaphore(TRANSLATE_FULL_CONCURRENCY)
+
+    async def translate_one(i: int) -> None:
+        async with semaphore:
+            try:
+                translated[i] = await _translate_fields(pending[i], lang_name)
+            except Exception:
+                logger.error("Full recipe translation error", exc_info=True)
+
+    await asyncio.gather(*(translate_one(i) for i in pending if i not in translated))
+
+    fresh = {}
+    for i, answer in translated.items():
+        for key, text in pending[i].items():
+            value = answer.get(key)
+            if isinstance(value, str) and value.strip():
+                fresh[text] = value.strip()
+    await translation_memory.store_many(fresh, lang_name)
+
+    results = []
+    for i, recipe in enumerate(payload.recipes):
+        if i in pending and i not in translated:
+            results.append(recipe)  # translation failed: keep the original as a whole
+            continue
+        # A unit the answer skipped keeps its original text.
+        results.append(_apply_translations(recipe, {
+            key: known.get(text) or fresh.get(text) or text for key, text in units[i].items()
+        }))
+    return results
 
 
 class IngredientParseRequest(BaseModel):
@@ -275,10 +680,19 @@ class IngredientParseRequest(BaseModel):
 @router.post("/parse-ingredients")
 @limiter.limit(AI_LIGHT_LIMIT)
 async def parse_ingredients(request: Request, payload: IngredientParseRequest):
-    """Use AI to parse raw ingredient lines into structured name/quantity/unit objects."""
+    """Parse raw ingredient lines into structured name/quantity/unit objects.
+
+    Regular lines are parsed locally (services/ingredient_parsing.py); only
+    the ones the local parser isn't confident about go to the model, in one
+    batch.
+    """
     lines = clean_ingredient_lines(payload.lines)
     if not lines:
         return []
+    parsed = [parse_ingredient_line(line) for line in lines]
+    unresolved = [p.line for p in parsed if p.confidence < INGREDIENT_PARSE_MIN_CONFIDENCE]
+    if not unresolved:
+        return merge_parsed_ingredients(parsed, [])
 
     system_prompt = (
         "You are an ingredient parser. Convert each ingredient line into structured data.\n"
@@ -294,13 +708,21 @@ async def parse_ingredients(request: Request, payload: IngredientParseRequest):
         "Return ONLY a valid JSON array with no markdown: "
         '[{"name": "...", "quantity": 0.0, "unit": "..."}]'
     )
-    user_prompt = "\n".join(lines)
+    user_prompt = "\n".join(unresolved)
 
     try:
-        raw = await call_chat_completion(system_prompt, user_prompt, max_tokens=2000, temperature=0.1, route="recipes.parse_ingredients")
+        raw = await call_chat_completion(system_prompt, user_prompt, max_tokens=2000, temperature=0.1, route="recipes.parse_ingredients", size_hint=len(unresolved))
         raw = strip_json_code_fences(raw)
         items = json.loads(raw)
-        return items
+        if not isinstance(items, list):
+            raise ValueError("ingredient parse answer is not a JSON array")
+        return merge_parsed_ingredients(parsed, items)
+    except CircuitOpenError as e:
+        raise circuit_open_http_error(e)
+    except LimiterTimeout as e:
+        raise limiter_timeout_http_error(e)
+    except TokenBudgetExceeded as e:
+        raise token_budget_http_error(e)
     except Exception:
         logger.error("Ingredient parse error", exc_info=True)
         raise HTTPException(status_code=500, detail="Failed to parse ingredients")
\ No newline at end of file
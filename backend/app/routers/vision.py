@@ -4,12 +4,12 @@ from typing import List
 import base64
 import json
 import logging
-import os
 import re
-import time
-from openai import OpenAI
 from app.services.auth import limiter, AI_HEAVY_LIMIT
-from app.services.openai_client import log_openai_usage
+from app.services.adaptive_limiter import LimiterTimeout, limiter_timeout_http_error
+from app.services.circuit_breaker import CircuitOpenError, circuit_open_http_error
+from app.services.openai_client import call_chat_messages
+from app.services.token_budget import TokenBudgetExceeded, token_budget_http_error
 from app.services.upload_validation import validate_image_upload, MAX_UPLOAD_BYTES
 
 logger = logging.getLogger(__name__)
@@ -39,9 +39,7 @@ async def analyze_ingredients(request: Request, file: UploadFile = File(...)):
         base64_image = base64.b64encode(contents).decode('utf-8')
 
         # Call GPT-4 Vision API
-        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), timeout=90.0, max_retries=2)
-        start = time.perf_counter()
-        response = client.chat.completions.create(
+        content = await call_chat_messages(
             model="gpt-4o",
             messages=[
                 {
@@ -78,13 +76,10 @@ async def analyze_ingredients(request: Request, file: UploadFile = File(...)):
                     ]
                 }
             ],
-            max_tokens=300
+            max_tokens=300,
+            route="vision.analyze_ingredients",
         )
-        log_openai_usage(response.model, (time.perf_counter() - start) * 1000, response.usage, route="vision.analyze_ingredients")
 
-        # Extract ingredients from response
-        content = response.choices[0].message.content
-        
         # Try to parse as JSON
         import json
         import re
@@ -129,6 +124,12 @@ async def analyze_ingredients(request: Request, file: UploadFile = File(...)):
         
     except HTTPException:
         raise
+    except CircuitOpenError as e:
+        raise circuit_open_http_error(e)
+    except LimiterTimeout as e:
+        raise limiter_timeout_http_error(e)
+    except TokenBudgetExceeded as e:
+        raise token_budget_http_error(e)
     except Exception as e:
         logger.error("Vision API error", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Failed to analyze image: {str(e)}")
@@ -183,9 +184,7 @@ async def analyze_receipt(request: Request, file: UploadFile = File(...)):
 
         base64_image = base64.b64encode(contents).decode('utf-8')
 
-        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), timeout=90.0, max_retries=2)
-        start = time.perf_counter()
-        response = client.chat.completions.create(
+        content = await call_chat_messages(
             model="gpt-4o",
             messages=[
                 {
@@ -251,10 +250,9 @@ async def analyze_receipt(request: Request, file: UploadFile = File(...)):
             response_format={"type": "json_object"},
             temperature=0.1,
             max_tokens=3000,
+            route="vision.analyze_receipt",
         )
-        log_openai_usage(response.model, (time.perf_counter() - start) * 1000, response.usage, route="vision.analyze_receipt")
 
-        content = response.choices[0].message.content
         try:
             parsed = json.loads(content)
         except (json.JSONDecodeError, TypeError):
@@ -281,6 +279,12 @@ async def analyze_receipt(request: Request, file: UploadFile = File(...)):
 
     except HTTPException:
         raise
+    except CircuitOpenError as e:
+        raise circuit_open_http_error(e)
+    except LimiterTimeout as e:
+        raise limiter_timeout_http_error(e)
+    except TokenBudgetExceeded as e:
+        raise token_budget_http_error(e)
     except Exception as e:
         logger.error("Receipt vision API error", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Failed to analyze receipt: {str(e)}")
@@ -0,0 +1,185 @@
+# backend/app/services/adaptive_limiter.py
+"""
+Adaptive (AIMD) concurrency limits for outbound OpenAI calls, one per route.
+
+When OpenAI browns out, latency climbs and every worker keeps opening more
+calls; they pile up behind 90 s read timeouts and fail together with 429s.
+Each route's limiter instead:
+
+- grows its limit additively (+1 per "window" of healthy calls, like TCP
+  congestion avoidance) while calls succeed at normal latency;
+- cuts it multiplicatively on a 429/5xx/timeout, or on a call far slower than
+  the route's own latency baseline (at most once per baseline interval, so a
+  burst of failures from one window counts once);
+- queues callers beyond the limit FIFO for at most `max_wait` seconds, then
+  raises LimiterTimeout instead of adding to the pile-up. Routes turn it into
+  a 503 with Retry-After (limiter_timeout_http_error): shedding load isn't a
+  server fault.
+
+Latency is judged per route against its own smoothed baseline, because a
+4000-token recipe generation and a 30-token barcode read have nothing in common.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+
+from fastapi import HTTPException
+
+from app.services import metrics
+
+logger = logging.getLogger(__name__)
+
+INITIAL_LIMIT = float(os.getenv("OPENAI_LIMITER_INITIAL", "8"))
+MIN_LIMIT = 1.0
+MAX_LIMIT = float(os.getenv("OPENAI_LIMITER_MAX", "64"))
+DECREASE_FACTOR = 0.5
+MAX_WAIT_SECONDS = float(os.getenv("OPENAI_LIMITER_MAX_WAIT_SECONDS", "10"))
+# A call slower than baseline * LATENCY_TOLERANCE counts as a congestion signal.
+LATENCY_TOLERANCE = 2.5
+BASELINE_ALPHA = 0.05
+BASELINE_WARMUP = 10
+
+limiter_limit = metrics.registry.gauge("openai_limiter_limit", "Current AIMD concurrency limit.", ("route",))
+limiter_queued = metrics.registry.gauge("openai_limiter_queued", "Callers waiting for an OpenAI slot.", ("route",))
+limiter_rejected = metrics.registry.counter(
+    "openai_limiter_rejected_total", "Callers shed after waiting max_wait for an OpenAI slot.", ("route",),
+)
+
+
+class LimiterTimeout(Exception):
+    """Raised when a caller waited `max_wait` seconds without getting a slot."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"OpenAI concurrency limit reached for {name}")
+        self.name = name
+        self.retry_after = retry_after
+
+
+def limiter_timeout_http_error(exc: LimiterTimeout) -> HTTPException:
+    """503 + Retry-After, without the route name (an internal detail)."""
+    return HTTPException(
+        status_code=503,
+        detail="AI service busy, please try again shortly",
+        headers={"Retry-After": str(max(1, int(exc.retry_after + 0.999)))},
+    )
+
+
+class AdaptiveLimiter:
+    def __init__(
+        self,
+        name: str,
+        initial: float = INITIAL_LIMIT,
+        min_limit: float = MIN_LIMIT,
+        max_limit: float = MAX_LIMIT,
+        max_wait: float = MAX_WAIT_SECONDS,
+    ):
+        self.name = name
+        self.limit = initial
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_wait = max_wait
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._baseline: Optional[float] = None
+        self._samples = 0
+        self._last_decrease = 0.0
+        limiter_limit.set(self.limit, route=name)
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for w in self._waiters if not w.done())
+
+    def _has_capacity(self) -> bool:
+        return self.in_flight < max(int(self.limit), 1)
+
+    async def acquire(self) -> None:
+        if self._has_capacity() and not self.queued:
+            self.in_flight += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        limiter_queued.inc(route=self.name)
+        try:
+            await asyncio.wait_for(waiter, timeout=self.max_wait)
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                # Handed a slot in the same loop iteration the timeout fired:
+                # we're not going to use it, so pass it on.
+                self.in_flight -= 1
+                self._wake()
+            limiter_rejected.inc(route=self.name)
+            logger.warning(
+                "openai limiter route=%s: no slot within %.1fs (limit=%d in_flight=%d)",
+                self.name, self.max_wait, int(self.limit), self.in_flight,
+            )
+            raise LimiterTimeout(self.name, retry_after=self.max_wait) from None
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed to us just as we were cancelled — pass it on.
+                self.in_flight -= 1
+                self._wake()
+            raise
+        finally:
+            limiter_queued.dec(route=self.name)
+            try:
+                self._waiters.remove(waiter)
+            except ValueError:
+                pass
+
+    def release(self, latency: float, overloaded: Optional[bool]) -> None:
+        """Return a slot. `overloaded` is True for 429/5xx/timeouts, False for a
+        normal response and None when the call says nothing about upstream
+        health (e.g. the caller was cancelled)."""
+        self.in_flight -= 1
+        if overloaded is not None:
+            self._adjust(latency, overloaded)
+        self._wake()
+
+    def _adjust(self, latency: float, overloaded: bool) -> None:
+        now = time.monotonic()
+        slow = (
+            not overloaded
+            and self._samples >= BASELINE_WARMUP
+            and self._baseline is not None
+            and latency > self._baseline * LATENCY_TOLERANCE
+        )
+        if overloaded or slow:
+            # One decrease per baseline interval: the calls that were already in
+            # flight when trouble started shouldn't each halve the limit again.
+            if now - self._last_decrease >= (self._baseline or 1.0):
+                old = self.limit
+                self.limit = max(self.min_limit, self.limit * DECREASE_FACTOR)
+                self._last_decrease = now
+                limiter_limit.set(self.limit, route=self.name)
+                logger.warning(
+                    "openai limiter route=%s: %s, limit %.1f -> %.1f",
+                    self.name, "overload" if overloaded else f"slow call ({latency:.1f}s)", old, self.limit,
+                )
+            return
+        self._samples += 1
+        self._baseline = latency if self._baseline is None else (
+            (1 - BASELINE_ALPHA) * self._baseline + BASELINE_ALPHA * latency
+        )
+        self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+        limiter_limit.set(self.limit, route=self.name)
+
+    def _wake(self) -> None:
+        while self._waiters and self._has_capacity():
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+
+_limiters: Dict[str, AdaptiveLimiter] = {}
+
+
+def get_limiter(route: str) -> AdaptiveLimiter:
+    name = route or "-"
+    limiter = _limiters.get(name)
+    if limiter is None:
+        limiter = _limiters[name] = AdaptiveLimiter(name)
+    return limiter
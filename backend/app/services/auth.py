@@ -1,6 +1,7 @@
 # backend/app/services/auth.py
 import logging
 import os
+from contextvars import ContextVar
 from typing import Optional
 
 from fastapi import Header, HTTPException, Request
@@ -13,6 +14,11 @@ logger = logging.getLogger(__name__)
 SUPABASE_URL = os.getenv("SUPABASE_URL", "")
 SUPABASE_ANON_KEY = os.getenv("SUPABASE_ANON_KEY", "")
 
+# The current request's `request.state`, set by the middleware in app.main.
+# get_current_user runs in the threadpool, so a ContextVar it set would not be
+# visible to the route; the shared state object is.
+request_state_var: ContextVar[Optional[object]] = ContextVar("request_state", default=None)
+
 
 def get_current_user(request: Request, authorization: Optional[str] = Header(None)):
     """
@@ -50,6 +56,11 @@ def get_current_user(request: Request, authorization: Optional[str] = Header(Non
     return user_response.user
 
 
+def current_user_id() -> Optional[str]:
+    """Authenticated user id of the request being served, if any."""
+    return getattr(request_state_var.get(), "user_id", None)
+
+
 def rate_limit_key(request: Request) -> str:
     """Rate-limit per authenticated user; fall back to client IP."""
     user_id = getattr(request.state, "user_id", None)
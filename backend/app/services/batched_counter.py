@@ -0,0 +1,132 @@
+# backend/app/services/batched_counter.py
+"""
+In-process accumulator for best-effort counters kept in the database.
+
+The recipes_generated impact counter used to cost every successful generation
+a new Supabase client and an RPC round-trip in the threadpool. BatchedCounter
+sums increments in memory instead, and a flusher task writes the total with a
+single `write(n)` call:
+- every `interval` seconds,
+- sooner once `threshold` has built up,
+- and once more on shutdown (close(), from the app lifespan).
+
+A failed write puts its count back and the next attempt backs off: double
+the interval per consecutive failure, capped at `max_backoff`. While backing
+off, reaching the threshold doesn't trigger a flush. Nothing is lost while the
+database is down, short of the process exiting, and the final flush on close()
+logs what it couldn't write.
+
+`write` is synchronous (supabase-py) and runs in a thread. What was written,
+what failed and what is still pending are on /metrics, labelled with `name`.
+"""
+import asyncio
+import logging
+import threading
+from typing import Callable, Optional
+
+from app.services import metrics
+
+logger = logging.getLogger(__name__)
+
+batched_written = metrics.registry.counter(
+    "batched_counter_written_total", "Increments written by a batched counter.", ("counter",),
+)
+batched_failures = metrics.registry.counter(
+    "batched_counter_write_failures_total", "Failed batched-counter writes (retried later).", ("counter",),
+)
+batched_pending = metrics.registry.gauge(
+    "batched_counter_pending", "Increments waiting for the next batched-counter write.", ("counter",),
+)
+
+
+class BatchedCounter:
+    def __init__(self, name: str, write: Callable[[int], None], interval: float, threshold: int, max_backoff: float):
+        self.name = name
+        self.interval = interval
+        self.threshold = threshold
+        self.max_backoff = max_backoff
+        self._write = write
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def add(self, n: int) -> None:
+        """Count `n` more. Cheap and never raises; safe from any thread."""
+        if n <= 0:
+            return
+        with self._lock:
+            self._pending += n
+            due = self._pending >= self.threshold
+        batched_pending.inc(n, counter=self.name)
+        if due and self._failures == 0 and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def _delay(self) -> float:
+        if not self._failures:
+            return self.interval
+        return min(self.interval * 2 ** self._failures, self.max_backoff)
+
+    async def flush(self) -> bool:
+        """Write everything pending in one call. False (count kept) on failure."""
+        with self._lock:
+            n, self._pending = self._pending, 0
+        if not n:
+            return True
+        try:
+            await asyncio.to_thread(self._write, n)
+        except Exception:
+            with self._lock:
+                self._pending += n
+            self._failures += 1
+            batched_failures.inc(counter=self.name)
+            logger.warning(
+                "%s flush of %d failed, retrying in %.0fs", self.name, n, self._delay(), exc_info=True,
+            )
+            return False
+        self._failures = 0
+        batched_written.inc(n, counter=self.name)
+        batched_pending.dec(n, counter=self.name)
+        return True
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self._delay())
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if self._closing:
+                return
+            await self.flush()
+
+    def start(self) -> None:
+        """Start the flush loop on the running event loop."""
+        if self._task is None:
+            self._loop = asyncio.get_running_loop()
+            self._wakeup = asyncio.Event()
+            self._closing = False
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """Stop the flush loop and write what's left (one attempt).
+
+        The loop isn't cancelled mid-write: a write already handed to its
+        thread can't be taken back, so cancelling it could count twice or lose
+        the count.
+        """
+        if self._task is not None:
+            self._closing = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        self._loop = None
+        if not await self.flush():
+            logger.error("%s: %d increments lost at shutdown", self.name, self._pending)
@@ -0,0 +1,276 @@
+# backend/app/services/cache_backends.py
+"""
+Key/value cache backends with byte-bounded LRU eviction and two-stage expiry.
+
+Every entry carries two deadlines: `fresh_until` (serve as-is) and
+`stale_until` (still servable, but the caller should refresh it in the
+background — stale-while-revalidate). Past `stale_until` it's a miss.
+
+- MemoryCacheBackend: per-process OrderedDict. Fastest; each uvicorn worker
+  has its own copy.
+- SqliteCacheBackend: one SQLite file (WAL mode) that every worker on the host
+  can share. Lock contention is treated as a miss rather than waited on, so
+  the cache can never stall a request.
+
+Async code uses aget/aset (and aget_many/aset_many for many keys at once):
+the SQLite backend runs them in a worker thread, off the event loop.
+
+Values are strings; callers serialize (e.g. json.dumps) anything richer.
+"""
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CacheEntry:
+    value: str
+    fresh_until: float
+    stale_until: float
+
+    def is_fresh(self, now: float) -> bool:
+        return now < self.fresh_until
+
+
+def _entry_size(key: str, value: str) -> int:
+    return len(key.encode("utf-8")) + len(value.encode("utf-8"))
+
+
+class MemoryCacheBackend:
+    """In-process LRU bounded by the total encoded size of keys + values."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, tuple[CacheEntry, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        now = time.time()
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            entry, size = item
+            if now >= entry.stale_until:
+                del self._entries[key]
+                self._bytes -= size
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, value: str, ttl: float, stale_ttl: float = 0.0) -> None:
+        size = _entry_size(key, value)
+        if size > self.max_bytes:
+            return  # would evict everything else and still not fit
+        now = time.time()
+        entry = CacheEntry(value, now + ttl, now + ttl + stale_ttl)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (entry, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    # Same interface as SqliteCacheBackend's; a dict lookup needs no thread.
+    async def aget(self, key: str) -> Optional[CacheEntry]:
+        return self.get(key)
+
+    async def aset(self, key: str, value: str, ttl: float, stale_ttl: float = 0.0) -> None:
+        self.set(key, value, ttl, stale_ttl)
+
+    async def aget_many(self, keys: Iterable[str]) -> Dict[str, CacheEntry]:
+        return _get_many(self, keys)
+
+    async def aset_many(self, values: Dict[str, str], ttl: float, stale_ttl: float = 0.0) -> None:
+        _set_many(self, values, ttl, stale_ttl)
+
+
+class SqliteCacheBackend:
+    """
+    LRU cache in a SQLite file shared by every worker process on the host.
+
+    Eviction is by `last_access` once the entry sizes exceed max_bytes. The
+    byte total is kept as a running count (other workers' writes are picked up
+    every RESYNC_EVERY writes), and each eviction frees down to EVICT_TO of
+    max_bytes, so the full-table scans happen once per batch of writes rather
+    than on every set. BUSY_TIMEOUT_SECONDS is deliberately tiny: another worker
+    holding the write lock means a miss (or a skipped write). The async methods
+    run the calls in a thread so even that wait never blocks the event loop.
+    """
+
+    BUSY_TIMEOUT_SECONDS = 0.05
+    RESYNC_EVERY = 256
+    EVICT_TO = 0.9
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=self.BUSY_TIMEOUT_SECONDS, check_same_thread=False, isolation_level=None)
+        try:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL,"
+                " fresh_until REAL NOT NULL, stale_until REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS cache_last_access ON cache (last_access)")
+            self._bytes = self._table_bytes()
+        except sqlite3.Error:
+            self._conn.close()
+            raise
+        self._writes = 0
+
+    def _table_bytes(self) -> int:
+        return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        now = time.time()
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT value, fresh_until, stale_until, size FROM cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                if now >= row[2]:
+                    self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                    self._bytes -= row[3]
+                    return None
+                self._conn.execute("UPDATE cache SET last_access = ? WHERE key = ?", (now, key))
+        except sqlite3.OperationalError as exc:
+            logger.debug("sqlite cache get skipped: %s", exc)
+            return None
+        return CacheEntry(row[0], row[1], row[2])
+
+    def set(self, key: str, value: str, ttl: float, stale_ttl: float = 0.0) -> None:
+        size = _entry_size(key, value)
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        try:
+            with self._lock:
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    old = self._conn.execute("SELECT size FROM cache WHERE key = ?", (key,)).fetchone()
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO cache (key, value, size, fresh_until, stale_until, last_access)"
+                        " VALUES (?, ?, ?, ?, ?, ?)",
+                        (key, value, size, now + ttl, now + ttl + stale_ttl, now),
+                    )
+                    added = size - (old[0] if old else 0)
+                    self._writes += 1
+                    total = self._bytes + added
+                    if total > self.max_bytes or self._writes % self.RESYNC_EVERY == 0:
+                        total = self._table_bytes()  # includes other workers' writes
+                    if total > self.max_bytes:
+                        total -= self._evict(total)
+                    self._conn.execute("COMMIT")
+                except Exception:
+                    self._conn.execute("ROLLBACK")
+                    raise
+                self._bytes = total
+        except sqlite3.OperationalError as exc:
+            logger.debug("sqlite cache set skipped: %s", exc)
+
+    def _evict(self, total: int) -> int:
+        """Delete least recently used entries down to EVICT_TO of max_bytes; bytes freed."""
+        excess = total - int(self.max_bytes * self.EVICT_TO)
+        doomed, freed = [], 0
+        for key, size in self._conn.execute("SELECT key, size FROM cache ORDER BY last_access ASC"):
+            if freed >= excess:
+                break
+            doomed.append((key,))
+            freed += size
+        self._conn.executemany("DELETE FROM cache WHERE key = ?", doomed)
+        return freed
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            row = self._conn.execute("SELECT size FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self._bytes -= row[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    @property
+    def size_bytes(self) -> int:
+        with self._lock:
+            return self._table_bytes()
+
+    async def aget(self, key: str) -> Optional[CacheEntry]:
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, value: str, ttl: float, stale_ttl: float = 0.0) -> None:
+        await asyncio.to_thread(self.set, key, value, ttl, stale_ttl)
+
+    async def aget_many(self, keys: Iterable[str]) -> Dict[str, CacheEntry]:
+        return await asyncio.to_thread(_get_many, self, list(keys))
+
+    async def aset_many(self, values: Dict[str, str], ttl: float, stale_ttl: float = 0.0) -> None:
+        await asyncio.to_thread(_set_many, self, values, ttl, stale_ttl)
+
+
+def _get_many(backend, keys: Iterable[str]) -> Dict[str, CacheEntry]:
+    found = {}
+    for key in keys:
+        entry = backend.get(key)
+        if entry is not None:
+            found[key] = entry
+    return found
+
+
+def _set_many(backend, values: Dict[str, str], ttl: float, stale_ttl: float = 0.0) -> None:
+    for key, value in values.items():
+        backend.set(key, value, ttl, stale_ttl)
+
+
+def build_backend(kind: str, path: str, max_bytes: int) -> Optional[Union[MemoryCacheBackend, SqliteCacheBackend]]:
+    """The backend named by a *_BACKEND setting: "off" (None), "sqlite" at `path`, else memory."""
+    if kind == "off":
+        return None
+    if kind == "sqlite":
+        try:
+            return SqliteCacheBackend(path, max_bytes)
+        except sqlite3.Error:
+            # Read-only dir, locked or corrupt file: a per-process cache beats failing requests.
+            logger.warning("sqlite cache unavailable path=%s; using the memory backend", path, exc_info=True)
+    return MemoryCacheBackend(max_bytes)
@@ -0,0 +1,162 @@
+# backend/app/services/circuit_breaker.py
+"""
+Per-upstream circuit breakers (OpenAI, Open Food Facts).
+
+During a partial OpenAI outage every AI request used to burn 3 attempts x 90 s
+timeouts, tying up every worker for minutes. A breaker trips after
+FAILURE_THRESHOLD consecutive upstream failures (connect errors, timeouts,
+5xx) and then fails calls immediately with CircuitOpenError, so routes can
+answer in milliseconds — either with their existing local fallback (price
+estimate, original-language names, ...) or a 503 with Retry-After.
+
+After RECOVERY_SECONDS the breaker goes half-open and lets a few probe calls
+through: success closes it, failure re-opens it for another interval.
+4xx responses and cancellations say nothing about upstream health and leave
+the state alone. States are reported on /health.
+"""
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+import httpx
+from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+RECOVERY_SECONDS = float(os.getenv("CIRCUIT_RECOVERY_SECONDS", "30"))
+HALF_OPEN_MAX_CALLS = 1
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit is open."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} circuit open; retry in {retry_after:.0f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+def is_upstream_failure(exc: BaseException) -> bool:
+    """True for errors that indicate the upstream itself is unhealthy."""
+    if isinstance(exc, (httpx.ConnectError, httpx.TimeoutException)):
+        return True
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code >= 500
+    return False
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = FAILURE_THRESHOLD,
+        recovery_seconds: float = RECOVERY_SECONDS,
+        half_open_max_calls: int = HALF_OPEN_MAX_CALLS,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self.half_open_max_calls = half_open_max_calls
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self.rejected = 0
+        # Shared by every request in the process; cheap to keep thread-safe.
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.recovery_seconds:
+                return HALF_OPEN
+            return self._state
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError if the call must not go out; otherwise admit it."""
+        with self._lock:
+            if self._state == OPEN:
+                remaining = self.recovery_seconds - (time.monotonic() - self._opened_at)
+                if remaining > 0:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, remaining)
+                self._state = HALF_OPEN
+                self._probes = 0
+                logger.info("circuit %s half-open: probing upstream", self.name)
+            if self._state == HALF_OPEN:
+                if self._probes >= self.half_open_max_calls:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, self.recovery_seconds)
+                self._probes += 1
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state != CLOSED:
+                logger.info("circuit %s closed: upstream recovered", self.name)
+            self._state = CLOSED
+            self._failures = 0
+            self._probes = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    logger.warning(
+                        "circuit %s open after %d consecutive failures; failing fast for %.0fs",
+                        self.name, self._failures, self.recovery_seconds,
+                    )
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self._probes = 0
+
+    def record_neutral(self) -> None:
+        """The call ended without telling us anything (4xx, cancelled): free its probe slot."""
+        with self._lock:
+            if self._state == HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    @contextmanager
+    def guard(self):
+        """Wrap one upstream call: `with breaker.guard(): resp = await client.get(...)`."""
+        self.before_call()
+        try:
+            yield
+        except BaseException as exc:
+            if is_upstream_failure(exc):
+                self.record_failure()
+            else:
+                self.record_neutral()
+            raise
+        self.record_success()
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    breaker = _breakers.get(name)
+    if breaker is None:
+        breaker = _breakers[name] = CircuitBreaker(name)
+    return breaker
+
+
+def circuit_states() -> Dict[str, str]:
+    return {name: breaker.state for name, breaker in sorted(_breakers.items())}
+
+
+def circuit_open_http_error(exc: CircuitOpenError) -> HTTPException:
+    """503 + Retry-After for routes with no local fallback to serve instead."""
+    return HTTPException(
+        status_code=503,
+        detail="AI service temporarily unavailable, please try again shortly",
+        headers={"Retry-After": str(max(1, int(exc.retry_after)))},
+    )
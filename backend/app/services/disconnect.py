@@ -0,0 +1,139 @@
+# backend/app/services/disconnect.py
+"""
+Stop waiting on OpenAI for clients that have gone away.
+
+Starlette keeps running a handler after its client disconnects: closing the
+app mid-generation still costs the whole ~4000-token call, and the answer is
+thrown away. CancelOnDisconnect (ASGI middleware) watches for the
+http.disconnect message once the request body has been read. If the handler
+is waiting on upstream work at that moment, the middleware cancels it.
+
+Only that wait is cancelled. openai_client marks its calls with
+`abandonable()`. A handler that disconnects while doing anything else (a
+Supabase write, building the response) runs to completion. If it starts
+another upstream call after the disconnect, it is cancelled right there.
+Cancelling a handler cancels its in-flight request and any pending retries.
+Single-flight still decides what happens to shared work: if another
+coalesced waiter or a completion-cache fill needs the result, the work keeps
+running (see singleflight.py).
+
+Disconnects after the response has been fully sent are ignored.
+Cancellations are counted in http_requests_cancelled_total{route} and
+openai_calls_cancelled_total{route, outcome}.
+"""
+import asyncio
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from app.services import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class _Watch:
+    """One request's disconnect state, shared by the middleware and abandonable()."""
+
+    def __init__(self):
+        self.task: Optional[asyncio.Task] = None
+        self.disconnected = asyncio.Event()
+        self.response_complete = False
+        self.pending = 0  # abandonable() blocks currently open
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        if not self.cancelled and self.task is not None and not self.task.done():
+            self.cancelled = True
+            self.task.cancel()
+
+    def on_disconnect(self) -> None:
+        if self.response_complete:
+            return
+        self.disconnected.set()
+        if self.pending:
+            self.cancel()
+
+
+_watch_var: ContextVar[Optional[_Watch]] = ContextVar("disconnect_watch", default=None)
+
+
+def detach() -> None:
+    """Opt the current context out: work that outlives its request (a queued
+    job) must not be cancelled by that request's client leaving."""
+    _watch_var.set(None)
+
+
+@contextmanager
+def abandonable():
+    """Mark the enclosed wait as safe to cancel if the client disconnects."""
+    watch = _watch_var.get()
+    if watch is None:
+        yield
+        return
+    if watch.disconnected.is_set():
+        watch.cancel()  # gone already: the next await raises CancelledError
+    watch.pending += 1
+    try:
+        yield
+    finally:
+        watch.pending -= 1
+
+
+class CancelOnDisconnect:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        watch = _Watch()
+        body_read = asyncio.Event()
+
+        async def app_receive():
+            # After the body, the watcher owns the real receive(); the app
+            # (e.g. StreamingResponse's own disconnect listener) gets the news
+            # from it.
+            if body_read.is_set():
+                await watch.disconnected.wait()
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                watch.on_disconnect()
+            elif not message.get("more_body", False):
+                body_read.set()
+            return message
+
+        async def app_send(message):
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                watch.response_complete = True
+            await send(message)
+
+        async def watch_for_disconnect():
+            await body_read.wait()
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    watch.on_disconnect()
+                    return
+
+        token = _watch_var.set(watch)
+        try:
+            watch.task = asyncio.ensure_future(self.app(scope, app_receive, app_send))
+        finally:
+            _watch_var.reset(token)
+        watcher = asyncio.ensure_future(watch_for_disconnect())
+        try:
+            await watch.task
+        except asyncio.CancelledError:
+            # Our own cancellation (shutdown) propagates; the handler's, from
+            # a disconnect, ends the request quietly.
+            if not watch.cancelled or asyncio.current_task().cancelling():
+                raise
+            route = getattr(scope.get("route"), "path", "unmatched")
+            metrics.http_requests_cancelled.inc(route=route)
+            logger.info("client disconnected, cancelled %s %s", scope.get("method"), scope.get("path"))
+        finally:
+            watcher.cancel()
@@ -0,0 +1,95 @@
+# backend/app/services/hedging.py
+"""
+Request hedging for short, latency-critical completions.
+
+If the first attempt hasn't answered by the route's observed p95 latency, an
+identical second attempt is fired and whichever finishes first wins; the
+other is cancelled. The p99 tail of gpt-4o calls is several times the median,
+so on interactive flows (scanning, dietary labels, recipe-name translation)
+this trims the tail for the price of a few percent extra calls — capped by a
+process-wide RatioBudget so hedging can never double load during a brownout.
+"""
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+from app.services import metrics
+from app.services.ratio_budget import RatioBudget
+
+logger = logging.getLogger(__name__)
+
+LATENCY_WINDOW = 200
+MIN_SAMPLES = 20
+HEDGE_PERCENTILE = 0.95
+
+# At most ~5% of calls on hedged routes may be hedged.
+hedge_budget = RatioBudget(ratio=0.05, min_per_second=0.02, max_tokens=5.0)
+# One per hedge fired; winner: primary, hedge, or none (both attempts failed).
+openai_hedges = metrics.registry.counter("openai_hedges_total", "Hedged OpenAI attempts fired.", ("route", "winner"))
+
+
+class LatencyTracker:
+    """Sliding window of recent call latencies (seconds) for one route."""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if len(self._samples) < MIN_SAMPLES:
+            return None  # not enough history to know what "slow" means yet
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+_trackers: Dict[str, LatencyTracker] = {}
+
+
+def get_tracker(route: str) -> LatencyTracker:
+    tracker = _trackers.get(route)
+    if tracker is None:
+        tracker = _trackers[route] = LatencyTracker()
+    return tracker
+
+
+async def hedged(
+    route: str,
+    attempt: Callable[[], Awaitable[Any]],
+) -> Tuple[Any, bool]:
+    """
+    Run `attempt()`, hedging it with a second identical attempt once the
+    route's p95 has elapsed (budget permitting). Returns (result, hedged).
+    If the first attempt to finish fails, the other one is still awaited.
+    """
+    hedge_budget.deposit()
+    delay = get_tracker(route).percentile(HEDGE_PERCENTILE)
+    primary = asyncio.ensure_future(attempt())
+    if delay is None:
+        return await primary, False
+
+    tasks = {primary}
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if done or not hedge_budget.try_spend():
+            return await primary, False
+
+        logger.info("openai hedge fired route=%s after=%.0fms", route, delay * 1000)
+        hedge = asyncio.ensure_future(attempt())
+        tasks.add(hedge)
+        error = None
+        while tasks:
+            done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    openai_hedges.inc(route=route, winner="hedge" if task is hedge else "primary")
+                    return task.result(), True
+                error = task.exception()
+        openai_hedges.inc(route=route, winner="none")
+        raise error
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
@@ -0,0 +1,159 @@
+# backend/app/services/http_clients.py
+"""
+Shared, pooled outbound HTTP clients — one per upstream.
+
+Previously every OpenAI attempt, Open Food Facts lookup and /health probe
+built its own httpx client, so each call paid a fresh TCP + TLS handshake
+(100–300 ms on the AI routes). Call sites now ask this registry for the
+upstream's client instead:
+
+    client = get_async_client("openai")
+    r = await client.post(url, json=payload)
+
+Upstreams register their pool limits/timeouts at import time with
+`register_upstream`. `startup()` / `shutdown()` are driven by the FastAPI
+lifespan hook in app.main: startup builds every client and pre-warms the ones
+with a `warm_url` (best-effort, so a flaky upstream never blocks boot);
+shutdown closes them. Outside the lifespan (tests, scripts) clients are built
+lazily on first use.
+"""
+import asyncio
+import logging
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except Exception:
+    # requirements.txt installs h2 (httpx[http2]); a bare dev install without
+    # it falls back to HTTP/1.1 keep-alive, with a warning at startup.
+    HTTP2_AVAILABLE = False
+
+# Pre-warm requests must never hold up boot for long.
+PREWARM_TIMEOUT = httpx.Timeout(3.0)
+
+
+@dataclass
+class UpstreamConfig:
+    timeout: httpx.Timeout
+    limits: httpx.Limits = field(default_factory=lambda: httpx.Limits(max_connections=20, max_keepalive_connections=10))
+    http2: bool = False
+    sync: bool = False  # sync clients serve the threadpool-run health probes
+    warm_url: Optional[str] = None
+
+
+_upstreams: Dict[str, UpstreamConfig] = {}
+# Async clients are bound to the event loop that created their pool, so the
+# loop is stored alongside the client and checked on every lookup.
+_async_clients: Dict[str, Tuple[httpx.AsyncClient, asyncio.AbstractEventLoop]] = {}
+_sync_clients: Dict[str, httpx.Client] = {}
+_sync_lock = threading.Lock()
+
+
+def register_upstream(name: str, config: UpstreamConfig) -> None:
+    """Declare an upstream's pool settings. Re-registering replaces the config
+    (an existing client keeps its old settings until the next startup)."""
+    _upstreams[name] = config
+
+
+def _prewarm_enabled() -> bool:
+    return os.getenv("HTTP_CLIENT_PREWARM", "1").lower() not in ("0", "false", "no")
+
+
+def _config(name: str) -> UpstreamConfig:
+    try:
+        return _upstreams[name]
+    except KeyError:
+        raise KeyError(f"unknown upstream {name!r} — register it with register_upstream()") from None
+
+
+def _build_async(config: UpstreamConfig) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        timeout=config.timeout,
+        limits=config.limits,
+        http2=config.http2 and HTTP2_AVAILABLE,
+    )
+
+
+def get_async_client(name: str) -> httpx.AsyncClient:
+    """Return the pooled AsyncClient for `name`, building it on first use in this event loop."""
+    config = _config(name)
+    loop = asyncio.get_running_loop()
+    entry = _async_clients.get(name)
+    if entry is not None and entry[1] is loop and not entry[0].is_closed:
+        return entry[0]
+    # A client from another (finished) loop can't be reused or awaited-closed
+    # here; it is dropped and its sockets are reclaimed with the old loop.
+    client = _build_async(config)
+    _async_clients[name] = (client, loop)
+    return client
+
+
+def get_sync_client(name: str) -> httpx.Client:
+    """Return the pooled sync Client for `name` (thread-safe; used from the threadpool)."""
+    config = _config(name)
+    client = _sync_clients.get(name)
+    if client is not None and not client.is_closed:
+        return client
+    with _sync_lock:
+        client = _sync_clients.get(name)
+        if client is None or client.is_closed:
+            client = httpx.Client(
+                timeout=config.timeout,
+                limits=config.limits,
+                http2=config.http2 and HTTP2_AVAILABLE,
+            )
+            _sync_clients[name] = client
+    return client
+
+
+async def _prewarm(name: str, config: UpstreamConfig) -> None:
+    """Open a keep-alive connection so the first real request skips the handshake."""
+    try:
+        if config.sync:
+            await asyncio.to_thread(get_sync_client(name).head, config.warm_url, timeout=PREWARM_TIMEOUT)
+        else:
+            await get_async_client(name).head(config.warm_url, timeout=PREWARM_TIMEOUT)
+        logger.debug("pre-warmed upstream=%s", name)
+    except Exception as exc:
+        logger.warning("pre-warm failed upstream=%s (%s)", name, type(exc).__name__)
+
+
+async def startup() -> None:
+    """Build every registered client and pre-warm those with a warm_url. Never raises."""
+    wants_http2 = sorted(name for name, config in _upstreams.items() if config.http2)
+    if wants_http2 and not HTTP2_AVAILABLE:
+        logger.warning("h2 not installed: %s fall back to HTTP/1.1 (pip install 'httpx[http2]')", ", ".join(wants_http2))
+    for name, config in _upstreams.items():
+        if config.sync:
+            get_sync_client(name)
+        else:
+            get_async_client(name)
+    if _prewarm_enabled():
+        await asyncio.gather(*(
+            _prewarm(name, config) for name, config in _upstreams.items() if config.warm_url
+        ))
+    logger.info("http clients ready: %s (http2=%s)", ", ".join(sorted(_upstreams)), HTTP2_AVAILABLE)
+
+
+async def shutdown() -> None:
+    """Close every client this process opened."""
+    loop = asyncio.get_running_loop()
+    for name, (client, client_loop) in list(_async_clients.items()):
+        if client_loop is loop:
+            try:
+                await client.aclose()
+            except Exception:
+                logger.warning("error closing http client upstream=%s", name, exc_info=True)
+    _async_clients.clear()
+    with _sync_lock:
+        for client in _sync_clients.values():
+            client.close()
+        _sync_clients.clear()
@@ -8,7 +8,15 @@ unchanged; each call site's own system-prompt wording (e.g. the water/ice
 skip instructions) is left as-is since it differs subtly between pantry.py
 and recipes.py (see module docstring notes in those routers / the PR that
 introduced this file for details).
+
+parse_ingredient_line is a local parser for the regular lines most recipes
+are made of, so parse_ingredients only asks the model about the rest.
 """
+import os
+import re
+import unicodedata
+from dataclasses import dataclass
+from fractions import Fraction
 from typing import List
 
 
@@ -32,3 +40,198 @@ def strip_json_code_fences(raw: str) -> str:
         raw.replace("```json", "").replace("```", "").strip()
     """
     return raw.replace("```json", "").replace("```", "").strip()
+
+
+# ---------------------------------------------------------------------------
+# Local ingredient-line parser
+#
+# Most recipe lines ("2 cups rice", "1 1/2 tbsp olive oil", "3 cloves garlic,
+# minced") follow the same shape: amount, optional unit, name, optional notes.
+# parse_ingredient_line handles that shape with the rules the
+# /recipes/parse-ingredients prompt gives the model, and scores how sure it
+# is. Only lines scoring below INGREDIENT_PARSE_MIN_CONFIDENCE are sent to
+# the model.
+# ---------------------------------------------------------------------------
+
+INGREDIENT_PARSE_MIN_CONFIDENCE = float(os.getenv("INGREDIENT_PARSE_MIN_CONFIDENCE", "0.8"))
+
+# canonical unit -> spellings seen in recipes. Single letters that clash
+# ("T"/"t", "c") aren't listed; a line starting with one goes to the model.
+UNIT_ALIASES = {
+    "cup": ("cup", "cups"),
+    "tbsp": ("tbsp", "tbsps", "tbs", "tablespoon", "tablespoons"),
+    "tsp": ("tsp", "tsps", "teaspoon", "teaspoons"),
+    "fl oz": ("fl oz", "fluid ounce", "fluid ounces"),
+    "oz": ("oz", "ounce", "ounces"),
+    "lb": ("lb", "lbs", "pound", "pounds"),
+    "g": ("g", "gram", "grams"),
+    "kg": ("kg", "kilogram", "kilograms"),
+    "ml": ("ml", "milliliter", "milliliters", "millilitre", "millilitres"),
+    "l": ("l", "liter", "liters", "litre", "litres"),
+    "clove": ("clove", "cloves"),
+    "slice": ("slice", "slices"),
+    "can": ("can", "cans"),
+    "package": ("package", "packages", "pkg"),
+    "stick": ("stick", "sticks"),
+    "bunch": ("bunch", "bunches"),
+    "pinch": ("pinch", "pinches"),
+    "dash": ("dash", "dashes"),
+}
+_UNIT_BY_ALIAS = {alias: unit for unit, aliases in UNIT_ALIASES.items() for alias in aliases}
+
+# Not bought at a grocery store; the prompt tells the model to omit these.
+SKIPPED_NAMES = frozenset({
+    "water", "ice", "boiling water", "tap water", "hot water", "cold water", "warm water",
+    "ice cubes", "ice water",
+})
+
+# Leading words that describe the state of the ingredient rather than which
+# one to buy ("fresh garlic" -> "garlic"). "ground", "whole" etc. are kept:
+# they change the product.
+_DESCRIPTORS = frozenset({
+    "fresh", "freshly", "large", "small", "medium", "chopped", "diced", "minced", "sliced", "grated",
+    "shredded", "finely", "roughly", "coarsely", "thinly", "peeled", "crushed", "melted",
+    "softened", "packed", "heaping", "level", "about", "approximately",
+})
+
+# Spelled-out amounts ("one onion", "1 dozen eggs", "a couple of limes") that
+# the amount pattern doesn't read; a name starting with one goes to the model.
+_COUNT_WORDS = frozenset({
+    "one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "ten", "eleven", "twelve",
+    "half", "quarter", "dozen", "couple", "few", "several", "pair", "handful",
+})
+
+_VULGAR_FRACTIONS = {
+    ch: str(Fraction(unicodedata.numeric(ch)).limit_denominator(10))
+    for ch in "½⅓⅔¼¾⅕⅖⅗⅘⅙⅚⅐⅛⅜⅝⅞⅑⅒"
+}
+_VULGAR_FRACTION = re.compile(f"[{''.join(_VULGAR_FRACTIONS)}]")
+_AMOUNT = r"\d+\s+\d+/\d+|\d+/\d+|\d+(?:\.\d+)?|\.\d+"
+_QUANTITY = re.compile(
+    rf"(?P<low>{_AMOUNT})(?:(?:\s*[-–—]\s*|\s+(?:to|or)\s+)(?P<high>{_AMOUNT}))?\s*",
+)
+_ARTICLE = re.compile(r"an?\s+", re.IGNORECASE)
+_UNIT = re.compile(
+    "(?P<unit>" + "|".join(re.escape(a) for a in sorted(_UNIT_BY_ALIAS, key=len, reverse=True)) + r")\.?(?=[\s,]|$)\s*",
+    re.IGNORECASE,
+)
+_OF = re.compile(r"of\s+", re.IGNORECASE)
+_PARENTHETICAL = re.compile(r"\([^)]*\)?")
+_TRAILING_NOTE = re.compile(
+    r"\s+(?:to taste|as needed|if desired|optional|for (?:garnish|serving|topping|frying|the pan))\b.*$",
+    re.IGNORECASE,
+)
+_SUSPICIOUS = re.compile(r"[\d/+&;:]")
+_CONJUNCTION = re.compile(r"\b(?:and|or|plus)\b", re.IGNORECASE)
+
+
+@dataclass
+class ParsedIngredient:
+    line: str
+    name: str
+    quantity: float
+    unit: str
+    confidence: float
+    skip: bool = False
+
+    def as_item(self) -> dict:
+        """The shape /recipes/parse-ingredients returns."""
+        return {"name": self.name, "quantity": self.quantity, "unit": self.unit}
+
+
+def _amount(text: str) -> float:
+    whole, _, fraction = text.strip().rpartition(" ")
+    value = float(Fraction(fraction))
+    return value + int(whole) if whole else value
+
+
+def parse_ingredient_line(line: str) -> ParsedIngredient:
+    """Parse one cleaned line into name/quantity/unit with a 0-1 confidence.
+
+    Follows the parse-ingredients prompt: fractions become decimals (a range
+    takes its upper bound, the amount to buy), a missing quantity is 1, a
+    missing unit is "pc", and parenthetical or preparation notes are dropped
+    from the name. Lines naming water or ice come back with skip=True.
+    """
+    text = _VULGAR_FRACTION.sub(lambda m: " " + _VULGAR_FRACTIONS[m.group()], line).replace("⁄", "/")
+    text = _PARENTHETICAL.sub(" ", text).strip()
+    confidence = 1.0
+
+    quantity = None
+    match = _QUANTITY.match(text)
+    if match:
+        try:
+            quantity = _amount(match.group("high") or match.group("low"))
+        except ZeroDivisionError:
+            confidence -= 0.5
+        else:
+            if match.group("high"):
+                confidence -= 0.05
+        text = text[match.end():]
+    elif _ARTICLE.match(text) and _UNIT.match(text, _ARTICLE.match(text).end()):
+        quantity = 1.0  # "a pinch of salt"
+        confidence -= 0.05
+        text = text[_ARTICLE.match(text).end():]
+    if quantity is None:
+        quantity = 1.0
+        confidence -= 0.1
+
+    unit = "pc"
+    match = _UNIT.match(text)
+    if match:
+        unit = _UNIT_BY_ALIAS[match.group("unit").lower()]
+        text = text[match.end():]
+        match = _OF.match(text)
+        if match:
+            text = text[match.end():]
+    else:
+        confidence -= 0.05
+
+    name = _TRAILING_NOTE.sub("", text.split(",", 1)[0])
+    words = name.split()
+    if words and unit == "pc" and len(words[0]) == 1 and words[0].isalpha():
+        confidence -= 0.5  # "1 T sugar", "2 c flour": an abbreviated unit
+    if words and words[0].lower() in _COUNT_WORDS:
+        confidence -= 0.5  # "one onion", "1 dozen eggs"
+    while words and words[0].lower() in _DESCRIPTORS:
+        words.pop(0)
+    name = " ".join(words)
+
+    if not name:
+        confidence = 0.0
+    if _SUSPICIOUS.search(name):
+        confidence -= 0.5  # "2 x 400g cans", "1/2 cup + 2 tbsp"
+    if _CONJUNCTION.search(name):
+        confidence -= 0.3  # "salt and pepper" may be two items
+    if len(words) > 4:
+        confidence -= 0.3
+    return ParsedIngredient(
+        line=line,
+        name=name,
+        quantity=round(quantity, 3),
+        unit=unit,
+        confidence=round(max(confidence, 0.0), 2),
+        skip=name.lower() in SKIPPED_NAMES,
+    )
+
+
+def merge_parsed_ingredients(parsed: List[ParsedIngredient], ai_items: list,
+                             min_confidence: float = INGREDIENT_PARSE_MIN_CONFIDENCE) -> List[dict]:
+    """Items for every line, in input order: confident local parses as-is,
+    the model's answer for the rest, skipped lines omitted.
+
+    When the model answered one item per unresolved line, each goes back to
+    its line's position. Otherwise (it skipped or split lines) its items are
+    kept together where the first unresolved line was.
+    """
+    unresolved = [i for i, p in enumerate(parsed) if p.confidence < min_confidence]
+    placed = dict(zip(unresolved, ([item] for item in ai_items))) if len(ai_items) == len(unresolved) else {}
+    if not placed and unresolved:
+        placed[unresolved[0]] = list(ai_items)
+    items = []
+    for i, p in enumerate(parsed):
+        if p.confidence < min_confidence:
+            items.extend(placed.get(i, ()))
+        elif not p.skip:
+            items.append(p.as_item())
+    return items
@@ -0,0 +1,194 @@
+# backend/app/services/job_queue.py
+"""
+In-process job queue: run slow work off the request, keep the result around
+for a while, hand it to whoever asks with the job id.
+
+A recipe generation holds a connection for the whole ~4000-token OpenAI call,
+and if a phone drops off the network mid-call the answer is lost. Submitting
+it as a job returns an id right away. The work runs on a fixed pool of worker
+tasks, independent of any connection, and the finished job (result or error)
+stays in memory for `ttl` seconds. A client that reconnects polls with the id.
+A client that lost the id and re-submits the same request gets the existing
+job instead of a second paid call: jobs are deduplicated per owner by a
+caller-chosen key. Failed jobs aren't reused, so re-submitting one retries it.
+
+- `workers` bounds concurrency: that many jobs run at once per process.
+- `max_queued` bounds the backlog: past it, submit raises JobQueueFull (503
+  with Retry-After via job_queue_full_http_error) rather than queueing work
+  nobody will wait for.
+- Each job runs in a copy of the submitting request's contextvars, so
+  per-user accounting in openai_client (token budget, logging) still sees the
+  submitting user. The submitter disconnecting doesn't cancel it.
+
+Workers start with the first job and are stopped by shutdown() from the app
+lifespan; jobs still queued then fail with 503. Jobs live in one worker
+process, so with several uvicorn workers a poll has to reach the process that
+took the job (sticky sessions, or one worker).
+"""
+import asyncio
+import contextvars
+import logging
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from fastapi import HTTPException
+
+from app.services import disconnect, metrics
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+
+jobs_queued = metrics.registry.gauge("jobs_queued", "Jobs waiting for a worker.", ("queue",))
+jobs_running = metrics.registry.gauge("jobs_running", "Jobs being run.", ("queue",))
+jobs_finished = metrics.registry.counter("jobs_finished_total", "Finished jobs.", ("queue", "status"))
+jobs_rejected = metrics.registry.counter("jobs_rejected_total", "Submissions refused with a full queue.", ("queue",))
+
+
+class JobQueueFull(Exception):
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"job queue {name} is full")
+        self.retry_after = retry_after
+
+
+def job_queue_full_http_error(exc: JobQueueFull) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Too many requests in progress, please try again shortly",
+        headers={"Retry-After": str(max(1, int(exc.retry_after + 0.999)))},
+    )
+
+
+@dataclass
+class Job:
+    id: str
+    owner: Optional[str]
+    key: Hashable
+    run: Callable[[], Awaitable[Any]] = field(repr=False)
+    context: contextvars.Context = field(repr=False)
+    status: str = QUEUED
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    result: Any = None
+    # {"status_code": int, "detail": str} for failed jobs
+    error: Optional[dict] = None
+    done: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    def to_dict(self) -> dict:
+        body = {"job_id": self.id, "status": self.status, "created_at": self.created_at, "finished_at": self.finished_at}
+        if self.status == SUCCEEDED:
+            body["result"] = self.result
+        elif self.status == FAILED:
+            body["error"] = self.error
+        return body
+
+
+class JobQueue:
+    def __init__(self, name: str, workers: int, max_queued: int, ttl: float):
+        self.name = name
+        self.workers = workers
+        self.max_queued = max_queued
+        self.ttl = ttl
+        self._jobs: Dict[str, Job] = {}
+        self._by_key: Dict[Tuple[Optional[str], Hashable], str] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: list = []
+        # Recent run times, for a Retry-After that reflects how fast the queue drains.
+        self._avg_seconds = 10.0
+
+    def submit(self, owner: Optional[str], key: Hashable, run: Callable[[], Awaitable[Any]]) -> Tuple[Job, bool]:
+        """(job, created). An unexpired, not-failed job with the same owner and
+        key is returned instead of queueing `run()` again."""
+        self._prune()
+        existing = self._jobs.get(self._by_key.get((owner, key), ""))
+        if existing is not None and existing.status != FAILED:
+            return existing, False
+        queued = self._queue.qsize() if self._queue is not None else 0
+        if queued >= self.max_queued:
+            jobs_rejected.inc(queue=self.name)
+            raise JobQueueFull(self.name, retry_after=self._avg_seconds * (queued / max(self.workers, 1) + 1))
+        if self._queue is None:
+            self._start()
+        context = contextvars.copy_context()
+        context.run(disconnect.detach)
+        job = Job(id=uuid.uuid4().hex, owner=owner, key=key, run=run, context=context)
+        self._jobs[job.id] = job
+        self._by_key[(owner, key)] = job.id
+        self._queue.put_nowait(job)
+        jobs_queued.inc(queue=self.name)
+        return job, True
+
+    def get(self, job_id: str, owner: Optional[str]) -> Optional[Job]:
+        """The job, if it exists, hasn't expired and belongs to `owner`."""
+        self._prune()
+        job = self._jobs.get(job_id)
+        return job if job is not None and job.owner == owner else None
+
+    async def wait(self, job: Job, timeout: float) -> Job:
+        """Return once `job` has finished or `timeout` seconds have passed."""
+        if timeout > 0 and not job.done.is_set():
+            try:
+                await asyncio.wait_for(job.done.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return job
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self.ttl
+        expired = [j for j in self._jobs.values() if j.finished_at is not None and j.finished_at < cutoff]
+        for job in expired:
+            del self._jobs[job.id]
+            if self._by_key.get((job.owner, job.key)) == job.id:
+                del self._by_key[(job.owner, job.key)]
+
+    def _start(self) -> None:
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            jobs_queued.dec(queue=self.name)
+            jobs_running.inc(queue=self.name)
+            job.status = RUNNING
+            start = time.perf_counter()
+            try:
+                # The job's own task, so it runs in the submitter's context.
+                job.result = await asyncio.create_task(job.run(), context=job.context)
+                job.status = SUCCEEDED
+            except asyncio.CancelledError:
+                self._fail(job, 503, "Server restarting, please submit again")
+                raise
+            except HTTPException as e:
+                self._fail(job, e.status_code, e.detail)
+            except Exception:
+                logger.error("job %s failed", job.id, exc_info=True)
+                self._fail(job, 500, "Job failed")
+            finally:
+                jobs_running.dec(queue=self.name)
+                self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * (time.perf_counter() - start)
+                if job.finished_at is None:
+                    job.finished_at = time.time()
+                    job.done.set()
+                    jobs_finished.inc(queue=self.name, status=job.status)
+
+    def _fail(self, job: Job, status_code: int, detail: str) -> None:
+        job.status = FAILED
+        job.error = {"status_code": status_code, "detail": detail}
+
+    async def shutdown(self) -> None:
+        """Stop the workers; queued and running jobs fail with 503."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        while self._queue is not None and not self._queue.empty():
+            job = self._queue.get_nowait()
+            jobs_queued.dec(queue=self.name)
+            self._fail(job, 503, "Server restarting, please submit again")
+            job.finished_at = time.time()
+            job.done.set()
+            jobs_finished.inc(queue=self.name, status=job.status)
+        self._queue = None
+        self._tasks = []
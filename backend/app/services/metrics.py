@@ -0,0 +1,416 @@
+# backend/app/services/metrics.py
+"""
+In-process metrics registry with Prometheus text exposition (GET /metrics).
+
+Counters, gauges and histograms are plain dicts keyed by label values, and a
+lock guards each update. The request middleware in app.main feeds the HTTP
+metrics, and openai_client.log_openai_usage feeds the OpenAI ones.
+
+Multiple uvicorn workers: each worker is its own process with its own
+registry. If METRICS_MULTIPROC_DIR is set, every worker writes its snapshot
+to <dir>/<pid>.json every METRICS_FLUSH_SECONDS and on shutdown. A scrape,
+which any single worker may answer, writes its own snapshot and then merges
+all the files. Counters and histograms are summed across every file, so dead
+workers' totals don't vanish and rates stay monotonic. Gauges are summed
+over live processes only. Without the dir, /metrics reports this process
+alone, which is right for a single worker.
+
+Dead workers' files don't pile up: each scrape folds the counters and
+histograms of pids that are no longer running into <dir>/retired.json and
+deletes their files. A new process whose pid matches a leftover file (a
+restarted container reuses low pids) retires that file before its first
+write instead of overwriting the old totals. Both steps hold an flock on
+<dir>/.lock, so a concurrent scrape never sees a total counted twice or not
+at all.
+"""
+import asyncio
+import contextlib
+import fcntl
+import json
+import logging
+import math
+import os
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+MULTIPROC_DIR = os.getenv("METRICS_MULTIPROC_DIR", "")
+FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds. HTTP requests run from cheap reads to 60s+ recipe generation;
+# OpenAI calls are rarely under 100ms.
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 60, 120)
+OPENAI_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 90, 120)
+
+LabelKey = Tuple[str, ...]
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[LabelKey, object] = {}
+
+    def _key(self, labels: dict) -> LabelKey:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def samples(self) -> List[list]:
+        with self._lock:
+            return [[list(k), v] for k, v in self._values.items()]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = HTTP_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket (non-cumulative) counts; exposition accumulates them.
+                state = self._values[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["buckets"][i] += 1
+                    break
+            state["sum"] += value
+            state["count"] += 1
+
+    def samples(self) -> List[list]:
+        with self._lock:
+            return [[list(k), {"buckets": list(v["buckets"]), "sum": v["sum"], "count": v["count"]}]
+                    for k, v in self._values.items()]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = HTTP_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def snapshot(self) -> dict:
+        """This process's metrics as plain JSON-able data."""
+        metrics = {}
+        for m in self._metrics.values():
+            entry = {"kind": m.kind, "help": m.help, "labelnames": list(m.labelnames), "samples": m.samples()}
+            if isinstance(m, Histogram):
+                entry["buckets"] = list(m.buckets)
+            metrics[m.name] = entry
+        return {"pid": os.getpid(), "metrics": metrics}
+
+
+registry = Registry()
+
+# HTTP: `route` is the matched path template (/recipes/{id}), never the raw
+# path, so label cardinality stays bounded; unmatched paths share one label.
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency.", ("method", "route", "status"), HTTP_BUCKETS,
+)
+http_requests_in_flight = registry.gauge(
+    "http_requests_in_flight", "HTTP requests currently being served.", ("method",),
+)
+# OpenAI: `route` is the call-site label passed to openai_client (recipes.generate_recipes).
+openai_request_duration = registry.histogram(
+    "openai_request_duration_seconds", "OpenAI call latency, retries included.", ("route", "model"), OPENAI_BUCKETS,
+)
+openai_requests_in_flight = registry.gauge(
+    "openai_requests_in_flight", "OpenAI HTTP requests currently awaiting a response.", ("route",),
+)
+openai_tokens = registry.counter(
+    "openai_tokens_total", "OpenAI tokens billed.", ("route", "model", "kind"),
+)
+openai_cost_usd = registry.counter(
+    "openai_cost_usd_total", "Estimated OpenAI spend in USD (see MODEL_PRICES_PER_1M).", ("route", "model"),
+)
+openai_calls_coalesced = registry.counter(
+    "openai_calls_coalesced_total", "Chat completions that joined an identical in-flight call (see singleflight.py).", ("route",),
+)
+# Client disconnects (see disconnect.py). outcome: "cancelled" (the upstream
+# work was stopped) or "kept" (a coalesced waiter or a cache fill still needs it).
+http_requests_cancelled = registry.counter(
+    "http_requests_cancelled_total", "Requests abandoned mid-flight because the client disconnected.", ("route",),
+)
+openai_calls_cancelled = registry.counter(
+    "openai_calls_cancelled_total", "OpenAI calls whose caller went away.", ("route", "outcome"),
+)
+
+
+# ---------------------------------------------------------------------------
+# Multi-worker snapshots
+# ---------------------------------------------------------------------------
+
+RETIRED_FILE = "retired.json"
+
+# (directory, pid) pairs whose snapshot file this process has already written.
+_claimed: set = set()
+# The flusher (event loop) and /metrics (threadpool) both write this process's
+# snapshot; one at a time, so neither renames or truncates the other's temp file.
+_write_lock = threading.Lock()
+
+
+def _snapshot_path(directory: str, pid: int) -> str:
+    return os.path.join(directory, f"{pid}.json")
+
+
+def _write_json(path: str, data: dict) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+@contextlib.contextmanager
+def _dir_lock(directory: str) -> Iterator[None]:
+    fd = os.open(os.path.join(directory, ".lock"), os.O_CREAT | os.O_RDWR, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)
+
+
+def write_snapshot(directory: Optional[str] = None) -> None:
+    """Atomically replace this worker's snapshot file."""
+    directory = directory if directory is not None else MULTIPROC_DIR
+    if not directory:
+        return
+    snap = registry.snapshot()
+    path = _snapshot_path(directory, snap["pid"])
+    try:
+        with _write_lock:
+            os.makedirs(directory, exist_ok=True)
+            if (directory, snap["pid"]) not in _claimed:
+                # A file under our pid before our first write is a dead process's.
+                if os.path.exists(path):
+                    with _dir_lock(directory):
+                        _retire(directory, [path])
+                _claimed.add((directory, snap["pid"]))
+            _write_json(path, snap)
+    except OSError:
+        logger.warning("metrics snapshot write failed dir=%s", directory, exc_info=True)
+
+
+def _pid_alive(pid: Optional[int]) -> bool:
+    if not pid:
+        return False
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _load_snapshot(path: str) -> Optional[dict]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        # A torn or foreign file must not break the scrape.
+        logger.warning("metrics snapshot unreadable file=%s", os.path.basename(path))
+        return None
+
+
+def _read_snapshots(directory: str) -> Iterable[dict]:
+    try:
+        names = sorted(n for n in os.listdir(directory) if n.endswith(".json"))
+    except OSError:
+        return
+    for name in names:
+        snap = _load_snapshot(os.path.join(directory, name))
+        if snap is not None:
+            yield snap
+
+
+def merge_snapshots(snapshots: Iterable[dict]) -> dict:
+    """Sum counters/histograms over all snapshots, gauges over live pids only."""
+    merged: Dict[str, dict] = {}
+    for snap in snapshots:
+        alive = _pid_alive(snap.get("pid", 0))
+        for name, entry in snap.get("metrics", {}).items():
+            target = merged.setdefault(name, {**entry, "samples": {}})
+            if entry["kind"] == "gauge" and not alive:
+                continue
+            if entry["kind"] == "histogram" and entry.get("buckets") != target.get("buckets"):
+                # Bucket layout changed between deploys; older data can't be merged.
+                continue
+            for labels, value in entry["samples"]:
+                key = tuple(labels)
+                current = target["samples"].get(key)
+                if entry["kind"] == "histogram":
+                    if current is None:
+                        current = target["samples"][key] = {"buckets": [0] * len(value["buckets"]), "sum": 0.0, "count": 0}
+                    current["buckets"] = [a + b for a, b in zip(current["buckets"], value["buckets"])]
+                    current["sum"] += value["sum"]
+                    current["count"] += value["count"]
+                else:
+                    target["samples"][key] = (current or 0.0) + value
+    return merged
+
+
+def _retire(directory: str, paths: List[str]) -> None:
+    """Fold snapshot files into retired.json and delete them. Caller holds the lock."""
+    retired_path = os.path.join(directory, RETIRED_FILE)
+    loaded = [(p, _load_snapshot(p)) for p in paths]
+    loaded = [(p, snap) for p, snap in loaded if snap is not None]
+    if not loaded:
+        return
+    retired = None
+    if os.path.exists(retired_path):
+        retired = _load_snapshot(retired_path)
+        if retired is None:
+            return  # keep the dead files rather than lose what was already retired
+    merged = merge_snapshots(([retired] if retired else []) + [snap for _, snap in loaded])
+    metrics = {
+        name: {**entry, "samples": [[list(k), v] for k, v in entry["samples"].items()]}
+        for name, entry in merged.items()
+        if entry["kind"] != "gauge"
+    }
+    _write_json(retired_path, {"pid": None, "metrics": metrics})
+    for path, _ in loaded:
+        os.remove(path)
+
+
+def _retire_dead(directory: str) -> None:
+    """Move the totals of workers that have exited into retired.json. Caller holds the lock."""
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return
+    dead = []
+    for name in names:
+        stem, ext = os.path.splitext(name)
+        if ext == ".json" and stem.isdigit() and not _pid_alive(int(stem)):
+            dead.append(os.path.join(directory, name))
+    if dead:
+        try:
+            _retire(directory, dead)
+        except OSError:
+            logger.warning("metrics snapshot retire failed dir=%s", directory, exc_info=True)
+
+
+def collect() -> dict:
+    """Merged metrics for a scrape: every worker's with a multiproc dir, else ours."""
+    if MULTIPROC_DIR:
+        write_snapshot()
+        try:
+            with _dir_lock(MULTIPROC_DIR):
+                _retire_dead(MULTIPROC_DIR)
+                return merge_snapshots(_read_snapshots(MULTIPROC_DIR))
+        except OSError:
+            logger.warning("metrics snapshot lock failed dir=%s", MULTIPROC_DIR, exc_info=True)
+            return merge_snapshots(_read_snapshots(MULTIPROC_DIR))
+    return merge_snapshots([registry.snapshot()])
+
+
+# ---------------------------------------------------------------------------
+# Text exposition
+# ---------------------------------------------------------------------------
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def render(merged: Optional[dict] = None) -> str:
+    merged = collect() if merged is None else merged
+    lines = []
+    for name in sorted(merged):
+        entry = merged[name]
+        names = entry["labelnames"]
+        lines.append(f"# HELP {name} {entry['help']}")
+        lines.append(f"# TYPE {name} {entry['kind']}")
+        for key in sorted(entry["samples"]):
+            value = entry["samples"][key]
+            if entry["kind"] != "histogram":
+                lines.append(f"{name}{_labels(names, key)} {_format_value(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(entry["buckets"], value["buckets"]):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(names, key, ('le', _format_value(bound)))} {cumulative}")
+            lines.append(f"{name}_bucket{_labels(names, key, ('le', '+Inf'))} {value['count']}")
+            lines.append(f"{name}_sum{_labels(names, key)} {_format_value(value['sum'])}")
+            lines.append(f"{name}_count{_labels(names, key)} {value['count']}")
+    return "\n".join(lines) + "\n"
+
+
+async def flush_periodically() -> None:
+    """Lifespan task: keep this worker's snapshot fresh for other workers' scrapes."""
+    while True:
+        await asyncio.sleep(FLUSH_SECONDS)
+        write_snapshot()
@@ -0,0 +1,92 @@
+# backend/app/services/micro_batcher.py
+"""
+Cross-request micro-batching.
+
+Requests submitted under the same group key within `window` seconds are
+handed to `run_batch` together, so it can serve them with one upstream call.
+Each caller gets back its own result, or its own exception. A group is
+flushed when the window closes or when it reaches `max_size`, whichever
+comes first.
+
+The batcher knows nothing about OpenAI. openai_client decides what is
+compatible (the group key), how to merge a batch and how to split the answer,
+and falls back to individual calls when the merged answer doesn't parse.
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Tuple
+
+from app.services import metrics
+
+logger = logging.getLogger(__name__)
+
+micro_batches = metrics.registry.counter("micro_batches_total", "Merged calls made by a micro-batcher.", ("batcher",))
+# sent: batched (in a merged call), single (alone in its window), or fallback
+# (batched, but run_batch had to serve it on its own after all).
+micro_batch_items = metrics.registry.counter(
+    "micro_batch_items_total", "Requests submitted to a micro-batcher, by how they were sent.", ("batcher", "sent"),
+)
+
+
+class MicroBatcher:
+    def __init__(
+        self,
+        name: str,
+        window: float,
+        max_size: int,
+        run_batch: Callable[[List[Any]], Awaitable[List[Any]]],
+    ):
+        """`run_batch(items)` returns one result per item, in order; an item's
+        result may be an Exception instance, which is raised to that caller."""
+        self.name = name
+        self.window = window
+        self.max_size = max_size
+        self._run_batch = run_batch
+        self._pending: Dict[Hashable, List[Tuple[Any, asyncio.Future]]] = {}
+        self._timers: Dict[Hashable, asyncio.TimerHandle] = {}
+        self._tasks: set = set()
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0 and self.max_size > 1
+
+    async def submit(self, group: Hashable, item: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        batch = self._pending.setdefault(group, [])
+        batch.append((item, future))
+        if len(batch) >= self.max_size:
+            self._flush(group)
+        elif len(batch) == 1:
+            self._timers[group] = loop.call_later(self.window, self._flush, group)
+        # Shielded: a caller giving up must not cancel the batch for the others.
+        return await asyncio.shield(future)
+
+    def _flush(self, group: Hashable) -> None:
+        timer = self._timers.pop(group, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(group, None)
+        if not batch:
+            return
+        task = asyncio.ensure_future(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        if len(batch) > 1:
+            micro_batches.inc(batcher=self.name)
+            micro_batch_items.inc(len(batch), batcher=self.name, sent="batched")
+        else:
+            micro_batch_items.inc(batcher=self.name, sent="single")
+        try:
+            results = await self._run_batch([item for item, _ in batch])
+        except Exception as exc:
+            results = [exc] * len(batch)
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
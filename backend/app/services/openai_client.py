@@ -1,12 +1,28 @@
 # backend/app/services/openai_client.py
 import asyncio
+import hashlib
+import json
 import logging
 import os
 import time
+from typing import AsyncIterator, Optional
 
 import httpx
 from dotenv import load_dotenv
 
+from app.services.adaptive_limiter import get_limiter
+from app.services.circuit_breaker import get_breaker
+from app.services.disconnect import abandonable
+from app.services.cache_backends import build_backend
+from app.services.hedging import get_tracker, hedged
+from app.services.http_clients import UpstreamConfig, get_async_client, register_upstream
+from app.services import metrics
+from app.services.micro_batcher import MicroBatcher, micro_batch_items
+from app.services.retry_policy import backoff_delay, retry_after_seconds, retry_budget
+from app.services.singleflight import SingleFlight
+from app.services.token_budget import estimate_prompt_tokens, reserve_completion, reserve_upstream, reserve_user_share
+from app.services.token_sizing import choose_max_tokens, record_completion
+
 load_dotenv()
 logger = logging.getLogger(__name__)
 
@@ -15,7 +31,9 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 if not OPENAI_API_KEY:
     logger.warning("OPENAI_API_KEY not configured - AI endpoints will fail")
 
-OPENAI_CHAT_URL = "https://api.openai.com/v1/chat/completions"
+# Overridable so load tests can point at a local stand-in (devtools/fake_openai.py).
+OPENAI_CHAT_URL = os.getenv("OPENAI_CHAT_URL", "https://api.openai.com/v1/chat/completions")
+OPENAI_MODELS_URL = OPENAI_CHAT_URL.rsplit("/chat/completions", 1)[0] + "/models"
 MODEL = "gpt-4o-mini"  # Better at math and calculations
 
 # USD per 1M tokens (input, output) — OpenAI list prices as of 2026-07.
@@ -25,10 +43,75 @@ MODEL_PRICES_PER_1M = {
 }
 
 TIMEOUT = httpx.Timeout(connect=10.0, read=90.0, write=30.0, pool=10.0)
-MAX_RETRIES = 2  # retries after the first attempt
-RETRY_BACKOFF_SECONDS = 1.0
+MAX_RETRIES = 2  # retries after the first attempt (timing/budget: retry_policy.py)
 RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
 
+# One pooled keep-alive client for every chat completion (see http_clients.py).
+# max_connections caps concurrent in-flight OpenAI calls per worker.
+register_upstream("openai", UpstreamConfig(
+    timeout=TIMEOUT,
+    limits=httpx.Limits(max_connections=64, max_keepalive_connections=32, keepalive_expiry=120.0),
+    http2=True,
+    warm_url=OPENAI_MODELS_URL,
+))
+
+# Created eagerly so /health reports it before the first call.
+get_breaker("openai")
+
+# Short, interactive routes whose slow tail gets a hedged second attempt
+# (see hedging.py). Only cheap completions belong here: a hedge can double cost.
+HEDGED_ROUTES = {
+    "barcode.ai_clean_name",
+    "profile.generate_dietary_label",
+    "recipes.translate_recipe_names",
+}
+
+# Tiny completions that many users fire within the same second. With
+# OPENAI_MICRO_BATCH_WINDOW_MS > 0 (off by default), compatible calls on these
+# routes (same system prompt and temperature) are held that long and sent as
+# one merged completion (see micro_batcher.py and _run_micro_batch).
+MICRO_BATCH_ROUTES = {
+    "profile.generate_dietary_label",
+    "recipes.translate_recipe_names",
+}
+MICRO_BATCH_WINDOW_MS = float(os.getenv("OPENAI_MICRO_BATCH_WINDOW_MS", "0"))
+MICRO_BATCH_MAX_SIZE = int(os.getenv("OPENAI_MICRO_BATCH_MAX_SIZE", "8"))
+MICRO_BATCH_MAX_TOKENS = 4096
+MICRO_BATCH_INSTRUCTIONS = (
+    "\n\nBATCH MODE: the user message is a JSON object of {n} independent requests keyed "
+    "by id. Handle each one exactly as the instructions above describe, independently of "
+    "the others. Return ONLY a JSON object mapping every id to the complete answer you "
+    "would have given for that request alone, as a string."
+)
+
+# Identical in-flight payloads share one upstream call (see singleflight.py).
+_chat_flight = SingleFlight("openai.chat")
+
+# Completion cache: per-route opt-in, (ttl, stale-while-revalidate window) in
+# seconds. Only low-temperature routes whose prompts repeat across users
+# belong here — a cached answer is served to anyone sending the same payload.
+COMPLETION_CACHE_POLICIES = {
+    "recipes.parse_ingredients": (24 * 3600, 3600),
+    "pantry.match_ingredients": (3600, 600),
+    "profile.generate_dietary_label": (7 * 24 * 3600, 24 * 3600),
+    "recipes.translate_recipe_names": (7 * 24 * 3600, 24 * 3600),
+}
+# memory (per worker, default) | sqlite (shared by all workers on the host) | off
+COMPLETION_CACHE_BACKEND = os.getenv("COMPLETION_CACHE_BACKEND", "memory").lower()
+COMPLETION_CACHE_PATH = os.getenv("COMPLETION_CACHE_PATH", "completion_cache.sqlite3")
+COMPLETION_CACHE_MAX_BYTES = int(os.getenv("COMPLETION_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+_completion_cache = None
+# result: hit (fresh), stale (served while a refresh runs) or miss.
+completion_cache_requests = metrics.registry.counter(
+    "completion_cache_requests_total", "Completion-cache lookups on cached routes.", ("route", "result"),
+)
+completion_cache_refreshes = metrics.registry.counter(
+    "completion_cache_refreshes_total", "Background refreshes of stale completion-cache entries.", ("route",),
+)
+# Strong refs so background revalidation tasks aren't garbage-collected mid-flight.
+_background_tasks: set = set()
+
 
 def estimate_cost_usd(model: str, prompt_tokens: int, completion_tokens: int) -> float:
     """Estimate cost from the price table; dated model names match their base entry."""
@@ -42,11 +125,24 @@ def estimate_cost_usd(model: str, prompt_tokens: int, completion_tokens: int) ->
     return (prompt_tokens * prices[0] + completion_tokens * prices[1]) / 1_000_000
 
 
-def log_openai_usage(model: str, duration_ms: float, usage, route: str = "") -> None:
+def log_openai_usage(
+    model: str,
+    duration_ms: float,
+    usage,
+    route: str = "",
+    hedge: str = "",
+    finish_reason: str = "",
+    max_tokens: int = 0,
+    size_hint: Optional[float] = None,
+) -> None:
     """
     Log one INFO line per OpenAI call: model, latency, tokens, estimated cost, calling route.
     `usage` may be a dict (HTTP API) or an SDK CompletionUsage object.
     `route` identifies the endpoint/call site that triggered the request (e.g. "recipes.generate_recipes").
+    `hedge` is "winner"/"loser" for the two halves of a hedged call (see hedging.py), else "-".
+    Completions with a `finish_reason` also feed the route's max_tokens sizing
+    (see token_sizing.py); `max_tokens`/`size_hint` are what the call was sent with.
+    The same numbers feed the /metrics counters and latency histogram (metrics.py).
     """
     if usage is None:
         prompt_tokens = completion_tokens = total_tokens = 0
@@ -59,48 +155,299 @@ def log_openai_usage(model: str, duration_ms: float, usage, route: str = "") ->
         completion_tokens = getattr(usage, "completion_tokens", 0) or 0
         total_tokens = getattr(usage, "total_tokens", 0) or (prompt_tokens + completion_tokens)
 
+    cost_usd = estimate_cost_usd(model, prompt_tokens, completion_tokens)
     logger.info(
         "openai call route=%s model=%s duration_ms=%.0f prompt_tokens=%d completion_tokens=%d "
-        "total_tokens=%d est_cost_usd=%.6f",
+        "total_tokens=%d est_cost_usd=%.6f hedge=%s finish=%s",
         route or "-", model, duration_ms, prompt_tokens, completion_tokens, total_tokens,
-        estimate_cost_usd(model, prompt_tokens, completion_tokens),
+        cost_usd, hedge or "-", finish_reason or "-",
     )
+    labels = {"route": route or "-", "model": model}
+    # A hedge loser's latency is meaningless (it was cancelled), but its tokens were billed.
+    if hedge != "loser":
+        metrics.openai_request_duration.observe(duration_ms / 1000, **labels)
+    metrics.openai_tokens.inc(prompt_tokens, kind="prompt", **labels)
+    metrics.openai_tokens.inc(completion_tokens, kind="completion", **labels)
+    metrics.openai_cost_usd.inc(cost_usd, **labels)
+    if finish_reason and completion_tokens:
+        record_completion(route, completion_tokens, finish_reason, max_tokens, size_hint)
 
 
-async def _post_with_retry(payload: dict) -> dict:
-    """POST to the chat completions API, retrying connect errors, timeouts, 429 and 5xx."""
-    headers = {
+def _auth_headers() -> dict:
+    return {
         "Authorization": f"Bearer {OPENAI_API_KEY}",
         "Content-Type": "application/json",
     }
+
+
+async def _limited_post(payload: dict, headers: dict, route: str) -> httpx.Response:
+    """
+    One POST attempt, gated by the OpenAI circuit breaker (fails fast with
+    CircuitOpenError while it's open, even between retries) and holding a slot
+    in the route's adaptive limiter (see adaptive_limiter.py).
+    """
+    breaker = get_breaker("openai")
+    breaker.before_call()
+    limiter = get_limiter(route)
+    try:
+        await limiter.acquire()
+    except BaseException:
+        breaker.record_neutral()
+        raise
+    started = time.perf_counter()
+    overloaded = None
+    metrics.openai_requests_in_flight.inc(route=route or "-")
+    try:
+        r = await get_async_client("openai").post(OPENAI_CHAT_URL, headers=headers, json=payload)
+        overloaded = r.status_code in RETRY_STATUS_CODES
+        _record_status(breaker, r.status_code)
+        return r
+    except (httpx.ConnectError, httpx.TimeoutException):
+        overloaded = True
+        breaker.record_failure()
+        raise
+    except BaseException:
+        breaker.record_neutral()
+        raise
+    finally:
+        metrics.openai_requests_in_flight.dec(route=route or "-")
+        limiter.release(time.perf_counter() - started, overloaded)
+
+
+def _record_status(breaker, status_code: int) -> None:
+    if status_code >= 500:
+        breaker.record_failure()
+    elif status_code < 400:
+        breaker.record_success()
+    else:
+        breaker.record_neutral()  # 4xx/429: we were answered, the upstream isn't down
+
+
+def _plan_retry(attempt: int, previous: float, headers=None):
+    """Seconds to wait before retrying a failed attempt, or None to give up:
+    out of attempts, the server asked for too long a wait, or the process-wide
+    retry budget is spent."""
+    if attempt >= MAX_RETRIES:
+        return None
+    delay = backoff_delay(previous, retry_after_seconds(headers) if headers is not None else None)
+    if delay is None:
+        logger.warning("OpenAI asked to retry after more than the max wait; not retrying")
+        return None
+    if not retry_budget.try_spend():
+        logger.warning("OpenAI retry budget exhausted; not retrying")
+        return None
+    return delay
+
+
+async def _post_with_retry(payload: dict, route: str = "") -> dict:
+    """POST to the chat completions API, retrying connect errors, timeouts, 429 and 5xx
+    (Retry-After-aware, jittered, and bounded by the global retry budget)."""
+    headers = _auth_headers()
+    retry_budget.deposit()
+    delay = 0.0
     for attempt in range(MAX_RETRIES + 1):
         try:
-            async with httpx.AsyncClient(timeout=TIMEOUT) as client:
-                r = await client.post(OPENAI_CHAT_URL, headers=headers, json=payload)
-            if r.status_code in RETRY_STATUS_CODES and attempt < MAX_RETRIES:
-                logger.warning(
-                    "OpenAI HTTP %d, retrying (attempt %d/%d)",
-                    r.status_code, attempt + 1, MAX_RETRIES,
-                )
-                await asyncio.sleep(RETRY_BACKOFF_SECONDS * (2 ** attempt))
-                continue
-            r.raise_for_status()
-            return r.json()
+            r = await _limited_post(payload, headers, route)
         except (httpx.ConnectError, httpx.TimeoutException) as exc:
-            if attempt >= MAX_RETRIES:
+            delay = _plan_retry(attempt, delay)
+            if delay is None:
                 raise
             logger.warning(
-                "OpenAI request failed (%s: %s), retrying (attempt %d/%d)",
-                type(exc).__name__, exc, attempt + 1, MAX_RETRIES,
+                "OpenAI request failed (%s: %s), retrying in %.1fs (attempt %d/%d)",
+                type(exc).__name__, exc, delay, attempt + 1, MAX_RETRIES,
             )
-            await asyncio.sleep(RETRY_BACKOFF_SECONDS * (2 ** attempt))
+            await asyncio.sleep(delay)
+            continue
+        if r.status_code in RETRY_STATUS_CODES:
+            delay = _plan_retry(attempt, delay, r.headers)
+            if delay is not None:
+                logger.warning(
+                    "OpenAI HTTP %d, retrying in %.1fs (attempt %d/%d)",
+                    r.status_code, delay, attempt + 1, MAX_RETRIES,
+                )
+                await asyncio.sleep(delay)
+                continue
+        r.raise_for_status()
+        return r.json()
     raise RuntimeError("unreachable")  # loop always returns or raises
 
 
-async def call_chat_completion(system_prompt: str, user_prompt: str, max_tokens: int = 600, temperature: float = 0.7, route: str = ""):
+def payload_key(payload: dict) -> str:
+    """Canonical hash of a request payload: equal payloads hash equal regardless of key order."""
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def get_completion_cache():
+    """The configured completion cache backend, built on first use; None when disabled."""
+    global _completion_cache
+    if _completion_cache is None:
+        _completion_cache = build_backend(COMPLETION_CACHE_BACKEND, COMPLETION_CACHE_PATH, COMPLETION_CACHE_MAX_BYTES)
+    return _completion_cache
+
+
+def _extract_content(resp: dict) -> str:
+    choices = resp.get("choices", [])
+    if not choices:
+        return ""
+    return (choices[0].get("message", {}).get("content") or "").strip()
+
+
+async def _attempt(payload: dict, route: str):
+    """_post_with_retry timed and charged to the model's token budget (callers
+    reserved their own user shares in _complete; see token_budget.py);
+    successful latencies feed the route's hedging tracker."""
+    reservation = reserve_upstream(payload["model"], payload["messages"], payload["max_tokens"])
+    start = time.perf_counter()
+    try:
+        resp = await _post_with_retry(payload, route)
+    except asyncio.CancelledError:
+        # A cancelled hedge loser's prompt was still sent and billed.
+        reservation.settle(reservation.prompt_estimate)
+        raise
+    except BaseException:
+        reservation.settle(0)
+        raise
+    reservation.settle_usage(resp.get("usage"))
+    seconds = time.perf_counter() - start
+    get_tracker(route).record(seconds)
+    return resp, seconds
+
+
+def _finish_reason(resp: dict) -> str:
+    choices = resp.get("choices") or [{}]
+    return choices[0].get("finish_reason") or ""
+
+
+async def _timed_post(payload: dict, route: str, size_hint: Optional[float] = None) -> dict:
+    """One upstream call plus its usage log line. Coalesced waiters share the
+    result, so the call (and its cost) is logged exactly once."""
+    sizing = {"finish_reason": "", "max_tokens": payload.get("max_tokens") or 0, "size_hint": size_hint}
+    if route not in HEDGED_ROUTES:
+        resp, seconds = await _attempt(payload, route)
+        sizing["finish_reason"] = _finish_reason(resp)
+        log_openai_usage(resp.get("model", MODEL), seconds * 1000, resp.get("usage"), route=route, **sizing)
+        return resp
+
+    (resp, seconds), was_hedged = await hedged(route, lambda: _attempt(payload, route))
+    model, usage = resp.get("model", MODEL), resp.get("usage")
+    sizing["finish_reason"] = _finish_reason(resp)
+    log_openai_usage(model, seconds * 1000, usage, route=route, hedge="winner" if was_hedged else "", **sizing)
+    if was_hedged:
+        # The cancelled loser's prompt was sent and is billed; its partial
+        # completion isn't reported, so only the prompt side is logged.
+        prompt_tokens = (usage or {}).get("prompt_tokens") or 0
+        log_openai_usage(model, 0.0, {"prompt_tokens": prompt_tokens}, route=route, hedge="loser")
+    return resp
+
+
+def _micro_batch_group(payload: dict) -> Optional[tuple]:
+    """What a payload must share with others to be merged, or None if it can't be."""
+    messages = payload["messages"]
+    if len(messages) != 2 or "response_format" in payload:
+        return None
+    if not all(isinstance(m.get("content"), str) for m in messages):
+        return None
+    return (payload["model"], messages[0]["content"], payload.get("temperature"))
+
+
+async def _run_micro_batch(items: list) -> list:
+    """
+    Serve several (payload, route, size_hint) items with one merged completion:
+    the shared system prompt plus MICRO_BATCH_INSTRUCTIONS, and the user prompts
+    as a JSON object keyed by id. The merged call is logged (and budgeted) once,
+    as "<route>.batch". Items whose answer is missing or unparseable are retried
+    as individual calls; upstream errors on the merged call go to every caller.
+    """
+    if len(items) == 1:
+        return [await _timed_post(*items[0])]
+
+    first, route = items[0][0], items[0][1]
+    requests = {str(i + 1): payload["messages"][1]["content"] for i, (payload, _, _) in enumerate(items)}
+    merged = {
+        "model": first["model"],
+        "messages": [
+            {"role": "system", "content": first["messages"][0]["content"] + MICRO_BATCH_INSTRUCTIONS.format(n=len(items))},
+            {"role": "user", "content": json.dumps(requests, ensure_ascii=False)},
+        ],
+        "temperature": first.get("temperature"),
+        "max_tokens": min(MICRO_BATCH_MAX_TOKENS, sum(payload["max_tokens"] for payload, _, _ in items)),
+        "n": 1,
+        "response_format": {"type": "json_object"},
+    }
+    resp = await _timed_post(merged, f"{route}.batch")
+    answers = {}
+    if _finish_reason(resp) != "length":
+        try:
+            parsed = json.loads(_extract_content(resp))
+            answers = parsed if isinstance(parsed, dict) else {}
+        except json.JSONDecodeError:
+            pass
+
+    results, fallback = [], []
+    for i in range(len(items)):
+        answer = answers.get(str(i + 1))
+        if answer in (None, ""):
+            fallback.append(i)
+            results.append(None)
+            continue
+        if not isinstance(answer, str):
+            answer = json.dumps(answer, ensure_ascii=False)  # e.g. a JSON object answer left unquoted
+        results.append({
+            "model": resp.get("model", first["model"]),
+            "choices": [{"message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}],
+        })
+    _apportion_usage(resp.get("usage"), items, results)
+    if fallback:
+        micro_batch_items.inc(len(fallback), batcher=_micro_batcher.name, sent="fallback")
+        logger.warning(
+            "micro-batch answer unusable for %d/%d requests route=%s; calling individually",
+            len(fallback), len(items), route,
+        )
+        retried = await asyncio.gather(*(_timed_post(*items[i]) for i in fallback), return_exceptions=True)
+        for i, result in zip(fallback, retried):
+            results[i] = result
+    return results
+
+
+def _apportion_usage(usage: Optional[dict], items: list, results: list) -> None:
+    """Split the merged call's usage over its answered seats by their share of
+    the merged estimate, so each caller's budget is settled with its own part."""
+    usage = usage or {}
+    total = usage.get("total_tokens") or (usage.get("prompt_tokens") or 0) + (usage.get("completion_tokens") or 0)
+    if not total:
+        return  # each caller keeps its estimate
+    weights = [estimate_prompt_tokens(payload["messages"]) + payload["max_tokens"] for payload, _, _ in items]
+    for weight, result in zip(weights, results):
+        if result is not None:
+            result["usage"] = {"total_tokens": max(1, round(total * weight / sum(weights)))}
+
+
+_micro_batcher = MicroBatcher("openai.chat", MICRO_BATCH_WINDOW_MS / 1000, MICRO_BATCH_MAX_SIZE, _run_micro_batch)
+
+
+async def _dispatch(payload: dict, route: str, size_hint: Optional[float] = None) -> dict:
+    """_timed_post, or a seat in a micro-batch for opted-in routes. Runs inside
+    the shared flight, so it never touches user budgets: every caller reserved
+    its own share in _complete, and a batch's usage is apportioned back to them."""
+    group = None
+    if route in MICRO_BATCH_ROUTES and _micro_batcher.enabled:
+        group = _micro_batch_group(payload)
+    if group is None:
+        return await _timed_post(payload, route, size_hint)
+    return await _micro_batcher.submit((route, *group), (payload, route, size_hint))
+
+
+async def call_chat_completion(system_prompt: str, user_prompt: str, max_tokens: int = 600, temperature: float = 0.7, route: str = "", size_hint: Optional[float] = None):
     """
     Call the OpenAI Chat Completions HTTP API and return the assistant's content as text.
     `route` identifies the calling endpoint, for cost/usage logging (e.g. "recipes.generate_recipes").
+    `max_tokens` is a ceiling: the route's observed completion sizes, scaled by
+    `size_hint` (e.g. the number of ingredient lines), may lower it (see token_sizing.py).
+    Concurrent calls with byte-identical payloads share a single upstream request,
+    and routes listed in COMPLETION_CACHE_POLICIES are served from the completion cache.
+    Raises TokenBudgetExceeded without calling upstream when the user's or the
+    model's tokens-per-minute budget is spent.
     """
     payload = {
         "model": MODEL,
@@ -109,17 +456,262 @@ async def call_chat_completion(system_prompt: str, user_prompt: str, max_tokens:
             {"role": "user", "content": user_prompt}
         ],
         "temperature": temperature,
-        "max_tokens": max_tokens,
+        "max_tokens": choose_max_tokens(route, max_tokens, size_hint),
         "n": 1
     }
+    return await _complete(payload, route, size_hint)
+
+
+async def call_chat_messages(
+    messages: list,
+    model: str = MODEL,
+    max_tokens: int = 600,
+    temperature: Optional[float] = None,
+    response_format: Optional[dict] = None,
+    route: str = "",
+    size_hint: Optional[float] = None,
+) -> str:
+    """
+    call_chat_completion for callers that build their own message list — e.g.
+    vision calls whose user content mixes text and image_url parts. Same
+    transport: pooled client, limiter, breaker, retries, token budget, usage
+    logging, single-flight and (per-route opt-in) the completion cache.
+    `temperature` None leaves the API default.
+    """
+    payload = {"model": model, "messages": messages}
+    if temperature is not None:
+        payload["temperature"] = temperature
+    payload["max_tokens"] = choose_max_tokens(route, max_tokens, size_hint)
+    payload["n"] = 1
+    if response_format is not None:
+        payload["response_format"] = response_format
+    return await _complete(payload, route, size_hint)
+
+
+def _count_cancel(route: str):
+    return lambda outcome: metrics.openai_calls_cancelled.inc(route=route or "-", outcome=outcome)
+
+
+def _count_coalesced(route: str):
+    return lambda: metrics.openai_calls_coalesced.inc(route=route or "-")
+
+
+async def _complete(payload: dict, route: str, size_hint: Optional[float] = None) -> str:
+    key = payload_key(payload)
+    policy = COMPLETION_CACHE_POLICIES.get(route)
+    cache = get_completion_cache() if policy else None
+    if cache is not None:
+        entry = await cache.aget(key)
+        if entry is not None:
+            if entry.is_fresh(time.time()):
+                completion_cache_requests.inc(route=route, result="hit")
+            else:
+                # Serve the stale answer now; one background refresh (single-flight
+                # keyed like any other call) replaces it, so an expiring hot key
+                # never stampedes the upstream.
+                completion_cache_requests.inc(route=route, result="stale")
+                _revalidate(key, payload, route, policy, cache, size_hint)
+            logger.debug("completion cache hit route=%s fresh=%s", route, entry.is_fresh(time.time()))
+            return entry.value
+        completion_cache_requests.inc(route=route, result="miss")
+
+    # Checked in this caller's own context before it joins a shared call, so
+    # its refusal is raised here and never fans out to other waiters.
+    share = reserve_user_share(payload["model"], payload["messages"], payload["max_tokens"])
+    try:
+        with abandonable():
+            if cache is None:
+                resp = await _chat_flight.do(
+                    key, lambda: _dispatch(payload, route, size_hint),
+                    on_cancel=_count_cancel(route), on_coalesce=_count_coalesced(route),
+                )
+            else:
+                # A caller that disconnects stops waiting, but the fill runs on:
+                # the next caller with this payload gets it from the cache.
+                resp = await _chat_flight.do(
+                    key, lambda: _fetch_and_store(payload, route, key, policy, cache, size_hint),
+                    keep_running=True, on_cancel=_count_cancel(route), on_coalesce=_count_coalesced(route),
+                )
+    except asyncio.CancelledError:
+        share.settle(share.prompt_estimate)
+        raise
+    except BaseException:
+        share.settle(0)
+        raise
+    share.settle_usage(resp.get("usage"))
+    return _extract_content(resp)
+
+
+async def _fetch_and_store(payload: dict, route: str, key: str, policy: tuple, cache, size_hint=None) -> dict:
+    resp = await _dispatch(payload, route, size_hint)
+    content = _extract_content(resp)
+    if content and _finish_reason(resp) != "length":  # never cache an empty or truncated answer
+        ttl, stale_ttl = policy
+        await cache.aset(key, content, ttl, stale_ttl)
+    return resp
+
+
+def _revalidate(key: str, payload: dict, route: str, policy: tuple, cache, size_hint=None) -> None:
+    async def refresh():
+        if _chat_flight.is_in_flight(key):
+            return  # another stale hit's refresh started first
+        completion_cache_refreshes.inc(route=route)
+        try:
+            await _chat_flight.do(key, lambda: _fetch_and_store(payload, route, key, policy, cache, size_hint))
+        except Exception:
+            logger.warning("completion cache refresh failed route=%s", route, exc_info=True)
+
+    if _chat_flight.is_in_flight(key):
+        return  # a refresh (or a cold fill) for this key is already running
+    task = asyncio.ensure_future(refresh())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+async def _open_stream(payload: dict):
+    """
+    Start a streaming completion with the same retry policy as _post_with_retry,
+    applied up to the first byte: a retryable status, connect error or timeout
+    before the first SSE line arrives is retried; after that errors propagate.
+    Returns (response, line_iterator, first_line); the caller must close the response.
+    """
+    client = get_async_client("openai")
+    breaker = get_breaker("openai")
+    retry_budget.deposit()
+    delay = 0.0
+    for attempt in range(MAX_RETRIES + 1):
+        response = None
+        breaker.before_call()
+        try:
+            request = client.build_request("POST", OPENAI_CHAT_URL, headers=_auth_headers(), json=payload)
+            response = await client.send(request, stream=True)
+            _record_status(breaker, response.status_code)
+            if response.status_code in RETRY_STATUS_CODES:
+                delay = _plan_retry(attempt, delay, response.headers)
+                if delay is not None:
+                    await response.aclose()
+                    logger.warning(
+                        "OpenAI stream HTTP %d, retrying in %.1fs (attempt %d/%d)",
+                        response.status_code, delay, attempt + 1, MAX_RETRIES,
+                    )
+                    await asyncio.sleep(delay)
+                    continue
+            if response.is_error:
+                await response.aread()
+                response.raise_for_status()
+            lines = response.aiter_lines()
+            first_line = await anext(lines, None)
+            return response, lines, first_line
+        except (httpx.ConnectError, httpx.TimeoutException) as exc:
+            if response is not None:
+                await response.aclose()
+            else:
+                breaker.record_failure()
+            delay = _plan_retry(attempt, delay)
+            if delay is None:
+                raise
+            logger.warning(
+                "OpenAI stream failed (%s: %s), retrying in %.1fs (attempt %d/%d)",
+                type(exc).__name__, exc, delay, attempt + 1, MAX_RETRIES,
+            )
+            await asyncio.sleep(delay)
+        except BaseException:
+            if response is not None:
+                await response.aclose()
+            else:
+                breaker.record_neutral()
+            raise
+    raise RuntimeError("unreachable")  # loop always returns or raises
+
+
+async def stream_chat_completion(system_prompt: str, user_prompt: str, max_tokens: int = 600, temperature: float = 0.7, route: str = "", size_hint: Optional[float] = None) -> AsyncIterator[str]:
+    """
+    Streaming variant of call_chat_completion: an async generator yielding the
+    assistant's content deltas as they arrive (server-sent events).
+
+    Usage and estimated cost are logged through log_openai_usage once the
+    stream ends — including when the consumer stops early, in which case the
+    usage reported by OpenAI (sent only in the final event) may be missing.
+    Streams bypass single-flight and the completion cache.
+    """
+    payload = {
+        "model": MODEL,
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ],
+        "temperature": temperature,
+        "max_tokens": choose_max_tokens(route, max_tokens, size_hint),
+        "n": 1,
+        "stream": True,
+        # Ask for a final chunk carrying token usage so cost logging still works.
+        "stream_options": {"include_usage": True},
+    }
 
+    reservation = reserve_completion(MODEL, payload["messages"], payload["max_tokens"])
+    # The whole stream holds one limiter slot; time-to-first-byte is the
+    # latency signal, since total duration just tracks completion length.
+    limiter = get_limiter(route)
+    try:
+        await limiter.acquire()
+    except BaseException:
+        reservation.settle(0)
+        raise
     start = time.perf_counter()
-    resp = await _post_with_retry(payload)
-    duration_ms = (time.perf_counter() - start) * 1000
-    log_openai_usage(resp.get("model", MODEL), duration_ms, resp.get("usage"), route=route)
+    metrics.openai_requests_in_flight.inc(route=route or "-")
+    try:
+        with abandonable():
+            response, lines, line = await _open_stream(payload)
+    except httpx.HTTPStatusError as exc:
+        metrics.openai_requests_in_flight.dec(route=route or "-")
+        limiter.release(time.perf_counter() - start, exc.response.status_code in RETRY_STATUS_CODES)
+        reservation.settle(0)
+        raise
+    except (httpx.ConnectError, httpx.TimeoutException):
+        metrics.openai_requests_in_flight.dec(route=route or "-")
+        limiter.release(time.perf_counter() - start, True)
+        reservation.settle(0)
+        raise
+    except BaseException as exc:
+        if isinstance(exc, asyncio.CancelledError):
+            metrics.openai_calls_cancelled.inc(route=route or "-", outcome="cancelled")
+        metrics.openai_requests_in_flight.dec(route=route or "-")
+        limiter.release(time.perf_counter() - start, None)
+        reservation.settle(0)
+        raise
+    first_byte = time.perf_counter() - start
 
-    # safe extraction
-    choices = resp.get("choices", [])
-    if not choices:
-        return ""
-    return choices[0].get("message", {}).get("content", "").strip()
+    model, usage, finish_reason = MODEL, None, ""
+    overloaded = None
+    try:
+        while line is not None:
+            if line.startswith("data:"):
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                chunk = json.loads(data)
+                model = chunk.get("model") or model
+                usage = chunk.get("usage") or usage
+                for choice in chunk.get("choices") or []:
+                    finish_reason = choice.get("finish_reason") or finish_reason
+                    delta = (choice.get("delta") or {}).get("content")
+                    if delta:
+                        yield delta
+            line = await anext(lines, None)
+        overloaded = False
+    except httpx.TimeoutException:
+        overloaded = True
+        raise
+    except asyncio.CancelledError:
+        metrics.openai_calls_cancelled.inc(route=route or "-", outcome="cancelled")
+        raise
+    finally:
+        metrics.openai_requests_in_flight.dec(route=route or "-")
+        limiter.release(first_byte, overloaded)
+        # Without a usage event (consumer stopped early) the estimate stands.
+        reservation.settle_usage(usage)
+        await response.aclose()
+        log_openai_usage(
+            model, (time.perf_counter() - start) * 1000, usage, route=route,
+            finish_reason=finish_reason, max_tokens=payload["max_tokens"], size_hint=size_hint,
+        )
@@ -0,0 +1,51 @@
+# backend/app/services/ratio_budget.py
+"""
+Ratio budgets: cap "extra" work (hedges, retries) at a fraction of primary work.
+
+Every primary call deposits `ratio` tokens; every extra call withdraws one.
+A small floor (`min_per_second`, refilled continuously) keeps low-traffic
+processes from being starved entirely, and `max_tokens` caps how much can be
+banked during quiet periods — so a storm can't spend a day's savings at once.
+"""
+import threading
+import time
+
+
+class RatioBudget:
+    def __init__(self, ratio: float, min_per_second: float = 0.1, max_tokens: float = 10.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+        self._last = time.monotonic()
+        self.spent = 0
+        self.denied = 0
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.max_tokens, self._tokens + (now - self._last) * self.min_per_second)
+        self._last = now
+
+    def deposit(self) -> None:
+        """Record one primary call."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        """Take one token for an extra call; False (and counted) if the budget is exhausted."""
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                self.spent += 1
+                return True
+            self.denied += 1
+            return False
+
+    @property
+    def available(self) -> float:
+        with self._lock:
+            self._refill()
+            return self._tokens
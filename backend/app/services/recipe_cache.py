@@ -0,0 +1,108 @@
+# backend/app/services/recipe_cache.py
+"""
+Result cache for POST /recipes/, keyed on a canonical form of the request.
+
+The completion cache in openai_client only matches byte-identical payloads,
+and recipe prompts almost never are: the same pantry arrives in a different
+order, with different casing, or with duplicates. This cache keys on what
+actually shapes the answer:
+- the specific-recipe text, if any;
+- the ingredients, lowercased, whitespace-collapsed, deduplicated and sorted;
+- `strict`;
+- the dietary preference;
+- the prompt language;
+- the difficulty.
+It caches the parsed recipes, not the raw completion.
+
+Only complete answers (three real recipes) are stored. Entries expire after
+RECIPE_CACHE_TTL_SECONDS and are evicted LRU beyond RECIPE_CACHE_MAX_BYTES.
+
+RECIPE_CACHE_BACKEND=memory (per worker, default) | sqlite (shared by all
+workers on the host, at RECIPE_CACHE_PATH) | off.
+"""
+import hashlib
+import json
+import logging
+import os
+from typing import List, Optional, Sequence
+
+from app.services import metrics
+from app.services.cache_backends import build_backend
+
+logger = logging.getLogger(__name__)
+
+RECIPE_CACHE_BACKEND = os.getenv("RECIPE_CACHE_BACKEND", "memory").lower()
+RECIPE_CACHE_PATH = os.getenv("RECIPE_CACHE_PATH", "recipe_cache.sqlite3")
+RECIPE_CACHE_TTL_SECONDS = float(os.getenv("RECIPE_CACHE_TTL_SECONDS", str(6 * 3600)))
+RECIPE_CACHE_MAX_BYTES = int(os.getenv("RECIPE_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+# Bump when the prompt or the recipe shape changes so old entries stop matching.
+KEY_VERSION = "v1"
+
+_cache = None
+recipe_cache_requests = metrics.registry.counter(
+    "recipe_cache_requests_total", "POST /recipes/ result-cache lookups.", ("result",),
+)
+recipe_cache_stores = metrics.registry.counter("recipe_cache_stores_total", "Recipe sets written to the result cache.")
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.split()).lower()
+
+
+def canonical_request(
+    specific_recipe: Optional[str],
+    ingredients: Sequence[str],
+    strict: bool,
+    dietary: Optional[str],
+    language: str,
+    difficulty: Optional[str],
+) -> dict:
+    """The request as the cache sees it. `language` is the resolved prompt language."""
+    return {
+        "specific": _normalize(specific_recipe) if specific_recipe else "",
+        "ingredients": sorted({_normalize(i) for i in ingredients if i.strip()}),
+        "strict": bool(strict),
+        "dietary": _normalize(dietary) if dietary else "",
+        "language": language,
+        "difficulty": _normalize(difficulty) if difficulty else "",
+    }
+
+
+def recipe_cache_key(*args, **kwargs) -> str:
+    """Stable key over canonical_request(...)."""
+    canonical = json.dumps(canonical_request(*args, **kwargs), sort_keys=True, separators=(",", ":"))
+    return f"recipes:{KEY_VERSION}:" + hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def get_recipe_cache():
+    """The configured backend, built on first use; None when disabled."""
+    global _cache
+    if _cache is None:
+        _cache = build_backend(RECIPE_CACHE_BACKEND, RECIPE_CACHE_PATH, RECIPE_CACHE_MAX_BYTES)
+    return _cache
+
+
+async def lookup(key: str) -> Optional[List[dict]]:
+    """Cached recipes for `key`, or None. Never raises: a broken cache is a miss."""
+    cache = get_recipe_cache()
+    if cache is None:
+        return None
+    try:
+        entry = await cache.aget(key)
+        recipes = json.loads(entry.value) if entry is not None else None
+    except Exception:
+        logger.warning("recipe cache read failed", exc_info=True)
+        recipes = None
+    recipe_cache_requests.inc(result="hit" if recipes is not None else "miss")
+    return recipes
+
+
+async def store(key: str, recipes: List[dict]) -> None:
+    cache = get_recipe_cache()
+    if cache is None:
+        return
+    try:
+        await cache.aset(key, json.dumps(recipes), RECIPE_CACHE_TTL_SECONDS)
+        recipe_cache_stores.inc()
+    except Exception:
+        logger.warning("recipe cache write failed", exc_info=True)
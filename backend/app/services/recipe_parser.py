@@ -6,106 +6,223 @@ from typing import List, Dict, Any
 
 logger = logging.getLogger(__name__)
 
+def normalize_recipe(obj: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    One model-produced recipe object in the shape (and with the defaults)
+    parse_recipes_text returns.
+    """
+    return {
+        "name": str(obj.get("name", "")).strip(),
+        "ingredients": str(obj.get("ingredients", "")).strip(),
+        "instructions": str(obj.get("instructions", "")).strip(),
+        "prep_time": str(obj.get("prep_time", "15 min")).strip(),
+        "cook_time": str(obj.get("cook_time", "20 min")).strip(),
+        "difficulty": str(obj.get("difficulty", "Easy")).strip(),
+        "servings": str(obj.get("servings", "2")).strip(),
+        "nutrition": obj.get("nutrition", {
+            "calories": 300,
+            "protein": 15,
+            "carbs": 35,
+            "fat": 8,
+            "fiber": 5,
+            "sodium": 400
+        }),
+        "health_benefits": str(obj.get("health_benefits", "Nutritious and balanced meal")).strip(),
+        "budget_tip": str(obj.get("budget_tip", "Buy ingredients in bulk to save money")).strip()
+    }
+
+class IncrementalRecipeParser:
+    """
+    Streaming counterpart of parse_recipes_text's JSON path: feed() it the
+    completion in chunks and it returns each recipe, normalized, as soon as
+    its top-level object in the array closes.
+
+    Every character is looked at exactly once. Only the currently open object
+    is buffered, and json.loads runs once per finished object. Text before the
+    array (code fences, "Here are your recipes:") and after it is ignored, as
+    is a "[" that turns out to open prose rather than the array. Objects that
+    don't parse are skipped. Once `expected` recipes are out, the rest of the
+    input is ignored.
+    """
+
+    _OUTSIDE, _ARRAY, _OBJECT, _DONE = range(4)
+
+    def __init__(self, expected: int = 3):
+        self.expected = expected
+        self.count = 0
+        self._state = self._OUTSIDE
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._parts: List[str] = []
+
+    @property
+    def done(self) -> bool:
+        return self._state == self._DONE
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        recipes = []
+        i, n = 0, len(chunk)
+        while i < n and self._state != self._DONE:
+            if self._state == self._OBJECT:
+                i = self._scan_object(chunk, i, recipes)
+                continue
+            ch = chunk[i]
+            if self._state == self._OUTSIDE:
+                if ch == "[":
+                    self._state = self._ARRAY
+            elif ch == "{":
+                self._state, self._depth = self._OBJECT, 0
+                continue
+            elif ch == "]":
+                self._state = self._DONE
+            elif ch == "[":
+                pass  # "[[" — still waiting for the first object
+            elif not (ch.isspace() or ch == ","):
+                self._state = self._OUTSIDE  # that "[" was prose, not the array
+            i += 1
+        return recipes
+
+    def _scan_object(self, chunk: str, i: int, recipes: List[Dict[str, Any]]) -> int:
+        """Consume chunk[i:] up to the end of the open object; return the next index."""
+        start = i
+        depth, in_string, escaped = self._depth, self._in_string, self._escaped
+        for i in range(i, len(chunk)):
+            ch = chunk[i]
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif ch == "\\":
+                    escaped = True
+                elif ch == '"':
+                    in_string = False
+            elif ch == '"':
+                in_string = True
+            elif ch == "{":
+                depth += 1
+            elif ch == "}":
+                depth -= 1
+                if depth == 0:
+                    self._parts.append(chunk[start:i + 1])
+                    self._finish_object(recipes)
+                    return i + 1
+        self._parts.append(chunk[start:])
+        self._depth, self._in_string, self._escaped = depth, in_string, escaped
+        return len(chunk)
+
+    def _finish_object(self, recipes: List[Dict[str, Any]]) -> None:
+        text = "".join(self._parts)
+        self._parts = []
+        self._depth, self._in_string, self._escaped = 0, False, False
+        self._state = self._ARRAY
+        try:
+            obj = json.loads(text)
+        except ValueError:
+            logger.debug("skipping unparseable streamed recipe object")
+            return
+        if isinstance(obj, dict):
+            recipes.append(normalize_recipe(obj))
+            self.count += 1
+            if self.count >= self.expected:
+                self._state = self._DONE
+
+# Compiled once; parse_recipes_text runs on every recipe response.
+_FENCE_JSON = re.compile(r'```json\s*')
+_FENCE = re.compile(r'```\s*')
+_BLANK_LINE = re.compile(r"\n\s*\n")
+_NUMBERING = re.compile(r'^\d+\.\s*')
+
+# Keyword groups behind the non-JSON fallback's heuristics.
+_PROTEIN_WORDS = ('chicken', 'beef', 'fish', 'salmon', 'turkey')
+_CARB_WORDS = ('quinoa', 'rice', 'pasta', 'bread', 'oats')
+_FAT_WORDS = ('avocado', 'nuts', 'oil', 'butter', 'cheese')
+_FIBER_WORDS = ('beans', 'lentils', 'broccoli', 'spinach', 'kale')
+_VEGETABLE_WORDS = ('vegetables', 'salad', 'greens', 'tomato', 'cucumber')
+_BENEFITS = (
+    (('salmon', 'fish', 'omega'), "Rich in omega-3 fatty acids for heart health"),
+    (('spinach', 'kale', 'broccoli', 'greens'), "High in vitamins A, C, and K for immune support"),
+    (('quinoa', 'beans', 'lentils', 'protein'), "Complete protein source for muscle maintenance"),
+    (('berries', 'antioxidant', 'blueberries'), "Packed with antioxidants to fight inflammation"),
+    (('fiber', 'whole grain', 'oats'), "High fiber content supports digestive health"),
+    (('yogurt', 'probiotic', 'fermented'), "Contains probiotics for gut health"),
+)
+# Both heuristics read from one keyword set per text. That means one
+# lowercase and one probe per distinct keyword, instead of a lowercase and a
+# scan per heuristic. (A single regex over the text measured several times
+# slower than these C-level substring searches.)
+_KEYWORDS = tuple(sorted(set(
+    _PROTEIN_WORDS + _CARB_WORDS + _FAT_WORDS + _FIBER_WORDS + _VEGETABLE_WORDS
+    + tuple(w for words, _ in _BENEFITS for w in words)
+)))
+
+
+def _keywords_in(recipe_text: str) -> frozenset:
+    text = recipe_text.lower()
+    return frozenset(w for w in _KEYWORDS if w in text)
+
+
+def _recipes_from_json(candidate: str) -> List[Dict[str, Any]]:
+    """Normalized recipes from a JSON array string; [] if it isn't one (or has no objects)."""
+    parsed = json.loads(candidate)
+    if not isinstance(parsed, list):
+        return []
+    return [normalize_recipe(obj) for obj in parsed if isinstance(obj, dict)]
+
+
 def parse_recipes_text(text: str, expected: int = 3) -> List[Dict[str, Any]]:
     """
     Enhanced parser for detailed recipes with nutrition information.
+
+    Tries, in order: the whole text as a JSON array, the span from its first
+    "[" to its last "]" as one, then blank-line-separated prose blocks with
+    estimated nutrition. benchmarks/recipe_parser.py pins its output and speed
+    against the original implementation.
     """
     text = (text or "").strip()
     if not text:
         return []
 
     # Remove markdown code blocks if present
-    text = re.sub(r'```json\s*', '', text)
-    text = re.sub(r'```\s*', '', text)
-    text = text.strip()
+    if "```" in text:
+        text = _FENCE.sub('', _FENCE_JSON.sub('', text)).strip()
 
-    # 1) JSON attempt - try to find JSON array
+    # 1) JSON attempt - the whole text, then the widest [...] span inside it
     try:
-        # Try direct parse first
-        parsed = json.loads(text)
-        if isinstance(parsed, list):
-            results = []
-            for obj in parsed:
-                if isinstance(obj, dict):
-                    # Enhanced recipe object with nutrition and health data
-                    recipe = {
-                        "name": str(obj.get("name", "")).strip(),
-                        "ingredients": str(obj.get("ingredients", "")).strip(),
-                        "instructions": str(obj.get("instructions", "")).strip(),
-                        "prep_time": str(obj.get("prep_time", "15 min")).strip(),
-                        "cook_time": str(obj.get("cook_time", "20 min")).strip(),
-                        "difficulty": str(obj.get("difficulty", "Easy")).strip(),
-                        "servings": str(obj.get("servings", "2")).strip(),
-                        "nutrition": obj.get("nutrition", {
-                            "calories": 300,
-                            "protein": 15,
-                            "carbs": 35,
-                            "fat": 8,
-                            "fiber": 5,
-                            "sodium": 400
-                        }),
-                        "health_benefits": str(obj.get("health_benefits", "Nutritious and balanced meal")).strip(),
-                        "budget_tip": str(obj.get("budget_tip", "Buy ingredients in bulk to save money")).strip()
-                    }
-                    results.append(recipe)
-            if results:
-                return results[:expected]
+        results = _recipes_from_json(text)
+        if results:
+            return results[:expected]
     except Exception as e:
         # Expected when the model returns non-JSON text; fallbacks below handle it.
         logger.debug("recipe JSON parse failed, using fallback: %s", e)
 
-    # Try to extract JSON from text if it's embedded
-    json_match = re.search(r'\[[\s\S]*\]', text)
-    if json_match:
+    start, end = text.find('['), text.rfind(']')
+    # Same span as a greedy r'\[[\s\S]*\]' search; skipped when it's the text
+    # already tried above.
+    if 0 <= start < end and (start, end) != (0, len(text) - 1):
         try:
-            parsed = json.loads(json_match.group(0))
-            if isinstance(parsed, list):
-                results = []
-                for obj in parsed:
-                    if isinstance(obj, dict):
-                        recipe = {
-                            "name": str(obj.get("name", "")).strip(),
-                            "ingredients": str(obj.get("ingredients", "")).strip(),
-                            "instructions": str(obj.get("instructions", "")).strip(),
-                            "prep_time": str(obj.get("prep_time", "15 min")).strip(),
-                            "cook_time": str(obj.get("cook_time", "20 min")).strip(),
-                            "difficulty": str(obj.get("difficulty", "Easy")).strip(),
-                            "servings": str(obj.get("servings", "2")).strip(),
-                            "nutrition": obj.get("nutrition", {
-                                "calories": 300,
-                                "protein": 15,
-                                "carbs": 35,
-                                "fat": 8,
-                                "fiber": 5,
-                                "sodium": 400
-                            }),
-                            "health_benefits": str(obj.get("health_benefits", "Nutritious and balanced meal")).strip(),
-                            "budget_tip": str(obj.get("budget_tip", "Buy ingredients in bulk to save money")).strip()
-                        }
-                        results.append(recipe)
-                if results:
-                    return results[:expected]
+            results = _recipes_from_json(text[start:end + 1])
+            if results:
+                return results[:expected]
         except Exception:
             pass
 
     # 2) Fallback parsing with estimated nutrition
-    blocks = [b.strip() for b in re.split(r"\n\s*\n", text) if b.strip()]
+    blocks = [b.strip() for b in _BLANK_LINE.split(text) if b.strip()]
     results = []
-    
+
     for i, block in enumerate(blocks):
         if ":" in block:
             lines = block.splitlines()
             first = lines[0]
             if ":" in first:
                 name_part, rest = first.split(":", 1)
-                name = name_part.strip()
                 # Remove any numbering
-                name = re.sub(r'^\d+\.\s*', '', name)
+                name = _NUMBERING.sub('', name_part.strip())
                 instr = rest.strip() + ("\n" + "\n".join(lines[1:]).strip() if len(lines) > 1 else "")
             else:
                 parts = block.split(":", 1)
                 if len(parts) == 2:
-                    name = re.sub(r'^\d+\.\s*', '', parts[0].strip())
+                    name = _NUMBERING.sub('', parts[0].strip())
                     instr = parts[1].strip()
                 else:
                     name = f"Healthy Recipe {i+1}"
@@ -113,15 +230,16 @@ def parse_recipes_text(text: str, expected: int = 3) -> List[Dict[str, Any]]:
         else:
             lines = block.splitlines()
             if lines and len(lines[0].split()) <= 6 and len(lines) > 1:
-                name = re.sub(r'^\d+\.\s*', '', lines[0].strip())
+                name = _NUMBERING.sub('', lines[0].strip())
                 instr = "\n".join(lines[1:]).strip()
             else:
                 name = f"Healthy Recipe {i+1}"
                 instr = block
 
-        # Generate estimated nutrition based on recipe content
-        estimated_nutrition = estimate_nutrition(f"{name} {instr}")
-        
+        # Generate estimated nutrition based on recipe content; both
+        # heuristics share one keyword scan.
+        found = _keywords_in(f"{name} {instr}")
+
         recipe = {
             "name": name,
             "ingredients": "See instructions for ingredient list",
@@ -130,12 +248,12 @@ def parse_recipes_text(text: str, expected: int = 3) -> List[Dict[str, Any]]:
             "cook_time": "20 min",
             "difficulty": "Easy",
             "servings": "2",
-            "nutrition": estimated_nutrition,
-            "health_benefits": generate_health_benefits(f"{name} {instr}"),
+            "nutrition": _nutrition_for(found),
+            "health_benefits": _benefits_for(found),
             "budget_tip": "Use seasonal ingredients and buy in bulk for savings"
         }
         results.append(recipe)
-    
+
     if results:
         return results[:expected]
 
@@ -164,8 +282,9 @@ def estimate_nutrition(recipe_text: str) -> Dict[str, int]:
     """
     Estimate nutrition based on ingredients mentioned in recipe.
     """
-    text = recipe_text.lower()
-    
+    return _nutrition_for(_keywords_in(recipe_text))
+
+def _nutrition_for(found: frozenset) -> Dict[str, int]:
     # Base nutrition values
     calories = 250
     protein = 12
@@ -173,28 +292,28 @@ def estimate_nutrition(recipe_text: str) -> Dict[str, int]:
     fat = 6
     fiber = 4
     sodium = 350
-    
+
     # Adjust based on ingredients
-    if any(word in text for word in ['chicken', 'beef', 'fish', 'salmon', 'turkey']):
+    if not found.isdisjoint(_PROTEIN_WORDS):
         protein += 15
         calories += 100
-    
-    if any(word in text for word in ['quinoa', 'rice', 'pasta', 'bread', 'oats']):
+
+    if not found.isdisjoint(_CARB_WORDS):
         carbs += 20
         calories += 80
-        
-    if any(word in text for word in ['avocado', 'nuts', 'oil', 'butter', 'cheese']):
+
+    if not found.isdisjoint(_FAT_WORDS):
         fat += 8
         calories += 70
-        
-    if any(word in text for word in ['beans', 'lentils', 'broccoli', 'spinach', 'kale']):
+
+    if not found.isdisjoint(_FIBER_WORDS):
         fiber += 6
         protein += 5
-        
-    if any(word in text for word in ['vegetables', 'salad', 'greens', 'tomato', 'cucumber']):
+
+    if not found.isdisjoint(_VEGETABLE_WORDS):
         fiber += 3
         calories -= 30
-        
+
     return {
         "calories": max(calories, 150),
         "protein": max(protein, 5),
@@ -208,28 +327,12 @@ def generate_health_benefits(recipe_text: str) -> str:
     """
     Generate health benefits based on ingredients.
     """
-    text = recipe_text.lower()
-    benefits = []
-    
-    if any(word in text for word in ['salmon', 'fish', 'omega']):
-        benefits.append("Rich in omega-3 fatty acids for heart health")
-        
-    if any(word in text for word in ['spinach', 'kale', 'broccoli', 'greens']):
-        benefits.append("High in vitamins A, C, and K for immune support")
-        
-    if any(word in text for word in ['quinoa', 'beans', 'lentils', 'protein']):
-        benefits.append("Complete protein source for muscle maintenance")
-        
-    if any(word in text for word in ['berries', 'antioxidant', 'blueberries']):
-        benefits.append("Packed with antioxidants to fight inflammation")
-        
-    if any(word in text for word in ['fiber', 'whole grain', 'oats']):
-        benefits.append("High fiber content supports digestive health")
-        
-    if any(word in text for word in ['yogurt', 'probiotic', 'fermented']):
-        benefits.append("Contains probiotics for gut health")
-    
+    return _benefits_for(_keywords_in(recipe_text))
+
+def _benefits_for(found: frozenset) -> str:
+    benefits = [benefit for words, benefit in _BENEFITS if not found.isdisjoint(words)]
+
     if not benefits:
         benefits = ["Balanced nutrition with quality ingredients", "Supports overall health and wellness"]
-    
-    return ". ".join(benefits[:3]) + "."
\ No newline at end of file
+
+    return ". ".join(benefits[:3]) + "."
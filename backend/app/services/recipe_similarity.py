@@ -0,0 +1,241 @@
+# backend/app/services/recipe_similarity.py
+"""
+Near-duplicate lookup for POST /recipes/: find a cached answer for a pantry
+that differs from the request by a staple or two.
+
+The recipe cache (recipe_cache.py) only matches identical canonical requests.
+But pantries mostly differ by things like salt or oil: {chicken, rice,
+broccoli, garlic, oil} and the same set plus salt (Jaccard 5/6 = 0.83) would
+get practically the same three recipes. This index remembers the ingredient
+set of every stored answer and finds earlier ones whose Jaccard similarity to
+a new request is at least RECIPE_SIMILARITY_THRESHOLD (default 0.75). Swapping
+one ingredient of five for another (4/6 = 0.67) is deliberately not close
+enough; in larger pantries a swap or two still is (8 of 9: 8/10 = 0.8).
+
+- MinHash: each ingredient set becomes NUM_PERM minimum hashes. The share of
+  positions two signatures agree on estimates their Jaccard similarity.
+- LSH: signatures are cut into BANDS bands of ROWS hashes. Sets that agree on
+  a whole band land in the same bucket, so a query only compares against its
+  bucket-mates, never the whole index. With 16 bands of 4 rows, a pair at
+  Jaccard 0.75 shares a bucket with probability ~0.998, and a pair at 0.3 with
+  ~0.12.
+- Candidates are then checked against their exact Jaccard similarity; the
+  estimate only decides who gets checked.
+
+Buckets are partitioned by everything else that shapes the answer (language,
+dietary preference, difficulty, strict), so a vegan Spanish request never
+matches an English one. Specific-recipe requests ("chicken tikka masala with
+...") aren't indexed. In strict mode a match must also not use ingredients
+the caller doesn't have, i.e. its set must be a subset of the request's.
+
+The index holds signatures and cache keys, not recipes: the recipes are read
+from the recipe cache, and an entry whose recipes have expired or been evicted
+is dropped from the index when a query finds it. At most
+RECIPE_SIMILARITY_MAX_ENTRIES entries are kept (LRU), about 2.5 KB each for
+a typical pantry. 0 disables the index. It lives in each worker's memory, so
+workers sharing a sqlite recipe cache only find near-duplicates they stored
+themselves.
+
+Callers opt in (POST /recipes/?similar=true). Lookups are counted in
+recipe_similarity_lookups_total{result} on /metrics.
+"""
+import hashlib
+import json
+import logging
+import os
+import random
+import struct
+import threading
+from collections import OrderedDict
+from typing import FrozenSet, List, Optional, Tuple
+
+from app.services import metrics, recipe_cache
+
+logger = logging.getLogger(__name__)
+
+RECIPE_SIMILARITY_THRESHOLD = float(os.getenv("RECIPE_SIMILARITY_THRESHOLD", "0.75"))
+RECIPE_SIMILARITY_MAX_ENTRIES = int(os.getenv("RECIPE_SIMILARITY_MAX_ENTRIES", "5000"))
+
+BANDS = 16
+ROWS = 4
+NUM_PERM = BANDS * ROWS
+_PRIME = (1 << 61) - 1
+_rng = random.Random(20240611)  # fixed: signatures must agree across restarts and workers
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+_index = None
+recipe_similarity_lookups = metrics.registry.counter(
+    "recipe_similarity_lookups_total", "Near-duplicate recipe lookups (POST /recipes/?similar=true).", ("result",),
+)
+recipe_similarity_entries = metrics.registry.gauge(
+    "recipe_similarity_entries", "Pantries in the near-duplicate index.",
+)
+
+
+def _token_hash(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+_BAND = struct.Struct(f">9s{ROWS}Q")  # partition digest + band number, the band's rows
+
+
+def _bucket_ids(partition: str, signature: Tuple[int, ...]) -> list:
+    # blake2b, not hash(): str hashing is salted per process (PYTHONHASHSEED),
+    # and bucket ids must agree across restarts and workers like the signatures.
+    prefix = hashlib.blake2b(partition.encode("utf-8"), digest_size=8).digest()
+    return [
+        int.from_bytes(hashlib.blake2b(
+            _BAND.pack(prefix + bytes([band]), *signature[band * ROWS:(band + 1) * ROWS]), digest_size=8,
+        ).digest(), "big")
+        for band in range(BANDS)
+    ]
+
+
+def minhash(tokens: FrozenSet[str]) -> Tuple[int, ...]:
+    """NUM_PERM-long MinHash signature of a non-empty token set."""
+    hashes = [_token_hash(t) for t in tokens]
+    return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS)
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+class SimilarityIndex:
+    """LRU-bounded MinHash/LSH index of token sets, partitioned by a string."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        # key -> (partition, tokens, bucket ids)
+        self._entries: "OrderedDict[str, tuple[str, FrozenSet[str], list]]" = OrderedDict()
+        # bucket id -> key, or a set of keys once a second one lands there.
+        # Most buckets hold a single entry, and a bare str is a fraction of
+        # an empty set's size.
+        self._buckets: dict = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _bands(partition: str, tokens: FrozenSet[str]) -> list:
+        """One bucket id per band. Hashed down to an int to keep entries small;
+        a collision only adds a candidate that the exact check rejects."""
+        return _bucket_ids(partition, minhash(tokens))
+
+    def add(self, key: str, partition: str, tokens: FrozenSet[str]) -> None:
+        if not tokens or self.max_entries <= 0:
+            return
+        bands = self._bands(partition, tokens)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (partition, tokens, bands)
+            for bucket in bands:
+                current = self._buckets.get(bucket)
+                if current is None or current == key:
+                    self._buckets[bucket] = key
+                elif isinstance(current, str):
+                    self._buckets[bucket] = {current, key}
+                else:
+                    current.add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def query(self, partition: str, tokens: FrozenSet[str], threshold: float) -> List[Tuple[float, str, FrozenSet[str]]]:
+        """(similarity, key, tokens) for entries at or above `threshold`, most similar first."""
+        if not tokens:
+            return []
+        bands = self._bands(partition, tokens)
+        with self._lock:
+            candidates = set()
+            for bucket in bands:
+                current = self._buckets.get(bucket)
+                if isinstance(current, str):
+                    candidates.add(current)
+                elif current:
+                    candidates |= current
+            matches = []
+            for key in candidates:
+                similarity = jaccard(tokens, self._entries[key][1])
+                if similarity >= threshold:
+                    matches.append((similarity, key, self._entries[key][1]))
+                    self._entries.move_to_end(key)
+        return sorted(matches, key=lambda m: m[0], reverse=True)
+
+    def remove(self, key: str) -> None:
+        with self._lock:
+            self._remove(key)
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for bucket in entry[2]:
+            current = self._buckets[bucket]
+            if isinstance(current, str):
+                del self._buckets[bucket]
+            else:
+                current.discard(key)
+                if len(current) == 1:
+                    self._buckets[bucket] = current.pop()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def bucket_count(self) -> int:
+        return len(self._buckets)
+
+
+def get_similarity_index() -> SimilarityIndex:
+    global _index
+    if _index is None:
+        _index = SimilarityIndex(RECIPE_SIMILARITY_MAX_ENTRIES)
+    return _index
+
+
+def _partition_and_tokens(*args, **kwargs) -> Optional[Tuple[str, FrozenSet[str], bool]]:
+    """(partition, ingredient tokens, strict) for recipe_cache_key's arguments;
+    None for requests that aren't indexed."""
+    canonical = recipe_cache.canonical_request(*args, **kwargs)
+    if canonical["specific"] or not canonical["ingredients"]:
+        return None
+    partition = json.dumps([canonical["language"], canonical["dietary"], canonical["difficulty"], canonical["strict"]])
+    return partition, frozenset(canonical["ingredients"]), canonical["strict"]
+
+
+def remember(cache_key: str, *args, **kwargs) -> None:
+    """Index the request whose recipes were just stored under `cache_key`."""
+    request = _partition_and_tokens(*args, **kwargs)
+    if request is not None and recipe_cache.get_recipe_cache() is not None:
+        index = get_similarity_index()
+        index.add(cache_key, request[0], request[1])
+        recipe_similarity_entries.set(len(index))
+
+
+async def find_similar(*args, **kwargs) -> Optional[Tuple[List[dict], float]]:
+    """(recipes, similarity) of the closest cached near-duplicate, or None.
+
+    Takes recipe_cache_key's arguments. Never raises: a broken cache is a miss.
+    """
+    request = _partition_and_tokens(*args, **kwargs)
+    if request is None:
+        return None
+    partition, tokens, strict = request
+    index = get_similarity_index()
+    found = None
+    for similarity, key, matched in index.query(partition, tokens, RECIPE_SIMILARITY_THRESHOLD):
+        if strict and not matched <= tokens:
+            continue  # would use ingredients the caller doesn't have
+        try:
+            cache = recipe_cache.get_recipe_cache()
+            entry = await cache.aget(key) if cache is not None else None
+            recipes = json.loads(entry.value) if entry is not None else None
+        except Exception:
+            logger.warning("recipe cache read failed", exc_info=True)
+            continue
+        if recipes is None:
+            index.remove(key)  # expired or evicted from the recipe cache
+            recipe_similarity_entries.set(len(index))
+            continue
+        found = (recipes, similarity)
+        break
+    recipe_similarity_lookups.inc(result="hit" if found else "miss")
+    return found
@@ -0,0 +1,82 @@
+# backend/app/services/retry_policy.py
+"""
+Retry timing and budgeting for OpenAI calls.
+
+- Server hints first: `retry-after-ms` / `Retry-After` (seconds or HTTP date),
+  then the `x-ratelimit-reset-*` header for whichever limit is exhausted.
+  A hint longer than MAX_RETRY_AFTER_SECONDS means "give up now" — holding a
+  worker that long is worse than failing the request.
+- Otherwise decorrelated jitter: sleep = min(cap, uniform(base, previous * 3)),
+  so callers that failed together don't retry in lockstep.
+- A process-wide RatioBudget caps retries at OPENAI_RETRY_BUDGET_RATIO of
+  first attempts, so a 429 storm can't triple the load we send upstream.
+"""
+import email.utils
+import os
+import random
+import re
+import time
+from typing import Mapping, Optional
+
+from app.services.ratio_budget import RatioBudget
+
+RETRY_BASE_SECONDS = 1.0
+RETRY_CAP_SECONDS = 20.0
+MAX_RETRY_AFTER_SECONDS = float(os.getenv("OPENAI_MAX_RETRY_AFTER_SECONDS", "30"))
+
+retry_budget = RatioBudget(
+    ratio=float(os.getenv("OPENAI_RETRY_BUDGET_RATIO", "0.1")),
+    min_per_second=0.2,
+    max_tokens=10.0,
+)
+
+# OpenAI reset durations look like "1s", "6m0s", "20ms", "1h2m3.5s".
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_UNIT_SECONDS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def _parse_duration(value: str) -> Optional[float]:
+    parts = _DURATION_PART.findall(value.strip())
+    if not parts:
+        return None
+    return sum(float(n) * _UNIT_SECONDS[unit] for n, unit in parts)
+
+
+def retry_after_seconds(headers: Mapping[str, str]) -> Optional[float]:
+    """The server's requested wait in seconds, or None if it didn't say."""
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return max(0.0, float(value) / 1000)
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            try:
+                return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    waits = []
+    for limit in ("requests", "tokens"):
+        if headers.get(f"x-ratelimit-remaining-{limit}") == "0":
+            reset = headers.get(f"x-ratelimit-reset-{limit}")
+            seconds = _parse_duration(reset) if reset else None
+            if seconds is not None:
+                waits.append(seconds)
+    return max(waits) if waits else None
+
+
+def backoff_delay(previous: float, retry_after: Optional[float] = None) -> Optional[float]:
+    """
+    Seconds to sleep before the next attempt, or None if we shouldn't retry.
+    `previous` is the last delay used (0 before the first retry).
+    """
+    if retry_after is not None:
+        if retry_after > MAX_RETRY_AFTER_SECONDS:
+            return None
+        # A little jitter on top so everyone told "1s" doesn't return together.
+        return retry_after + random.uniform(0, RETRY_BASE_SECONDS / 4)
+    return min(RETRY_CAP_SECONDS, random.uniform(RETRY_BASE_SECONDS, max(previous, RETRY_BASE_SECONDS) * 3))
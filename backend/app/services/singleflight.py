@@ -0,0 +1,93 @@
+# backend/app/services/singleflight.py
+"""
+Single-flight coalescing: concurrent callers asking for the same key share one
+in-flight execution instead of each starting their own.
+
+Used by openai_client to collapse identical chat-completion payloads
+(double-taps on "Generate", mobile retries, synchronized "Cook What's
+Expiring" bursts) into a single upstream call whose result — or exception —
+is fanned out to every waiter.
+
+The shared work runs as its own task so one waiter being cancelled doesn't
+cancel it for the others; it is only cancelled once the last waiter leaves,
+and not even then with keep_running=True (work whose result is stored for
+later callers, e.g. a completion-cache fill).
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Per-key in-flight deduplication."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[str, _Call] = {}
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def is_in_flight(self, key: str) -> bool:
+        call = self._calls.get(key)
+        return call is not None and not call.task.done()
+
+    async def do(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[Any]],
+        keep_running: bool = False,
+        on_cancel: Optional[Callable[[str], None]] = None,
+        on_coalesce: Optional[Callable[[], None]] = None,
+    ) -> Any:
+        """`fn()`'s result, shared with concurrent callers of the same key.
+
+        `on_coalesce` is called when this caller joins a call already in
+        flight instead of starting its own. If this caller is cancelled,
+        `on_cancel` is told what happened to the shared work: "cancelled", or
+        "kept" because other waiters remain or `keep_running` is set.
+        """
+        call = self._calls.get(key)
+        if call is None or call.task.done():
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda task, key=key, call=call: self._finish(key, call))
+        else:
+            logger.debug("single-flight %s: coalesced onto in-flight call", self.name)
+            if on_coalesce is not None:
+                on_coalesce()
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            # Only abandon the shared work when nobody else is waiting on it.
+            if call.task.done():
+                raise
+            if call.waiters == 1 and not keep_running:
+                call.task.cancel()
+                outcome = "cancelled"
+            else:
+                outcome = "kept"
+            if on_cancel is not None:
+                on_cancel(outcome)
+            raise
+        finally:
+            call.waiters -= 1
+
+    def _finish(self, key: str, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        # Mark the exception retrieved even if every waiter already left.
+        if not call.task.cancelled():
+            call.task.exception()
@@ -0,0 +1,282 @@
+# backend/app/services/token_budget.py
+"""
+Token budgets for OpenAI calls, enforced before dispatch.
+
+AI_HEAVY_LIMIT / AI_LIGHT_LIMIT count requests, but OpenAI rate-limits tokens
+per minute, per model: a 4000-token recipe generation and a 100-token dietary
+label cost very differently. Every upstream call reserves an estimate —
+prompt characters / 4 plus a fixed charge per image, plus max_tokens, the same
+way OpenAI counts a request against its TPM limit — in two sliding 60 s
+windows: the calling user's and the model's. If either is full the call fails
+fast with TokenBudgetExceeded instead of being sent and bouncing off a 429
+that slows everyone down. After the call the reservation is reconciled with
+the real `usage` (or refunded if the call never completed).
+
+Shared calls (single-flight coalescing, micro-batches) split the two: each
+caller checks and charges its own user window before it joins, for what its
+own request costs, so one user's refusal never reaches another's waiter; the
+upstream call charges the model window once, whoever's task sends it.
+
+Limits are per process: with N uvicorn workers, set them to tier / N.
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+
+from fastapi import HTTPException
+
+from app.services import metrics
+from app.services.auth import current_user_id
+
+logger = logging.getLogger(__name__)
+
+WINDOW_SECONDS = 60.0
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+# gpt-4o "detail: high" worst case for a phone photo (85 base + 6 tiles x 170).
+IMAGE_TOKENS = 1105
+
+USER_TPM = int(os.getenv("OPENAI_USER_TPM", "40000"))
+
+
+def _parse_limits(value: str) -> Dict[str, int]:
+    """"gpt-4o-mini=200000,gpt-4o=30000" -> {model: tokens per minute}."""
+    limits = {}
+    for part in value.split(","):
+        model, _, tpm = part.partition("=")
+        if model.strip() and tpm.strip():
+            limits[model.strip()] = int(tpm)
+    return limits
+
+
+# Per-model TPM ceilings; defaults are OpenAI usage tier 1.
+MODEL_TPM = _parse_limits(os.getenv("OPENAI_TPM_LIMITS", "gpt-4o-mini=200000,gpt-4o=30000"))
+DEFAULT_MODEL_TPM = 30000
+
+# result: reserved, or the window that refused it (user / model).
+token_budget_reservations = metrics.registry.counter(
+    "token_budget_reservations_total", "OpenAI calls checked against the token budgets.", ("model", "result"),
+)
+# Estimated vs. settled tokens of finished reservations: how far the estimates are off.
+token_budget_estimated_tokens = metrics.registry.counter(
+    "token_budget_estimated_tokens_total", "Tokens reserved for OpenAI calls, as estimated.", ("model",),
+)
+token_budget_settled_tokens = metrics.registry.counter(
+    "token_budget_settled_tokens_total", "Tokens OpenAI calls actually cost, per their usage.", ("model",),
+)
+
+
+class TokenBudgetExceeded(Exception):
+    """Raised instead of calling OpenAI when a token window is full."""
+
+    def __init__(self, scope: str, retry_after: float):
+        super().__init__(f"{scope} token budget exhausted; retry in {retry_after:.0f}s")
+        self.scope = scope  # "user" or "model"
+        self.retry_after = retry_after
+
+
+class _Charge:
+    __slots__ = ("at", "tokens", "live")
+
+    def __init__(self, at: float, tokens: int):
+        self.at = at
+        self.tokens = tokens
+        self.live = True
+
+
+class TokenWindow:
+    """Tokens charged in the trailing `window` seconds, against `limit`."""
+
+    def __init__(self, limit: int, window: float = WINDOW_SECONDS):
+        self.limit = limit
+        self.window = window
+        self.used = 0
+        self._charges: Deque[_Charge] = deque()
+
+    def _expire(self, now: float) -> None:
+        while self._charges and self._charges[0].at <= now - self.window:
+            charge = self._charges.popleft()
+            charge.live = False
+            self.used -= charge.tokens
+
+    def wait_for(self, tokens: int, now: float) -> float:
+        """Seconds until `tokens` more fit (0 if they fit now)."""
+        self._expire(now)
+        # A single call bigger than the whole limit may run once the window is empty.
+        excess = self.used + min(tokens, self.limit) - self.limit
+        if excess <= 0:
+            return 0.0
+        for charge in self._charges:
+            excess -= charge.tokens
+            if excess <= 0:
+                return max(0.0, charge.at + self.window - now)
+        return self.window
+
+    def charge(self, tokens: int, now: float) -> _Charge:
+        charge = _Charge(now, tokens)
+        self._charges.append(charge)
+        self.used += tokens
+        return charge
+
+    def adjust(self, charge: _Charge, tokens: int) -> None:
+        # Charges that already left the window no longer count either way.
+        if charge.live:
+            self.used += tokens - charge.tokens
+        charge.tokens = tokens
+
+    def __len__(self) -> int:
+        return len(self._charges)
+
+
+class Reservation:
+    """One call's hold on its user and model windows; settle exactly once."""
+
+    def __init__(self, budget: "TokenBudget", model: str, estimate: int, prompt_estimate: int, charges: list,
+                 upstream: bool = True):
+        self.budget = budget
+        self.model = model
+        self.estimate = estimate
+        self.prompt_estimate = prompt_estimate
+        self.upstream = upstream  # holds the model window, i.e. stands for a call actually sent
+        self._charges = charges
+        self._settled = False
+
+    def settle(self, tokens: int) -> None:
+        """Replace the estimate with what the call actually cost."""
+        if self._settled:
+            return
+        self._settled = True
+        self.budget._settle(self, tokens)
+
+    def settle_usage(self, usage) -> None:
+        """Settle from an OpenAI `usage` (dict or SDK object); keep the estimate if absent."""
+        if isinstance(usage, dict):
+            total = usage.get("total_tokens") or (usage.get("prompt_tokens") or 0) + (usage.get("completion_tokens") or 0)
+        else:
+            total = getattr(usage, "total_tokens", 0)
+        self.settle(total if isinstance(total, int) and total > 0 else self.estimate)
+
+
+class TokenBudget:
+    def __init__(self, user_tpm: int = USER_TPM, model_tpm: Optional[Dict[str, int]] = None,
+                 default_model_tpm: int = DEFAULT_MODEL_TPM):
+        self.user_tpm = user_tpm
+        self.model_tpm = dict(MODEL_TPM if model_tpm is None else model_tpm)
+        self.default_model_tpm = default_model_tpm
+        self._users: Dict[str, TokenWindow] = {}
+        self._models: Dict[str, TokenWindow] = {}
+        self._lock = threading.Lock()
+
+    def _model_window(self, model: str) -> TokenWindow:
+        window = self._models.get(model)
+        if window is None:
+            window = self._models[model] = TokenWindow(self.model_tpm.get(model, self.default_model_tpm))
+        return window
+
+    def _user_window(self, user_id: str, now: float) -> TokenWindow:
+        window = self._users.get(user_id)
+        if window is None:
+            if len(self._users) > 1000:
+                # Forget users with nothing left in their window.
+                for w in self._users.values():
+                    w._expire(now)
+                for uid in [u for u, w in self._users.items() if not len(w)]:
+                    del self._users[uid]
+            window = self._users[user_id] = TokenWindow(self.user_tpm)
+        return window
+
+    def reserve(self, model: str, estimate: int, prompt_estimate: int = 0,
+                user_id: Optional[str] = None, charge_model: bool = True) -> Reservation:
+        """Charge `estimate` tokens to the user and model windows, or raise TokenBudgetExceeded.
+
+        `charge_model=False` checks and charges the user's window alone.
+        """
+        now = time.monotonic()
+        with self._lock:
+            windows = [("model", self._model_window(model))] if charge_model else []
+            if user_id:
+                windows.insert(0, ("user", self._user_window(user_id, now)))
+            for scope, window in windows:
+                wait = window.wait_for(estimate, now)
+                if wait > 0:
+                    token_budget_reservations.inc(model=model, result=scope)
+                    logger.warning(
+                        "token budget exhausted scope=%s model=%s user=%s estimate=%d used=%d limit=%d",
+                        scope, model, user_id or "-", estimate, window.used, window.limit,
+                    )
+                    raise TokenBudgetExceeded(scope, wait)
+            charges = [(window, window.charge(estimate, now)) for _, window in windows]
+        if charge_model:
+            token_budget_reservations.inc(model=model, result="reserved")
+        return Reservation(self, model, estimate, prompt_estimate, charges, upstream=charge_model)
+
+    def _settle(self, reservation: Reservation, tokens: int) -> None:
+        with self._lock:
+            for window, charge in reservation._charges:
+                window.adjust(charge, tokens)
+        if reservation.upstream:
+            token_budget_estimated_tokens.inc(reservation.estimate, model=reservation.model)
+            token_budget_settled_tokens.inc(tokens, model=reservation.model)
+
+
+def _text_chars(content) -> tuple:
+    """(characters of text, number of images) in one message's content."""
+    if isinstance(content, str):
+        return len(content), 0
+    chars = images = 0
+    for part in content or []:
+        if part.get("type") == "image_url":
+            images += 1
+        else:
+            chars += len(part.get("text") or "")
+    return chars, images
+
+
+def estimate_prompt_tokens(messages: list) -> int:
+    chars = images = 0
+    for message in messages:
+        c, i = _text_chars(message.get("content"))
+        chars += c
+        images += i
+    return chars // CHARS_PER_TOKEN + images * IMAGE_TOKENS + MESSAGE_OVERHEAD_TOKENS * len(messages)
+
+
+budget = TokenBudget()
+
+
+def reserve_completion(model: str, messages: list, max_tokens: int) -> Reservation:
+    """Reserve budget for one chat completion on behalf of the current request's user."""
+    prompt = estimate_prompt_tokens(messages)
+    return budget.reserve(model, prompt + max_tokens, prompt_estimate=prompt, user_id=current_user_id())
+
+
+def reserve_user_share(model: str, messages: list, max_tokens: int) -> Reservation:
+    """The current user's window only, for a caller about to join a shared call."""
+    prompt = estimate_prompt_tokens(messages)
+    return budget.reserve(model, prompt + max_tokens, prompt_estimate=prompt,
+                          user_id=current_user_id(), charge_model=False)
+
+
+def reserve_upstream(model: str, messages: list, max_tokens: int) -> Reservation:
+    """The model window only, for a call whose callers have reserved their own shares."""
+    prompt = estimate_prompt_tokens(messages)
+    return budget.reserve(model, prompt + max_tokens, prompt_estimate=prompt)
+
+
+def token_budget_http_error(exc: TokenBudgetExceeded) -> HTTPException:
+    """429 for a user over their own budget; 503 when the whole service is."""
+    retry_after = str(max(1, int(exc.retry_after + 0.999)))
+    if exc.scope == "user":
+        return HTTPException(
+            status_code=429,
+            detail="AI usage limit reached, please try again in a minute",
+            headers={"Retry-After": retry_after},
+        )
+    return HTTPException(
+        status_code=503,
+        detail="AI service busy, please try again shortly",
+        headers={"Retry-After": retry_after},
+    )
@@ -0,0 +1,124 @@
+# backend/app/services/token_sizing.py
+"""
+Right-size `max_tokens` per route from observed completion lengths.
+
+The max_tokens values at the call sites (4000 for recipes, 3000 for receipts,
+2000 for ingredient parsing, ...) are guesses made to be safe. They still
+matter after the answer is done: the token budget and OpenAI's own TPM
+accounting reserve the full max_tokens, and a runaway completion can run to
+the limit. log_openai_usage feeds every completion's length into a per-route
+window here, divided by the call's `size_hint` (ingredient lines, names to
+translate, ...) when the route provides one. Once a route has MIN_SAMPLES
+samples, choose_max_tokens returns p99 * size_hint * HEADROOM plus a fixed
+margin, rounded up to a step on MAX_TOKENS_LADDER so cache and single-flight
+keys stay stable. The result never exceeds the call site's value, which acts
+as a ceiling.
+
+A truncated completion (finish_reason "length") is logged and counted in
+openai_truncations_total{route}. It also sends the route back to its ceiling
+for TRUNCATION_COOLDOWN calls while the window catches up. Each call's
+recommendation is reported in the openai_max_tokens_recommended{route} gauge.
+
+OPENAI_TOKEN_SIZING=on (default) | observe (record and report only) | off.
+"""
+import bisect
+import logging
+import os
+import threading
+from collections import deque
+from typing import Deque, Dict, Optional
+
+from app.services import metrics
+
+logger = logging.getLogger(__name__)
+
+SIZING_MODE = os.getenv("OPENAI_TOKEN_SIZING", "on").lower()
+
+WINDOW = 500
+MIN_SAMPLES = 50
+QUANTILE = 0.99
+HEADROOM = 1.3
+MARGIN_TOKENS = 32
+TRUNCATION_COOLDOWN = 20
+MAX_TOKENS_LADDER = [64, 96, 128, 192, 256, 384, 512, 768, 1024, 1536, 2048, 3072, 4096, 6144, 8192]
+
+openai_truncations = metrics.registry.counter(
+    "openai_truncations_total", "Completions cut off at max_tokens (finish_reason length).", ("route",),
+)
+max_tokens_recommended = metrics.registry.gauge(
+    "openai_max_tokens_recommended", "max_tokens sizing recommended for the route's latest call.", ("route",),
+)
+
+
+class RouteSizer:
+    """Completion-token samples (per size unit) and the truncation cooldown for one route."""
+
+    def __init__(self, window: int = WINDOW):
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.cooldown = 0
+
+    def record(self, completion_tokens: int, size_hint: float, truncated: bool) -> None:
+        with self._lock:
+            self._samples.append(completion_tokens / max(size_hint, 1.0))
+            if truncated:
+                self.cooldown = TRUNCATION_COOLDOWN
+            elif self.cooldown:
+                self.cooldown -= 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < MIN_SAMPLES:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def recommend(self, ceiling: int, size_hint: float) -> int:
+        if self.cooldown:
+            return ceiling
+        per_unit = self.quantile(QUANTILE)
+        if per_unit is None:
+            return ceiling
+        wanted = per_unit * max(size_hint, 1.0) * HEADROOM + MARGIN_TOKENS
+        i = bisect.bisect_left(MAX_TOKENS_LADDER, wanted)
+        step = MAX_TOKENS_LADDER[i] if i < len(MAX_TOKENS_LADDER) else ceiling
+        return min(ceiling, step)
+
+
+_sizers: Dict[str, RouteSizer] = {}
+
+
+def get_sizer(route: str) -> RouteSizer:
+    sizer = _sizers.get(route)
+    if sizer is None:
+        sizer = _sizers[route] = RouteSizer()
+    return sizer
+
+
+def choose_max_tokens(route: str, ceiling: int, size_hint: Optional[float] = None) -> int:
+    """max_tokens for the next call on `route`; `ceiling` is the call site's own limit."""
+    if SIZING_MODE == "off" or not route:
+        return ceiling
+    max_tokens = get_sizer(route).recommend(ceiling, size_hint or 1.0)
+    max_tokens_recommended.set(max_tokens, route=route)
+    return max_tokens if SIZING_MODE == "on" else ceiling
+
+
+def record_completion(
+    route: str,
+    completion_tokens: int,
+    finish_reason: str,
+    max_tokens: int = 0,
+    size_hint: Optional[float] = None,
+) -> None:
+    """Feed one finished completion into the route's distribution."""
+    if SIZING_MODE == "off" or not route:
+        return
+    truncated = finish_reason == "length"
+    if truncated:
+        openai_truncations.inc(route=route)
+        logger.warning(
+            "openai truncation route=%s max_tokens=%d completion_tokens=%d size_hint=%s",
+            route, max_tokens, completion_tokens, size_hint if size_hint is not None else "-",
+        )
+    get_sizer(route).record(completion_tokens, size_hint or 1.0, truncated)
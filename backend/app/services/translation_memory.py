@@ -0,0 +1,91 @@
+# backend/app/services/translation_memory.py
+"""
+Translation memory: previously translated strings, keyed by (content hash,
+target language).
+
+translate-names and translate-full keep re-translating the same pieces:
+recipe names, "Easy"/"Medium", common ingredient lines such as "1 tbsp olive
+oil", stock budget tips. Both routes split their input into units (a name, a
+single-line field, one line of a multi-line field) and look them all up here
+first. Only the missing units go to OpenAI. The answer is assembled from
+remembered and fresh pieces, and the fresh ones are stored. So switching the
+UI back to a language already seen costs no AI calls for content already
+translated.
+
+Entries are bounded by TRANSLATION_MEMORY_MAX_BYTES (LRU) and expire after
+TRANSLATION_MEMORY_TTL_SECONDS. Lookups are counted in
+translation_memory_lookups_total{result} on /metrics, writes in
+translation_memory_stores_total.
+
+TRANSLATION_MEMORY_BACKEND=memory (per worker, default) | sqlite (shared by
+all workers on the host, at TRANSLATION_MEMORY_PATH) | off.
+"""
+import hashlib
+import logging
+import os
+from typing import Dict, Iterable
+
+from app.services import metrics
+from app.services.cache_backends import build_backend
+
+logger = logging.getLogger(__name__)
+
+TRANSLATION_MEMORY_BACKEND = os.getenv("TRANSLATION_MEMORY_BACKEND", "memory").lower()
+TRANSLATION_MEMORY_PATH = os.getenv("TRANSLATION_MEMORY_PATH", "translation_memory.sqlite3")
+TRANSLATION_MEMORY_MAX_BYTES = int(os.getenv("TRANSLATION_MEMORY_MAX_BYTES", str(16 * 1024 * 1024)))
+TRANSLATION_MEMORY_TTL_SECONDS = float(os.getenv("TRANSLATION_MEMORY_TTL_SECONDS", str(30 * 24 * 3600)))
+# Bump when the translation prompts change enough to invalidate old answers.
+KEY_VERSION = "v1"
+
+_memory = None
+translation_memory_lookups = metrics.registry.counter(
+    "translation_memory_lookups_total", "Translation-memory lookups, one per unique string.", ("result",),
+)
+translation_memory_stores = metrics.registry.counter(
+    "translation_memory_stores_total", "Translations written to the translation memory.",
+)
+
+
+def _key(text: str, language: str) -> str:
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return f"tm:{KEY_VERSION}:{language}:{digest}"
+
+
+def get_translation_memory():
+    """The configured backend, built on first use; None when disabled."""
+    global _memory
+    if _memory is None:
+        _memory = build_backend(TRANSLATION_MEMORY_BACKEND, TRANSLATION_MEMORY_PATH, TRANSLATION_MEMORY_MAX_BYTES)
+    return _memory
+
+
+async def lookup_many(texts: Iterable[str], language: str) -> Dict[str, str]:
+    """{text: translation} for every text already translated to `language`.
+    Never raises: a broken backend is all misses."""
+    memory = get_translation_memory()
+    if memory is None:
+        return {}
+    keys = {_key(text, language): text for text in dict.fromkeys(texts)}
+    try:
+        entries = await memory.aget_many(keys)
+    except Exception:
+        logger.warning("translation memory read failed", exc_info=True)
+        entries = {}
+    found = {keys[key]: entry.value for key, entry in entries.items()}
+    hits = len(found)
+    misses = len(keys) - hits
+    translation_memory_lookups.inc(hits, result="hit")
+    translation_memory_lookups.inc(misses, result="miss")
+    return found
+
+
+async def store_many(translations: Dict[str, str], language: str) -> None:
+    memory = get_translation_memory()
+    if memory is None or not translations:
+        return
+    values = {_key(text, language): translated for text, translated in translations.items()}
+    try:
+        await memory.aset_many(values, TRANSLATION_MEMORY_TTL_SECONDS)
+        translation_memory_stores.inc(len(values))
+    except Exception:
+        logger.warning("translation memory write failed", exc_info=True)
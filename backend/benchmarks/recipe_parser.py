@@ -0,0 +1,89 @@
+# backend/benchmarks/recipe_parser.py
+"""
+Benchmark parse_recipes_text against the pre-rewrite baseline.
+
+Runs every completion in recipe_completions.json (clean, fenced,
+prose-wrapped, object-wrapped, truncated and non-JSON answers) through both
+implementations. Before timing anything, it checks that the current parser's
+output serializes byte-for-byte to recipe_completions_expected.json.
+
+    cd backend && python -m benchmarks.recipe_parser [--number 2000]
+
+--update-snapshot rewrites the expected file from the baseline parser. Use it
+only when the corpus itself changes.
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+
+from app.services import recipe_parser
+from benchmarks import baseline_recipe_parser
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CORPUS_PATH = os.path.join(HERE, "recipe_completions.json")
+EXPECTED_PATH = os.path.join(HERE, "recipe_completions_expected.json")
+
+
+def load_corpus():
+    with open(CORPUS_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_expected():
+    with open(EXPECTED_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def dump(recipes) -> str:
+    """The serialization output is compared in: exact, key order included."""
+    return json.dumps(recipes, ensure_ascii=False)
+
+
+def mismatches(parse=recipe_parser.parse_recipes_text):
+    """Corpus cases whose output differs from the snapshot."""
+    expected = load_expected()
+    return [c["case"] for c in load_corpus() if dump(parse(c["text"], expected=3)) != dump(expected[c["case"]])]
+
+
+def _best_seconds(text, number, repeat=7):
+    """Best per-call time (baseline, current); runs alternate so drift hits both alike."""
+    old, new = [], []
+    for _ in range(repeat):
+        old.append(timeit.timeit(lambda: baseline_recipe_parser.parse_recipes_text(text, expected=3), number=number))
+        new.append(timeit.timeit(lambda: recipe_parser.parse_recipes_text(text, expected=3), number=number))
+    return min(old) / number, min(new) / number
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=2000, help="calls per timing run")
+    parser.add_argument("--update-snapshot", action="store_true")
+    args = parser.parse_args(argv)
+
+    corpus = load_corpus()
+    if args.update_snapshot:
+        snapshot = {c["case"]: baseline_recipe_parser.parse_recipes_text(c["text"], expected=3) for c in corpus}
+        with open(EXPECTED_PATH, "w", encoding="utf-8") as f:
+            f.write(json.dumps(snapshot, indent=1, ensure_ascii=False) + "\n")
+        print(f"wrote {EXPECTED_PATH}")
+
+    bad = mismatches()
+    if bad:
+        print(f"output differs from snapshot: {', '.join(bad)}", file=sys.stderr)
+        return 1
+
+    print(f"{'case':<28}{'bytes':>7}{'baseline us':>14}{'current us':>13}{'speedup':>9}")
+    total_old = total_new = 0.0
+    for c in corpus:
+        old, new = _best_seconds(c["text"], args.number)
+        total_old += old
+        total_new += new
+        print(f"{c['case']:<28}{len(c['text']):>7}{old * 1e6:>14.1f}{new * 1e6:>13.1f}{old / new:>8.2f}x")
+    print(f"{'total':<35}{total_old * 1e6:>14.1f}{total_new * 1e6:>13.1f}{total_old / total_new:>8.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,392 @@
+# backend/devtools/fake_openai.py
+"""
+Local stand-in for the OpenAI chat-completions API, for load tests and
+benchmarks that shouldn't spend money or depend on the network.
+
+Answers POST /v1/chat/completions (JSON or SSE when `stream` is set) with a
+canned, schema-valid reply for whichever route sent the prompt — recognised
+from the route's system prompt, see ROUTE_SIGNATURES — and GET/HEAD
+/v1/models for health checks and pre-warming. Latency, 429/5xx rates, hangs
+(to exercise client timeouts) and reported token usage come from a
+FakeProfile, optionally overridden per route.
+
+Point the backend at it with OPENAI_CHAT_URL:
+
+    python -m devtools.fake_openai --port 8001 --latency-ms 800 --error-429-rate 0.05
+    OPENAI_CHAT_URL=http://127.0.0.1:8001/v1/chat/completions uvicorn app.main:app
+
+or in-process (tests, benchmark scripts):
+
+    with running(FakeProfile(latency_ms=50)) as base_url:
+        ...  # OPENAI_CHAT_URL = base_url + "/v1/chat/completions"
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field, replace
+from fractions import Fraction
+from typing import Dict, Iterator, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+CHARS_PER_TOKEN = 4
+IMAGE_TOKENS = 765
+
+
+@dataclass
+class FakeProfile:
+    latency_ms: float = 200.0  # median time before the first byte
+    latency_sigma: float = 0.4  # lognormal spread around the median; 0 = fixed
+    tokens_per_second: float = 0.0  # completion generation speed; 0 = instant
+    error_429_rate: float = 0.0
+    error_5xx_rate: float = 0.0
+    timeout_rate: float = 0.0  # fraction of calls that hang for hang_seconds
+    hang_seconds: float = 120.0
+    retry_after_seconds: Optional[float] = 1.0  # sent with 429s; None omits the header
+    completion_tokens: Optional[int] = None  # reported usage override; default ~len/4
+    route_latency_ms: Dict[str, float] = field(default_factory=dict)
+
+    @classmethod
+    def from_env(cls) -> "FakeProfile":
+        """Read FAKE_OPENAI_* variables (same names as the CLI flags, upper-cased)."""
+        profile = cls()
+        for name in ("latency_ms", "latency_sigma", "tokens_per_second", "error_429_rate",
+                     "error_5xx_rate", "timeout_rate", "hang_seconds", "retry_after_seconds"):
+            value = os.getenv(f"FAKE_OPENAI_{name.upper()}")
+            if value:
+                profile = replace(profile, **{name: float(value)})
+        if os.getenv("FAKE_OPENAI_COMPLETION_TOKENS"):
+            profile = replace(profile, completion_tokens=int(os.environ["FAKE_OPENAI_COMPLETION_TOKENS"]))
+        routes = os.getenv("FAKE_OPENAI_ROUTE_LATENCY_MS", "")
+        for part in filter(None, routes.split(",")):
+            route, _, ms = part.partition("=")
+            profile.route_latency_ms[route.strip()] = float(ms)
+        return profile
+
+    def latency_for(self, route: str, rng: random.Random) -> float:
+        median = self.route_latency_ms.get(route, self.latency_ms) / 1000
+        if self.latency_sigma <= 0:
+            return median
+        return rng.lognormvariate(0, self.latency_sigma) * median
+
+
+# ---------------------------------------------------------------------------
+# Canned answers, one per route label
+# ---------------------------------------------------------------------------
+
+def _user_text(messages: list) -> str:
+    for message in reversed(messages):
+        if message.get("role") == "user":
+            content = message.get("content")
+            if isinstance(content, str):
+                return content
+            return "\n".join(p.get("text", "") for p in content or [] if p.get("type") == "text")
+    return ""
+
+
+def _recipes(messages: list) -> str:
+    recipes = []
+    for i, (name, protein) in enumerate((("Garlic Rice Bowl", 14), ("Bean Chili", 18), ("Veggie Stir Fry", 11))):
+        recipes.append({
+            "name": name,
+            "ingredients": "1 cup rice\n2 cloves garlic\n1 tbsp olive oil\n1 can black beans",
+            "instructions": "1. Rinse the rice.\n2. Saute the garlic in oil.\n3. Add the rest and simmer 20 minutes.",
+            "prep_time": "10 min",
+            "cook_time": "20 min",
+            "difficulty": "Easy",
+            "servings": 2,
+            "nutrition": {"calories": 380 + 20 * i, "protein": protein, "carbs": 55, "fat": 9, "fiber": 8, "sodium": 420},
+            "health_benefits": "High in fiber and plant protein.",
+            "budget_tip": "Buy rice and dried beans in bulk.",
+        })
+    return json.dumps(recipes)
+
+
+def _parse_ingredients(messages: list) -> str:
+    items = []
+    for line in _user_text(messages).splitlines():
+        match = re.match(r"\s*([\d./]+)?\s*(cups?|tbsp|tsp|oz|lbs?|g|kg|ml|cloves?)?\s*(.+)", line)
+        if not match or not match.group(3).strip():
+            continue
+        qty, unit, name = match.groups()
+        try:
+            quantity = float(Fraction(qty)) if qty else 1.0  # "1/2" -> 0.5
+        except (ValueError, ZeroDivisionError):
+            quantity = 1.0
+        items.append({"name": name.split(",")[0].strip(), "quantity": quantity, "unit": unit or "pc"})
+    return json.dumps(items)
+
+
+def _match_ingredients(messages: list) -> str:
+    text = _user_text(messages)
+    recipe_part = text.split("Pantry items:")[0]
+    lines = [l[2:].strip() for l in recipe_part.splitlines() if l.startswith("- ")]
+    return json.dumps([
+        {"ingredient_name": line, "quantity": 1.0, "unit": "pc", "pantry_id": None, "pantry_name": None,
+         "pantry_quantity": None, "pantry_unit": None, "remainder": None}
+        for line in lines
+    ])
+
+
+def _price_comparison(messages: list) -> str:
+    match = re.search(r"SHOPPING LIST:\n(.*?)\n\n", _user_text(messages), re.DOTALL)
+    count = len(match.group(1).split(",")) if match else 1
+    return json.dumps({"amazon": round(4.2 * count, 2), "walmart": round(3.5 * count, 2)})
+
+
+def _translate_names(messages: list) -> str:
+    names = re.findall(r"^\d+\. (.*)$", _user_text(messages), re.MULTILINE)
+    return "\n".join(f"{i + 1}. {name} (translated)" for i, name in enumerate(names))
+
+
+def _translate_full(messages: list) -> str:
+    text = _user_text(messages)
+    fields = json.loads(text[text.index("\n") + 1:])
+    return json.dumps({k: f"{v} (translated)" for k, v in fields.items()}, ensure_ascii=False)
+
+
+def _translate_full_packed(messages: list) -> str:
+    text = _user_text(messages)
+    recipes = json.loads(text[text.index("\n") + 1:])
+    return json.dumps(
+        {i: {k: f"{v} (translated)" for k, v in fields.items()} for i, fields in recipes.items()},
+        ensure_ascii=False,
+    )
+
+
+def _dietary_label(messages: list) -> str:
+    text = _user_text(messages).strip()
+    return json.dumps({"label": text[:30].title() or "Custom Diet", "description": f"Recipes suited to: {text[:80]}."})
+
+
+def _vision_ingredients(messages: list) -> str:
+    return json.dumps(["tomato", "yellow onion", "garlic", "chicken breast"])
+
+
+def _receipt(messages: list) -> str:
+    return json.dumps({
+        "items": [
+            {"name": "Organic Banana", "quantity": 1.24, "unit": "lb", "category": "produce", "confidence": "high", "raw_text": "ORG BANANA 1.24 lb"},
+            {"name": "2% Milk", "quantity": 1, "unit": "gal", "category": "dairy", "confidence": "medium", "raw_text": "GV 2% MLK GAL"},
+        ],
+        "rejected_lines_count": 4,
+    })
+
+
+def _barcode_name(messages: list) -> str:
+    return json.dumps({"name": "Tomato Soup", "category": "canned", "confidence": "high"})
+
+
+def _barcode_digits(messages: list) -> str:
+    return "012345678905"
+
+
+# (substring of the route's prompt, route label, canned-answer builder);
+# first match wins, so more specific signatures come first.
+ROUTE_SIGNATURES = [
+    ("nutritionist and chef", "recipes.generate_recipes", _recipes),
+    ("Translate recipe names", "recipes.translate_recipe_names", _translate_names),
+    ("Translate ONLY the provided JSON field values", "recipes.translate_full_recipes", _translate_full),
+    ("string values of every recipe", "recipes.translate_full_recipes.packed", _translate_full_packed),
+    ("ingredient parser", "recipes.parse_ingredients", _parse_ingredients),
+    ("pantry matcher", "pantry.match_ingredients", _match_ingredients),
+    ("grocery pricing expert", "shopping.ai_price_comparison", _price_comparison),
+    ("dietary preference labeler", "profile.generate_dietary_label", _dietary_label),
+    ("grocery store receipts", "vision.analyze_receipt", _receipt),
+    ("edible food ingredients", "vision.analyze_ingredients", _vision_ingredients),
+    ("grocery product identifier", "barcode.ai_clean_name", _barcode_name),
+    ("Find the barcode in this image", "barcode.vision_barcode_lookup", _barcode_digits),
+]
+
+
+def infer_route(messages: list) -> str:
+    text = "\n".join(
+        m["content"] if isinstance(m.get("content"), str)
+        else "\n".join(p.get("text", "") for p in m.get("content") or [])
+        for m in messages
+    )
+    for signature, route, _ in ROUTE_SIGNATURES:
+        if signature in text:
+            return route
+    return "-"
+
+
+def canned_reply(messages: list) -> str:
+    route = infer_route(messages)
+    for _, label, build in ROUTE_SIGNATURES:
+        if label == route:
+            return build(messages)
+    return "OK"
+
+
+def _prompt_tokens(messages: list) -> int:
+    chars = images = 0
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, str):
+            chars += len(content)
+            continue
+        for part in content or []:
+            if part.get("type") == "image_url":
+                images += 1
+            else:
+                chars += len(part.get("text") or "")
+    return chars // CHARS_PER_TOKEN + images * IMAGE_TOKENS
+
+
+# ---------------------------------------------------------------------------
+# The app
+# ---------------------------------------------------------------------------
+
+def create_app(profile: Optional[FakeProfile] = None, seed: Optional[int] = None) -> FastAPI:
+    """A fake OpenAI API. `app.state.stats` counts calls per route and outcome."""
+    profile = profile or FakeProfile.from_env()
+    rng = random.Random(seed)
+    app = FastAPI(title="fake-openai")
+    app.state.profile = profile
+    app.state.stats = {}
+
+    def count(route: str, outcome: str) -> None:
+        key = f"{route}:{outcome}"
+        app.state.stats[key] = app.state.stats.get(key, 0) + 1
+
+    def error(status: int, message: str, headers: Optional[dict] = None) -> JSONResponse:
+        return JSONResponse(status_code=status, headers=headers,
+                            content={"error": {"message": message, "type": "fake_openai_error"}})
+
+    @app.api_route("/v1/models", methods=["GET", "HEAD"])
+    async def models():
+        return {"object": "list", "data": [{"id": "gpt-4o-mini", "object": "model"}, {"id": "gpt-4o", "object": "model"}]}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request) -> Response:
+        body = await request.json()
+        messages = body.get("messages") or []
+        model = body.get("model", "gpt-4o-mini")
+        route = infer_route(messages)
+        profile = app.state.profile
+
+        latency = profile.latency_for(route, rng)
+        if latency > 0:
+            await asyncio.sleep(latency)
+        roll = rng.random()
+        if roll < profile.timeout_rate:
+            count(route, "hang")
+            await asyncio.sleep(profile.hang_seconds)
+        elif roll < profile.timeout_rate + profile.error_429_rate:
+            count(route, "429")
+            headers = None
+            if profile.retry_after_seconds is not None:
+                headers = {"retry-after-ms": str(int(profile.retry_after_seconds * 1000))}
+            return error(429, "Rate limit reached (fake)", headers)
+        elif roll < profile.timeout_rate + profile.error_429_rate + profile.error_5xx_rate:
+            count(route, "5xx")
+            return error(rng.choice((500, 502, 503)), "Upstream error (fake)")
+
+        content = canned_reply(messages)
+        max_tokens = body.get("max_tokens")
+        completion_tokens = profile.completion_tokens or max(1, len(content) // CHARS_PER_TOKEN)
+        finish_reason = "stop"
+        if max_tokens and completion_tokens > max_tokens:
+            # Truncate like the real API does when max_tokens runs out.
+            content = content[: max_tokens * CHARS_PER_TOKEN]
+            completion_tokens, finish_reason = max_tokens, "length"
+        usage = {
+            "prompt_tokens": _prompt_tokens(messages),
+            "completion_tokens": completion_tokens,
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + completion_tokens
+        completion_id = f"chatcmpl-fake-{uuid.uuid4().hex[:12]}"
+        count(route, "ok")
+
+        if not body.get("stream"):
+            if profile.tokens_per_second > 0:
+                await asyncio.sleep(completion_tokens / profile.tokens_per_second)
+            return JSONResponse({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": finish_reason}],
+                "usage": usage,
+            })
+
+        include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+
+        async def events():
+            def chunk(choices, **extra):
+                return "data: " + json.dumps({
+                    "id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                    "model": model, "choices": choices, **extra,
+                }) + "\n\n"
+
+            step = 16  # characters per delta, ~4 tokens
+            delay = (step / CHARS_PER_TOKEN) / profile.tokens_per_second if profile.tokens_per_second > 0 else 0
+            for i in range(0, len(content), step):
+                yield chunk([{"index": 0, "delta": {"content": content[i:i + step]}, "finish_reason": None}])
+                if delay:
+                    await asyncio.sleep(delay)
+            yield chunk([{"index": 0, "delta": {}, "finish_reason": finish_reason}])
+            if include_usage:
+                yield chunk([], usage=usage)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+@contextmanager
+def running(profile: Optional[FakeProfile] = None, host: str = "127.0.0.1", port: int = 0,
+            seed: Optional[int] = None) -> Iterator[str]:
+    """Serve create_app(profile) with uvicorn on a background thread; yields the base URL."""
+    import uvicorn
+
+    config = uvicorn.Config(create_app(profile, seed), host=host, port=port, log_level="warning", lifespan="off")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while not server.started:
+        if time.monotonic() > deadline or not thread.is_alive():
+            raise RuntimeError("fake OpenAI server did not start")
+        time.sleep(0.01)
+    bound_port = server.servers[0].sockets[0].getsockname()[1]
+    try:
+        yield f"http://{host}:{bound_port}"
+    finally:
+        server.should_exit = True
+        thread.join(timeout=5)
+
+
+def main(argv=None) -> None:
+    import uvicorn
+
+    defaults = FakeProfile.from_env()
+    parser = argparse.ArgumentParser(description="Fake OpenAI chat-completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--seed", type=int, default=None)
+    for name in ("latency_ms", "latency_sigma", "tokens_per_second", "error_429_rate",
+                 "error_5xx_rate", "timeout_rate", "hang_seconds", "retry_after_seconds"):
+        parser.add_argument("--" + name.replace("_", "-"), type=float, default=getattr(defaults, name))
+    parser.add_argument("--completion-tokens", type=int, default=defaults.completion_tokens)
+    args = parser.parse_args(argv)
+
+    profile = replace(
+        defaults,
+        **{k: v for k, v in vars(args).items() if k not in ("host", "port", "seed")},
+    )
+    uvicorn.run(create_app(profile, args.seed), host=args.host, port=args.port, log_level="info")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""AIMD concurrency limiter (app/services/adaptive_limiter.py): additive growth
+while healthy, multiplicative cut on overload, bounded FIFO queueing.
+"""
+import asyncio
+from unittest.mock import MagicMock, patch
+
+import httpx
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.services import adaptive_limiter, openai_client
+from app.services.adaptive_limiter import AdaptiveLimiter, LimiterTimeout
+from app.services.auth import get_current_user
+
+
+def test_limit_grows_additively_while_healthy():
+    limiter = AdaptiveLimiter("t", initial=4, max_limit=10)
+
+    async def run():
+        for _ in range(8):  # ~two windows of 4 healthy calls
+            await limiter.acquire()
+            limiter.release(0.1, overloaded=False)
+
+    asyncio.run(run())
+    assert 5.5 < limiter.limit < 6.5
+
+
+def test_limit_halves_on_overload_and_respects_floor():
+    limiter = AdaptiveLimiter("t", initial=8, min_limit=1)
+
+    async def run():
+        await limiter.acquire()
+        limiter.release(0.1, overloaded=True)
+
+    asyncio.run(run())
+    assert limiter.limit == 4
+    assert adaptive_limiter.limiter_limit.value(route="t") == 4
+    for _ in range(5):
+        limiter._last_decrease = 0.0
+        limiter._adjust(0.1, overloaded=True)
+    assert limiter.limit == 1
+
+
+def test_burst_of_failures_cuts_limit_once():
+    limiter = AdaptiveLimiter("t", initial=8)
+    for _ in range(5):
+        limiter._adjust(0.1, overloaded=True)
+    assert limiter.limit == 4
+
+
+def test_call_far_slower_than_baseline_counts_as_congestion():
+    limiter = AdaptiveLimiter("t", initial=8, max_limit=8)
+    for _ in range(adaptive_limiter.BASELINE_WARMUP):
+        limiter._adjust(1.0, overloaded=False)
+    limiter._last_decrease = 0.0
+    limiter._adjust(10.0, overloaded=False)
+    assert limiter.limit == 4
+
+
+def test_cancelled_call_does_not_move_the_limit():
+    limiter = AdaptiveLimiter("t", initial=4)
+
+    async def run():
+        await limiter.acquire()
+        limiter.release(0.1, overloaded=None)
+
+    asyncio.run(run())
+    assert limiter.limit == 4
+    assert limiter.in_flight == 0
+
+
+def test_excess_callers_queue_then_proceed_in_order():
+    limiter = AdaptiveLimiter("t", initial=1, max_wait=1.0)
+    order = []
+
+    async def call(i):
+        await limiter.acquire()
+        order.append(i)
+        await asyncio.sleep(0.01)
+        limiter.release(0.01, overloaded=None)
+
+    async def run():
+        await asyncio.gather(*(call(i) for i in range(3)))
+
+    asyncio.run(run())
+    assert order == [0, 1, 2]
+    assert limiter.in_flight == 0
+
+
+def test_queue_wait_is_bounded():
+    limiter = AdaptiveLimiter("t.bounded", initial=1, max_wait=0.02)
+    rejected = adaptive_limiter.limiter_rejected.value(route="t.bounded")
+
+    async def run():
+        await limiter.acquire()  # hold the only slot
+        with pytest.raises(LimiterTimeout):
+            await limiter.acquire()
+
+    asyncio.run(run())
+    assert adaptive_limiter.limiter_rejected.value(route="t.bounded") - rejected == 1
+    assert adaptive_limiter.limiter_queued.value(route="t.bounded") == 0
+    assert limiter.queued == 0
+
+
+def test_slot_handed_over_as_the_wait_times_out_is_passed_on():
+    limiter = AdaptiveLimiter("t.handoff", initial=1, max_wait=1.0)
+
+    async def handoff_then_timeout(waiter, timeout):
+        # The holder releases and _wake resolves our waiter in the same loop
+        # iteration as the timeout: wait_for still reports the timeout.
+        limiter.release(0.1, overloaded=None)
+        assert waiter.done() and limiter.in_flight == 1
+        raise asyncio.TimeoutError
+
+    async def run():
+        await limiter.acquire()  # hold the only slot
+        with patch.object(adaptive_limiter.asyncio, "wait_for", handoff_then_timeout):
+            with pytest.raises(LimiterTimeout):
+                await limiter.acquire()
+        assert limiter.in_flight == 0
+        await asyncio.wait_for(limiter.acquire(), 0.1)  # the slot is free again
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("path, body", [
+    ("/recipes/", {"ingredients": ["rice", "beans"]}),
+    ("/recipes/parse-ingredients", {"lines": ["salt and pepper"]}),
+])
+def test_routes_answer_503_with_retry_after_when_no_slot_frees_up(path, body):
+    from app.routers import recipes
+
+    async def shed(*args, **kwargs):
+        raise LimiterTimeout(kwargs.get("route", "-"), retry_after=10)
+
+    app = FastAPI()
+    app.include_router(recipes.router, prefix="/recipes")
+
+    def override(request: Request):
+        request.state.user_id = "limiter-test-user"
+        return MagicMock(id="limiter-test-user")
+
+    app.dependency_overrides[get_current_user] = override
+    with patch.object(recipes, "call_chat_completion", shed), \
+         patch.object(recipes.recipe_cache, "lookup", return_value=None):
+        response = TestClient(app).post(path, json=body)
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "10"
+    assert "concurrency" not in response.json()["detail"]
+
+
+def test_post_with_retry_reports_429_to_the_route_limiter():
+    url = openai_client.OPENAI_CHAT_URL
+    statuses = iter([429, 200])
+
+    class Client:
+        async def post(self, *args, **kwargs):
+            status = next(statuses)
+            body = {"choices": [{"message": {"content": "ok"}}]} if status == 200 else {}
+            return httpx.Response(status, json=body, request=httpx.Request("POST", url))
+
+    async def no_sleep(_seconds):
+        return None
+
+    limiter = AdaptiveLimiter("test.limited", initial=8)
+    with patch.dict(adaptive_limiter._limiters, {"test.limited": limiter}), \
+         patch.object(openai_client, "get_async_client", return_value=Client()), \
+         patch.object(openai_client.asyncio, "sleep", no_sleep):
+        asyncio.run(openai_client._post_with_retry({"messages": []}, route="test.limited"))
+
+    assert limiter.limit < 8
+    assert limiter.in_flight == 0
@@ -0,0 +1,162 @@
+"""Circuit breakers (app/services/circuit_breaker.py): trip on consecutive
+upstream failures, fail fast while open, probe when half-open, and surface on
+/health. Routes with a local fallback use it; the rest answer 503 quickly.
+"""
+import asyncio
+from unittest.mock import MagicMock, patch
+
+import httpx
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.services import circuit_breaker, openai_client
+from app.services.auth import get_current_user
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+def _failure():
+    return httpx.ConnectError("refused")
+
+
+def _trip(breaker):
+    for _ in range(breaker.failure_threshold):
+        with pytest.raises(httpx.ConnectError):
+            with breaker.guard():
+                raise _failure()
+
+
+def test_opens_after_consecutive_failures_and_fails_fast():
+    breaker = CircuitBreaker("t", failure_threshold=3, recovery_seconds=60)
+    _trip(breaker)
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError) as exc_info:
+        breaker.before_call()
+    assert exc_info.value.retry_after > 0
+
+
+def test_success_resets_the_failure_count():
+    breaker = CircuitBreaker("t", failure_threshold=2)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+
+def test_client_errors_do_not_trip_the_breaker():
+    breaker = CircuitBreaker("t", failure_threshold=1)
+    with pytest.raises(ValueError):
+        with breaker.guard():
+            raise ValueError("bad json from a 200")
+    assert breaker.state == "closed"
+
+
+def test_half_open_allows_one_probe_then_closes_on_success():
+    breaker = CircuitBreaker("t", failure_threshold=1, recovery_seconds=0)
+    _trip(breaker)
+    assert breaker.state == "half_open"
+    breaker.before_call()  # the probe
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()  # a second concurrent call is still rejected
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_half_open_probe_failure_reopens():
+    breaker = CircuitBreaker("t", failure_threshold=1, recovery_seconds=0)
+    _trip(breaker)
+    breaker.before_call()
+    breaker.recovery_seconds = 60
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+
+@pytest.fixture
+def open_openai_circuit():
+    breaker = CircuitBreaker("openai", failure_threshold=1, recovery_seconds=60)
+    breaker.record_failure()
+    with patch.dict(circuit_breaker._breakers, {"openai": breaker}):
+        yield breaker
+
+
+def test_chat_completion_fails_fast_without_calling_upstream(open_openai_circuit):
+    client = MagicMock()
+    with patch.object(openai_client, "get_async_client", return_value=client):
+        with pytest.raises(CircuitOpenError):
+            asyncio.run(openai_client.call_chat_completion("sys", "user", route="test.open"))
+    client.post.assert_not_called()
+
+
+def test_health_reports_circuit_states(open_openai_circuit):
+    from app.main import app
+
+    with patch("app.main._check_supabase", return_value="ok"), \
+         patch("app.main._check_openai", return_value="ok"):
+        body = TestClient(app).get("/health").json()
+    assert body["circuits"]["openai"] == "open"
+    assert body["circuits"]["openfoodfacts"] == "closed"
+
+
+def _app_with(router, prefix):
+    app = FastAPI()
+    app.include_router(router, prefix=prefix)
+
+    def override(request: Request):
+        request.state.user_id = "circuit-test-user"
+        return MagicMock(id="circuit-test-user")
+
+    app.dependency_overrides[get_current_user] = override
+    return app
+
+
+def test_price_comparison_uses_local_estimate_while_open(open_openai_circuit):
+    from app.routers.shopping import router
+
+    client = TestClient(_app_with(router, "/shopping"))
+    response = client.post("/shopping/ai-price-comparison", json={"items": [{"name": "milk", "quantity": 2}]})
+    assert response.status_code == 200
+    assert response.json() == {"amazon_total": 7.0, "walmart_total": 5.6}
+
+
+def test_generate_recipes_returns_503_with_retry_after_while_open(open_openai_circuit):
+    from app.routers.recipes import router
+
+    client = TestClient(_app_with(router, "/recipes"))
+    response = client.post("/recipes/", json={"ingredients": ["rice", "beans"]})
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) >= 1
+
+
+class _OffClient:
+    def __init__(self, response):
+        self.response = response
+        self.calls = 0
+
+    async def get(self, url):
+        self.calls += 1
+        return httpx.Response(self.response[0], json=self.response[1], request=httpx.Request("GET", url))
+
+
+def test_open_food_facts_5xx_counts_as_a_failure():
+    from app.routers import barcode
+
+    breaker = CircuitBreaker("openfoodfacts", failure_threshold=1, recovery_seconds=60)
+    client = _OffClient((502, {}))
+
+    async def unknown(*args, **kwargs):
+        return {"name": "Unknown Product", "category": "other", "confidence": "low"}
+
+    with patch.dict(circuit_breaker._breakers, {"openfoodfacts": breaker}), \
+         patch.object(barcode, "get_async_client", return_value=client), \
+         patch.object(barcode, "_ai_clean_name", unknown):
+        asyncio.run(barcode._lookup_product_by_number("0123456789012"))
+    assert breaker.state == "open"
+
+
+def test_off_match_is_kept_when_name_cleaning_fails_fast(open_openai_circuit):
+    from app.routers import barcode
+
+    product = {"status": 1, "product": {"product_name": "Brand Whole Milk 1L", "categories_tags": ["en:dairies", "en:milks"]}}
+    with patch.object(barcode, "get_async_client", return_value=_OffClient((200, product))):
+        result = asyncio.run(barcode._lookup_product_by_number("0123456789012"))
+    assert result == {"barcode": "0123456789012", "name": "Brand Whole Milk 1L", "category": "dairy", "confidence": "medium"}
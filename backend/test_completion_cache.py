@@ -0,0 +1,187 @@
+"""Completion cache: byte-bounded LRU backends (app/services/cache_backends.py)
+and the per-route, stale-while-revalidate layer in call_chat_completion.
+"""
+import asyncio
+import time
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from app.services import openai_client
+from app.services.cache_backends import MemoryCacheBackend, SqliteCacheBackend, build_backend
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return MemoryCacheBackend(max_bytes=200)
+    return SqliteCacheBackend(str(tmp_path / "cache.sqlite3"), max_bytes=200)
+
+
+def test_backend_roundtrip(backend):
+    backend.set("k", "value", ttl=60)
+    entry = backend.get("k")
+    assert entry.value == "value"
+    assert entry.is_fresh(time.time())
+    assert backend.get("missing") is None
+
+
+def test_backend_expired_entry_is_a_miss(backend):
+    backend.set("k", "value", ttl=-1)
+    assert backend.get("k") is None
+
+
+def test_backend_stale_entry_is_served_but_not_fresh(backend):
+    backend.set("k", "value", ttl=-1, stale_ttl=60)
+    entry = backend.get("k")
+    assert entry.value == "value"
+    assert not entry.is_fresh(time.time())
+
+
+def test_backend_evicts_least_recently_used_by_bytes(backend):
+    backend.set("a", "x" * 70, ttl=60)
+    time.sleep(0.001)
+    backend.set("b", "x" * 70, ttl=60)
+    time.sleep(0.001)
+    backend.get("a")  # a is now more recently used than b
+    time.sleep(0.001)
+    backend.set("c", "x" * 70, ttl=60)  # 3 * 71 bytes > 200 -> evict one
+    assert backend.get("b") is None
+    assert backend.get("a") is not None
+    assert backend.get("c") is not None
+    assert backend.size_bytes <= 200
+
+
+def test_backend_skips_values_larger_than_the_cache(backend):
+    backend.set("big", "x" * 500, ttl=60)
+    assert backend.get("big") is None
+
+
+def test_sqlite_backend_is_shared_between_processes_on_one_file(tmp_path):
+    path = str(tmp_path / "shared.sqlite3")
+    worker_a = SqliteCacheBackend(path, max_bytes=10_000)
+    worker_b = SqliteCacheBackend(path, max_bytes=10_000)
+    worker_a.set("k", "from a", ttl=60)
+    assert worker_b.get("k").value == "from a"
+
+
+def test_sqlite_eviction_frees_a_batch_and_tracks_bytes_without_rescanning(tmp_path):
+    backend = SqliteCacheBackend(str(tmp_path / "cache.sqlite3"), max_bytes=1000)
+    for i in range(9):
+        backend.set(f"k{i:02}", "x" * 97, ttl=60)  # 100 bytes each
+    with patch.object(backend, "_table_bytes", wraps=backend._table_bytes) as scans:
+        backend.set("k00", "y" * 97, ttl=60)  # replacing an entry doesn't grow the total
+        backend.set("k09", "x" * 97, ttl=60)  # exactly full
+        assert scans.call_count == 0
+        backend.set("k10", "x" * 97, ttl=60)  # over: one rescan, evict down to 90%
+        assert scans.call_count == 1
+    assert len(backend) == 9 and backend._bytes == backend.size_bytes == 900
+    backend.delete("k10")
+    assert backend._bytes == backend.size_bytes == 800
+
+
+def test_async_methods_match_the_sync_ones(backend):
+    async def run():
+        await backend.aset("a", "1", ttl=60)
+        await backend.aset_many({"b": "2", "c": "3"}, ttl=60)
+        return (await backend.aget("a")).value, {k: e.value for k, e in (await backend.aget_many(["b", "c", "z"])).items()}
+
+    assert asyncio.run(run()) == ("1", {"b": "2", "c": "3"})
+
+
+def test_unusable_sqlite_path_falls_back_to_memory(tmp_path):
+    backend = build_backend("sqlite", str(tmp_path / "missing" / "cache.sqlite3"), 1000)
+    assert isinstance(backend, MemoryCacheBackend)
+    assert build_backend("off", "", 1000) is None
+
+
+
+class CountingClient:
+    def __init__(self):
+        self.posts = 0
+
+    async def post(self, *args, **kwargs):
+        self.posts += 1
+        return httpx.Response(
+            200,
+            json={
+                "model": "gpt-4o-mini",
+                "usage": {"prompt_tokens": 10, "completion_tokens": 5},
+                "choices": [{"message": {"content": f"answer {self.posts}"}}],
+            },
+            request=httpx.Request("POST", openai_client.OPENAI_CHAT_URL),
+        )
+
+
+@pytest.fixture
+def fresh_cache():
+    cache = MemoryCacheBackend(max_bytes=1_000_000)
+    with patch.object(openai_client, "_completion_cache", cache):
+        yield cache
+
+
+def _cache_requests(route, result):
+    return openai_client.completion_cache_requests.value(route=route, result=result)
+
+
+def test_opted_in_route_is_served_from_cache(fresh_cache):
+    client = CountingClient()
+    route = "recipes.parse_ingredients"
+    before = _cache_requests(route, "hit"), _cache_requests(route, "miss")
+
+    async def run():
+        first = await openai_client.call_chat_completion("sys", "2 cups rice", temperature=0.1, route="recipes.parse_ingredients")
+        second = await openai_client.call_chat_completion("sys", "2 cups rice", temperature=0.1, route="recipes.parse_ingredients")
+        return first, second
+
+    with patch.object(openai_client, "get_async_client", return_value=client):
+        assert asyncio.run(run()) == ("answer 1", "answer 1")
+    assert client.posts == 1
+    assert (_cache_requests(route, "hit") - before[0], _cache_requests(route, "miss") - before[1]) == (1, 1)
+
+
+def test_route_without_policy_is_never_cached(fresh_cache):
+    client = CountingClient()
+
+    async def run():
+        await openai_client.call_chat_completion("sys", "user", route="recipes.generate_recipes")
+        await openai_client.call_chat_completion("sys", "user", route="recipes.generate_recipes")
+
+    with patch.object(openai_client, "get_async_client", return_value=client):
+        asyncio.run(run())
+    assert client.posts == 2
+    assert len(fresh_cache) == 0
+
+
+def test_stale_entry_is_served_and_refreshed_once_in_background(fresh_cache):
+    client = CountingClient()
+    payload = {
+        "model": openai_client.MODEL,
+        "messages": [{"role": "system", "content": "sys"}, {"role": "user", "content": "label me"}],
+        "temperature": 0.3,
+        "max_tokens": 120,
+        "n": 1,
+    }
+    key = openai_client.payload_key(payload)
+    fresh_cache.set(key, "stale answer", ttl=-1, stale_ttl=60)
+    route = "profile.generate_dietary_label"
+    stale_before = _cache_requests(route, "stale")
+    refreshes_before = openai_client.completion_cache_refreshes.value(route=route)
+
+    async def run():
+        results = await asyncio.gather(*(
+            openai_client.call_chat_completion("sys", "label me", max_tokens=120, temperature=0.3, route="profile.generate_dietary_label")
+            for _ in range(3)
+        ))
+        await asyncio.gather(*openai_client._background_tasks)
+        return results
+
+    with patch.object(openai_client, "get_async_client", return_value=client):
+        results = asyncio.run(run())
+
+    assert results == ["stale answer"] * 3
+    assert client.posts == 1
+    assert fresh_cache.get(key).value == "answer 1"
+    assert _cache_requests(route, "stale") - stale_before == 3
+    assert openai_client.completion_cache_refreshes.value(route=route) - refreshes_before == 1
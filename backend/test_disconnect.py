@@ -0,0 +1,137 @@
+"""Client disconnects (app/services/disconnect.py): the upstream wait is
+cancelled, anything else a handler is doing runs to completion.
+"""
+import asyncio
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi import Request
+
+from app.services import metrics, openai_client, recipe_cache
+from app.services.auth import get_current_user
+from app.services.cache_backends import MemoryCacheBackend
+from app.services.disconnect import CancelOnDisconnect, abandonable
+
+
+def _scope(path="/", method="POST", body=b"", headers=()):
+    return {
+        "type": "http", "http_version": "1.1", "method": method, "scheme": "http",
+        "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"content-length", str(len(body)).encode()), *headers],
+        "client": ("127.0.0.1", 5000), "server": ("testserver", 80),
+    }
+
+
+def _client(body=b"", disconnect_after=0.02):
+    """(receive, send, sent): sends `body`, then disconnects after `disconnect_after` seconds."""
+    sent = []
+    state = {"body_sent": False}
+
+    async def receive():
+        if not state["body_sent"]:
+            state["body_sent"] = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await asyncio.sleep(disconnect_after)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    return receive, send, sent
+
+
+async def _respond(send, body=b"ok"):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": body})
+
+
+def test_disconnect_cancels_an_upstream_wait():
+    state = {"cancelled": False}
+
+    async def app(scope, receive, send):
+        await receive()
+        try:
+            with abandonable():
+                await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            state["cancelled"] = True
+            raise
+        await _respond(send)
+
+    receive, send, sent = _client()
+    before = metrics.http_requests_cancelled.value(route="unmatched")
+    asyncio.run(asyncio.wait_for(CancelOnDisconnect(app)(_scope(), receive, send), 2))
+    assert state["cancelled"] and sent == []
+    assert metrics.http_requests_cancelled.value(route="unmatched") - before == 1
+
+
+def test_other_work_finishes_and_a_later_upstream_call_is_cancelled_on_entry():
+    state = {"wrote": False, "called": False}
+
+    async def app(scope, receive, send):
+        await receive()
+        await asyncio.sleep(0.05)  # e.g. a database write, still running when the client leaves
+        state["wrote"] = True
+        with abandonable():
+            await asyncio.sleep(0)
+            state["called"] = True
+        await _respond(send)
+
+    receive, send, sent = _client(disconnect_after=0.01)
+    asyncio.run(asyncio.wait_for(CancelOnDisconnect(app)(_scope(), receive, send), 2))
+    assert state == {"wrote": True, "called": False}
+
+
+def test_completed_requests_are_not_cancelled_by_the_closing_disconnect():
+    async def app(scope, receive, send):
+        await receive()
+        await _respond(send)
+        with abandonable():  # after the response, e.g. a background task
+            await asyncio.sleep(0.05)
+
+    receive, send, sent = _client(disconnect_after=0)
+    asyncio.run(asyncio.wait_for(CancelOnDisconnect(app)(_scope(), receive, send), 2))
+    assert [m["type"] for m in sent] == ["http.response.start", "http.response.body"]
+
+
+@pytest.fixture
+def app():
+    from app.main import app
+
+    def override(request: Request):
+        request.state.user_id = "disconnect-user"
+        return MagicMock(id="disconnect-user")
+
+    app.dependency_overrides[get_current_user] = override
+    with patch.object(recipe_cache, "_cache", MemoryCacheBackend(max_bytes=1 << 20)):
+        try:
+            yield app
+        finally:
+            app.dependency_overrides.pop(get_current_user, None)
+
+
+def test_generate_recipes_stops_the_openai_call_when_the_client_leaves(app):
+    upstream = {"started": False, "cancelled": False}
+
+    async def slow_dispatch(payload, route, size_hint=None):
+        upstream["started"] = True
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            upstream["cancelled"] = True
+            raise
+
+    body = json.dumps({"ingredients": ["rice", "beans"]}).encode()
+    receive, send, sent = _client(body, disconnect_after=0.05)
+    scope = _scope("/recipes/", body=body, headers=[(b"content-type", b"application/json")])
+    cancelled_calls = metrics.openai_calls_cancelled.value(route="recipes.generate_recipes", outcome="cancelled")
+    cancelled_requests = metrics.http_requests_cancelled.value(route="/recipes/")
+
+    with patch.object(openai_client, "_dispatch", slow_dispatch):
+        asyncio.run(asyncio.wait_for(app(scope, receive, send), 2))
+
+    assert upstream == {"started": True, "cancelled": True}
+    assert sent == []
+    assert metrics.openai_calls_cancelled.value(route="recipes.generate_recipes", outcome="cancelled") - cancelled_calls == 1
+    assert metrics.http_requests_cancelled.value(route="/recipes/") - cancelled_requests == 1
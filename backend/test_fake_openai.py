@@ -0,0 +1,139 @@
+"""The local OpenAI stand-in (devtools/fake_openai.py): every AI route gets a
+schema-valid canned answer through the real transport, and the failure
+profile drives the client's retry path.
+"""
+import asyncio
+import base64
+import json
+from unittest.mock import MagicMock, patch
+
+import httpx
+import pytest
+from fastapi import Request
+from fastapi.testclient import TestClient
+
+from app.services import openai_client, recipe_cache, translation_memory
+from app.services.auth import get_current_user
+from devtools.fake_openai import FakeProfile, create_app, running
+
+JPEG = b"\xff\xd8\xff" + b"fake-image-bytes"
+
+
+@pytest.fixture
+def fake():
+    """Route the backend's OpenAI client to an in-process fake."""
+    fake_app = create_app(FakeProfile(latency_ms=0), seed=1)
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=fake_app))
+    with patch.object(openai_client, "get_async_client", return_value=client), \
+         patch.object(openai_client, "COMPLETION_CACHE_BACKEND", "off"), \
+         patch.object(openai_client, "_completion_cache", None), \
+         patch.object(recipe_cache, "RECIPE_CACHE_BACKEND", "off"), \
+         patch.object(recipe_cache, "_cache", None), \
+         patch.object(translation_memory, "TRANSLATION_MEMORY_BACKEND", "off"), \
+         patch.object(translation_memory, "_memory", None):
+        yield fake_app
+
+
+@pytest.fixture
+def api():
+    from app.main import app
+
+    def override(request: Request):
+        request.state.user_id = "fake-openai-user"
+        return MagicMock(id="fake-openai-user")
+
+    app.dependency_overrides[get_current_user] = override
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.pop(get_current_user, None)
+
+
+def test_every_ai_route_gets_a_usable_canned_answer(fake, api):
+    recipes = api.post("/recipes/", json={"ingredients": ["rice", "beans"]})
+    assert recipes.status_code == 200
+    assert recipes.json()[0]["name"] == "Garlic Rice Bowl"
+
+    parsed = api.post("/recipes/parse-ingredients", json={"lines": ["1/2 cup rice", "2 cloves garlic, minced", "salt and pepper"]})
+    assert parsed.json() == [
+        {"name": "rice", "quantity": 0.5, "unit": "cup"},
+        {"name": "garlic", "quantity": 2.0, "unit": "clove"},
+        {"name": "salt and pepper", "quantity": 1.0, "unit": "pc"},  # the only line sent to the fake
+    ]
+
+    matched = api.post("/pantry/match-ingredients", json={
+        "ingredient_lines": ["1 cup rice"],
+        "pantry_items": [{"id": "p1", "name": "rice", "quantity": 2, "unit": "cup"}],
+    })
+    assert matched.json()[0]["ingredient_name"] == "1 cup rice"
+
+    prices = api.post("/shopping/ai-price-comparison", json={"items": [{"name": "milk", "quantity": 2}]})
+    assert prices.json()["walmart_total"] > 0
+
+    names = api.post("/recipes/translate-names", json={"names": ["Bean Chili"], "language": "es"})
+    assert names.json() == ["Bean Chili (translated)"]
+
+    full = api.post("/recipes/translate-full", json={"recipes": [{"name": "Bean Chili", "servings": 2}], "language": "fr"})
+    assert full.json() == [{"name": "Bean Chili (translated)", "servings": 2}]
+
+    packed = api.post("/recipes/translate-full", json={"recipes": [{"name": "Soup"}, {"name": "Stew"}], "language": "fr"})
+    assert packed.json() == [{"name": "Soup (translated)"}, {"name": "Stew (translated)"}]
+
+    label = api.post("/profile/dietary-label", json={"text": "no dairy"})
+    assert label.json()["label"] == "No Dairy"
+
+    receipt = api.post("/vision/analyze-receipt", files={"file": ("r.jpg", JPEG, "image/jpeg")})
+    assert [i["name"] for i in receipt.json()["items"]] == ["Organic Banana", "2% Milk"]
+
+    photo = api.post("/vision/analyze-ingredients", files={"file": ("p.jpg", JPEG, "image/jpeg")})
+    assert "garlic" in photo.json()["ingredients"]
+
+    with patch("app.routers.barcode.ZXING_AVAILABLE", False):
+        scanned = api.post("/barcode/vision-lookup", json={"image": base64.b64encode(JPEG).decode()})
+    assert scanned.json()["barcode"] == "012345678905"
+
+    routes = {key.split(":")[0] for key in fake.state.stats}
+    assert {
+        "recipes.generate_recipes", "recipes.parse_ingredients", "pantry.match_ingredients",
+        "shopping.ai_price_comparison", "recipes.translate_recipe_names", "recipes.translate_full_recipes",
+        "recipes.translate_full_recipes.packed", "profile.generate_dietary_label", "vision.analyze_receipt", "vision.analyze_ingredients",
+        "barcode.vision_barcode_lookup", "barcode.ai_clean_name",
+    } <= routes
+
+
+def test_429_profile_exercises_retry_after(fake):
+    fake.state.profile = FakeProfile(latency_ms=0, error_429_rate=1.0, retry_after_seconds=0.25)
+    slept = []
+
+    async def fake_sleep(seconds):
+        slept.append(seconds)
+
+    with patch.object(openai_client.asyncio, "sleep", fake_sleep):
+        with pytest.raises(httpx.HTTPStatusError):
+            asyncio.run(openai_client.call_chat_completion("sys", "hi", route="t.fake"))
+    assert fake.state.stats["-:429"] == openai_client.MAX_RETRIES + 1
+    assert len(slept) == openai_client.MAX_RETRIES
+    assert all(0.25 <= s < 0.6 for s in slept)
+
+
+def test_truncates_at_max_tokens_like_the_real_api():
+    with running(FakeProfile(latency_ms=0, completion_tokens=500)) as base_url:
+        body = httpx.post(f"{base_url}/v1/chat/completions", json={
+            "model": "gpt-4o-mini", "max_tokens": 5,
+            "messages": [{"role": "system", "content": "You are a nutritionist and chef assistant."}],
+        }).json()
+    assert body["choices"][0]["finish_reason"] == "length"
+    assert body["usage"]["completion_tokens"] == 5
+
+
+def test_streams_sse_with_final_usage_over_real_http():
+    with running(FakeProfile(latency_ms=0)) as base_url:
+        with httpx.stream("POST", f"{base_url}/v1/chat/completions", json={
+            "model": "gpt-4o-mini", "stream": True, "stream_options": {"include_usage": True},
+            "messages": [{"role": "user", "content": "hello"}],
+        }) as response:
+            events = [line[6:] for line in response.iter_lines() if line.startswith("data: ")]
+    assert events[-1] == "[DONE]"
+    chunks = [json.loads(e) for e in events[:-1]]
+    assert "".join(c["choices"][0]["delta"].get("content", "") for c in chunks if c["choices"]) == "OK"
+    assert chunks[-1]["usage"]["completion_tokens"] >= 1
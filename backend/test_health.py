@@ -71,8 +71,8 @@ def test_check_openai_returns_error_when_unreachable():
     from app.main import _check_openai
 
     with patch("app.main.os.getenv", return_value="sk-test"), \
-         patch("app.main.httpx.Client") as mock_client:
-        mock_client.return_value.__enter__.return_value.get.side_effect = Exception("no network")
+         patch("app.main.http_clients.get_sync_client") as mock_client:
+        mock_client.return_value.get.side_effect = Exception("no network")
         assert _check_openai() == "error"
 
 
@@ -84,6 +84,6 @@ def test_check_supabase_ok_on_2xx():
         status_code = 200
 
     with patch("app.main.os.getenv", return_value="value"), \
-         patch("app.main.httpx.Client") as mock_client:
-        mock_client.return_value.__enter__.return_value.get.return_value = _Resp()
+         patch("app.main.http_clients.get_sync_client") as mock_client:
+        mock_client.return_value.get.return_value = _Resp()
         assert _check_supabase() == "ok"
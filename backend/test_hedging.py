@@ -0,0 +1,163 @@
+"""Request hedging (app/services/hedging.py) and the RatioBudget that caps it."""
+import asyncio
+import logging
+import time
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from app.services import hedging, openai_client
+from app.services.hedging import LatencyTracker
+from app.services.ratio_budget import RatioBudget
+
+
+def _warm(route, seconds):
+    tracker = LatencyTracker()
+    for _ in range(hedging.MIN_SAMPLES):
+        tracker.record(seconds)
+    return patch.dict(hedging._trackers, {route: tracker})
+
+
+@pytest.fixture
+def rich_budget():
+    with patch.object(hedging, "hedge_budget", RatioBudget(ratio=1.0, max_tokens=10.0)):
+        yield
+
+
+def test_tracker_needs_history_before_reporting_a_percentile():
+    tracker = LatencyTracker()
+    tracker.record(1.0)
+    assert tracker.percentile(0.95) is None
+    for i in range(100):
+        tracker.record(i / 100)
+    assert 0.9 <= tracker.percentile(0.95) <= 1.0
+
+
+def test_budget_caps_extra_calls_at_ratio_of_primaries():
+    budget = RatioBudget(ratio=0.5, min_per_second=0.0, max_tokens=1.0)
+    assert budget.try_spend()  # starts with max_tokens banked
+    assert not budget.try_spend()
+    budget.deposit()
+    budget.deposit()
+    assert budget.try_spend()
+    assert budget.denied == 1
+
+
+def test_fast_primary_is_never_hedged(rich_budget):
+    calls = {"n": 0}
+
+    async def attempt():
+        calls["n"] += 1
+        return "primary"
+
+    with _warm("t.fast", 0.05):
+        assert asyncio.run(hedging.hedged("t.fast", attempt)) == ("primary", False)
+    assert calls["n"] == 1
+
+
+def test_slow_primary_is_hedged_and_the_loser_cancelled(rich_budget):
+    state = {"n": 0, "primary_cancelled": False}
+
+    async def attempt():
+        state["n"] += 1
+        if state["n"] == 1:
+            try:
+                await asyncio.sleep(1.0)
+            except asyncio.CancelledError:
+                state["primary_cancelled"] = True
+                raise
+            return "primary"
+        return "hedge"
+
+    won = hedging.openai_hedges.value(route="t.slow", winner="hedge")
+    with _warm("t.slow", 0.01):
+        assert asyncio.run(hedging.hedged("t.slow", attempt)) == ("hedge", True)
+    assert state["primary_cancelled"]
+    assert hedging.openai_hedges.value(route="t.slow", winner="hedge") - won == 1
+
+
+def test_no_hedge_when_budget_is_exhausted():
+    calls = {"n": 0}
+
+    async def attempt():
+        calls["n"] += 1
+        await asyncio.sleep(0.05)
+        return "primary"
+
+    empty = RatioBudget(ratio=0.0, min_per_second=0.0, max_tokens=0.0)
+    with _warm("t.broke", 0.001), patch.object(hedging, "hedge_budget", empty):
+        assert asyncio.run(hedging.hedged("t.broke", attempt)) == ("primary", False)
+    assert calls["n"] == 1
+
+
+def test_failed_first_finisher_falls_back_to_the_other_attempt(rich_budget):
+    state = {"n": 0}
+
+    async def attempt():
+        state["n"] += 1
+        if state["n"] == 1:
+            await asyncio.sleep(0.05)
+            return "primary"
+        raise RuntimeError("hedge failed")
+
+    with _warm("t.fail", 0.01):
+        assert asyncio.run(hedging.hedged("t.fail", attempt)) == ("primary", True)
+
+
+def test_hedged_completion_logs_winner_and_loser_cost(rich_budget, caplog):
+    url = openai_client.OPENAI_CHAT_URL
+    state = {"n": 0}
+
+    class Client:
+        async def post(self, *args, **kwargs):
+            state["n"] += 1
+            if state["n"] == 1:
+                await asyncio.sleep(1.0)
+            return httpx.Response(
+                200,
+                json={"model": "gpt-4o-mini", "usage": {"prompt_tokens": 30, "completion_tokens": 8},
+                      "choices": [{"message": {"content": "Vegan"}}]},
+                request=httpx.Request("POST", url),
+            )
+
+    route = "recipes.translate_recipe_names"
+    with _warm(route, 0.01), \
+         caplog.at_level(logging.INFO, logger="app.services.openai_client"), \
+         patch.object(openai_client, "get_async_client", return_value=Client()), \
+         patch.object(openai_client, "_completion_cache", None), \
+         patch.object(openai_client, "COMPLETION_CACHE_BACKEND", "off"):
+        result = asyncio.run(openai_client.call_chat_completion("sys", "hedge me", route=route))
+
+    assert result == "Vegan"
+    lines = [r.getMessage() for r in caplog.records if "openai call" in r.getMessage()]
+    assert any("hedge=winner" in l and "completion_tokens=8" in l for l in lines)
+    assert any("hedge=loser" in l and "prompt_tokens=30" in l for l in lines)
+
+
+def test_barcode_name_cleaning_is_hedged_under_its_own_route(rich_budget):
+    from app.routers import barcode
+
+    url = openai_client.OPENAI_CHAT_URL
+    routes = []
+
+    class Client:
+        async def post(self, *args, **kwargs):
+            if not routes:
+                routes.append("slow")
+                await asyncio.sleep(1.0)
+            return httpx.Response(
+                200,
+                json={"model": "gpt-4o", "choices": [{"message": {"content": '{"name": "Whole Milk", "category": "dairy"}'}}]},
+                request=httpx.Request("POST", url),
+            )
+
+    with _warm("barcode.ai_clean_name", 0.01), \
+         patch.object(openai_client, "get_async_client", return_value=Client()), \
+         patch.object(openai_client, "_completion_cache", None), \
+         patch.object(openai_client, "COMPLETION_CACHE_BACKEND", "off"):
+        started = time.perf_counter()
+        result = asyncio.run(barcode._ai_clean_name("0123456789012", "Brand Whole Milk 1L"))
+
+    assert result["name"] == "Whole Milk"
+    assert time.perf_counter() - started < 0.5  # the hedge answered, not the slow first call
@@ -0,0 +1,103 @@
+"""Tests for the shared outbound client registry (app/services/http_clients.py):
+one pooled client per upstream, reused across calls, built/closed by the
+FastAPI lifespan and never a fresh client per request.
+"""
+import asyncio
+from unittest.mock import patch
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app.services import http_clients
+
+
+@pytest.fixture
+def upstream():
+    name = "test-upstream"
+    http_clients.register_upstream(name, http_clients.UpstreamConfig(
+        timeout=httpx.Timeout(1.0),
+        limits=httpx.Limits(max_connections=3, max_keepalive_connections=1),
+    ))
+    yield name
+    http_clients._upstreams.pop(name, None)
+    http_clients._async_clients.pop(name, None)
+    http_clients._sync_clients.pop(name, None)
+
+
+def test_async_client_is_reused_within_a_loop(upstream):
+    async def run():
+        return http_clients.get_async_client(upstream), http_clients.get_async_client(upstream)
+
+    first, second = asyncio.run(run())
+    assert first is second
+
+
+def test_async_client_is_rebuilt_for_a_new_loop(upstream):
+    """Pools are loop-bound, so a client from a finished loop is never handed out."""
+    first = asyncio.run(_get(upstream))
+    second = asyncio.run(_get(upstream))
+    assert first is not second
+
+
+async def _get(name):
+    return http_clients.get_async_client(name)
+
+
+def test_sync_client_is_shared(upstream):
+    assert http_clients.get_sync_client(upstream) is http_clients.get_sync_client(upstream)
+
+
+def test_unknown_upstream_raises():
+    with pytest.raises(KeyError):
+        http_clients.get_sync_client("never-registered")
+
+
+def test_shutdown_closes_clients(upstream):
+    async def run():
+        client = http_clients.get_async_client(upstream)
+        await http_clients.shutdown()
+        return client
+
+    sync_client = http_clients.get_sync_client(upstream)
+    client = asyncio.run(run())
+    assert client.is_closed
+    assert sync_client.is_closed
+
+
+def test_prewarm_failure_never_blocks_startup(upstream):
+    """An unreachable upstream at boot is logged, not raised."""
+    http_clients._upstreams[upstream].warm_url = "http://127.0.0.1:9/"
+
+    async def run():
+        await http_clients.startup()
+        await http_clients.shutdown()
+
+    with patch.dict("os.environ", {"HTTP_CLIENT_PREWARM": "1"}), \
+         patch.object(http_clients, "_upstreams", {upstream: http_clients._upstreams[upstream]}):
+        asyncio.run(run())
+
+
+def test_missing_h2_is_reported_for_http2_upstreams(upstream, caplog):
+    http_clients._upstreams[upstream].http2 = True
+
+    async def run():
+        await http_clients.startup()
+        await http_clients.shutdown()
+
+    with patch.dict("os.environ", {"HTTP_CLIENT_PREWARM": "0"}), \
+         patch.object(http_clients, "HTTP2_AVAILABLE", False), \
+         patch.object(http_clients, "_upstreams", {upstream: http_clients._upstreams[upstream]}):
+        asyncio.run(run())
+    assert any("h2 not installed: test-upstream" in r.getMessage() for r in caplog.records)
+
+
+def test_app_lifespan_starts_and_stops_registry():
+    from app.main import app
+
+    with patch("app.main.http_clients.startup") as startup, \
+         patch("app.main.http_clients.shutdown") as shutdown:
+        with TestClient(app):
+            startup.assert_awaited_once()
+            shutdown.assert_not_awaited()
+        shutdown.assert_awaited_once()
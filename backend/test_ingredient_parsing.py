@@ -13,7 +13,10 @@ from fastapi import Request
 from fastapi.testclient import TestClient
 
 from app.services.auth import get_current_user
-from app.services.ingredient_parsing import clean_ingredient_lines, strip_json_code_fences
+from app.services.ingredient_parsing import (
+    INGREDIENT_PARSE_MIN_CONFIDENCE, clean_ingredient_lines, merge_parsed_ingredients, parse_ingredient_line,
+    strip_json_code_fences,
+)
 
 
 # ---------------------------------------------------------------------------
@@ -60,6 +63,53 @@ def test_strip_json_code_fences_trims_surrounding_whitespace():
     assert strip_json_code_fences(raw) == '{"a": 1}'
 
 
+# ---------------------------------------------------------------------------
+# Unit tests: parse_ingredient_line / merge_parsed_ingredients
+# ---------------------------------------------------------------------------
+
+@pytest.mark.parametrize("line, item", [
+    ("2 cups rice", {"name": "rice", "quantity": 2.0, "unit": "cup"}),
+    ("1 1/2 tbsp olive oil", {"name": "olive oil", "quantity": 1.5, "unit": "tbsp"}),
+    ("1½ cups flour", {"name": "flour", "quantity": 1.5, "unit": "cup"}),
+    ("¼ tsp salt", {"name": "salt", "quantity": 0.25, "unit": "tsp"}),
+    ("2-3 cloves garlic, minced", {"name": "garlic", "quantity": 3.0, "unit": "clove"}),
+    ("1 to 2 Tablespoons honey", {"name": "honey", "quantity": 2.0, "unit": "tbsp"}),
+    ("500g chicken breast", {"name": "chicken breast", "quantity": 500.0, "unit": "g"}),
+    ("1 (14 oz) can black beans", {"name": "black beans", "quantity": 1.0, "unit": "can"}),
+    ("apples, diced", {"name": "apples", "quantity": 1.0, "unit": "pc"}),
+    ("fresh garlic (optional)", {"name": "garlic", "quantity": 1.0, "unit": "pc"}),
+    ("a pinch of salt", {"name": "salt", "quantity": 1.0, "unit": "pinch"}),
+    ("3 large eggs", {"name": "eggs", "quantity": 3.0, "unit": "pc"}),
+])
+def test_parse_ingredient_line_handles_regular_lines(line, item):
+    parsed = parse_ingredient_line(line)
+    assert parsed.as_item() == item
+    assert parsed.confidence >= INGREDIENT_PARSE_MIN_CONFIDENCE
+    assert not parsed.skip
+
+
+@pytest.mark.parametrize("line", ["1 cup boiling water", "Water", "2 cups ice cubes"])
+def test_parse_ingredient_line_skips_water_and_ice(line):
+    assert parse_ingredient_line(line).skip
+
+
+@pytest.mark.parametrize("line", [
+    "salt and pepper", "2 x 400g cans chickpeas", "1/2 cup + 2 tbsp milk", "(optional)",
+    "1 T sugar", "2 c flour", "1 t salt", "one onion", "1 dozen eggs",
+])
+def test_parse_ingredient_line_is_unsure_about_irregular_lines(line):
+    assert parse_ingredient_line(line).confidence < INGREDIENT_PARSE_MIN_CONFIDENCE
+
+
+def test_merge_puts_model_items_back_in_line_order():
+    parsed = [parse_ingredient_line(l) for l in ["salt and pepper", "1 cup rice", "ice", "2 x 400g cans chickpeas"]]
+    one_each = [{"name": "salt"}, {"name": "chickpeas"}]
+    assert [i["name"] for i in merge_parsed_ingredients(parsed, one_each)] == ["salt", "rice", "chickpeas"]
+    # A different count can't be aligned: keep the model's items together.
+    split = [{"name": "salt"}, {"name": "pepper"}, {"name": "chickpeas"}]
+    assert [i["name"] for i in merge_parsed_ingredients(parsed, split)] == ["salt", "pepper", "chickpeas", "rice"]
+
+
 # ---------------------------------------------------------------------------
 # Router-level tests: lock in end-to-end behavior post-refactor
 # ---------------------------------------------------------------------------
@@ -86,17 +136,21 @@ def client():
 def test_parse_ingredients_strips_blank_lines_and_fenced_json(client):
     """recipes.py /parse-ingredients: blank lines are dropped before the AI call,
     and a ```json-fenced response is unwrapped correctly."""
-    fenced_response = '```json\n[{"name": "apples", "quantity": 2.0, "unit": "pc"}]\n```'
+    fenced_response = '```json\n[{"name": "salt", "quantity": 1.0, "unit": "pinch"}, {"name": "pepper", "quantity": 1.0, "unit": "pinch"}]\n```'
     with patch("app.routers.recipes.call_chat_completion", return_value=fenced_response) as mock_call:
         response = client.post(
             "/recipes/parse-ingredients",
-            json={"lines": ["  2 apples  ", "", "   "]},
+            json={"lines": ["  2 apples  ", "", "   ", " salt and pepper "]},
         )
     assert response.status_code == 200
-    assert response.json() == [{"name": "apples", "quantity": 2.0, "unit": "pc"}]
-    # only the non-blank, stripped line should have reached the AI call
+    assert response.json() == [
+        {"name": "apples", "quantity": 2.0, "unit": "pc"},
+        {"name": "salt", "quantity": 1.0, "unit": "pinch"},
+        {"name": "pepper", "quantity": 1.0, "unit": "pinch"},
+    ]
+    # only the non-blank, stripped line the local parser couldn't settle should have reached the AI call
     user_prompt = mock_call.call_args.args[1] if len(mock_call.call_args.args) > 1 else mock_call.call_args.kwargs.get("user_prompt")
-    assert user_prompt == "2 apples"
+    assert user_prompt == "salt and pepper"
 
 
 def test_parse_ingredients_all_blank_lines_short_circuits(client):
@@ -107,6 +161,16 @@ def test_parse_ingredients_all_blank_lines_short_circuits(client):
     mock_call.assert_not_called()
 
 
+def test_parse_ingredients_regular_lines_never_reach_the_model(client):
+    with patch("app.routers.recipes.call_chat_completion") as mock_call:
+        response = client.post("/recipes/parse-ingredients", json={"lines": ["2 cups rice", "1 cup hot water", "½ lb ground beef"]})
+    assert response.json() == [
+        {"name": "rice", "quantity": 2.0, "unit": "cup"},
+        {"name": "ground beef", "quantity": 0.5, "unit": "lb"},
+    ]
+    mock_call.assert_not_called()
+
+
 def test_match_ingredients_strips_blank_lines_and_fenced_json(client):
     """pantry.py /match-ingredients: blank lines dropped, fenced JSON unwrapped."""
     fenced_response = (
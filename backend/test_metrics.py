@@ -0,0 +1,169 @@
+"""/metrics (app/services/metrics.py): Prometheus text exposition of HTTP and
+OpenAI latency/usage, merged across workers through snapshot files.
+"""
+import asyncio
+import json
+import os
+from unittest.mock import patch
+
+import httpx
+from fastapi.testclient import TestClient
+
+from app.services import metrics, openai_client
+from app.services.metrics import Registry
+
+
+def _sample(text, line_prefix):
+    for line in text.splitlines():
+        if line.startswith(line_prefix):
+            return float(line.rsplit(" ", 1)[1])
+    return None
+
+
+def test_histogram_exposition_is_cumulative_with_inf_sum_and_count():
+    reg = Registry()
+    h = reg.histogram("t_seconds", "Test.", ("route",), buckets=(0.1, 1))
+    for v in (0.05, 0.5, 0.5, 3):
+        h.observe(v, route='a"b')
+    text = metrics.render(metrics.merge_snapshots([reg.snapshot()]))
+
+    assert "# TYPE t_seconds histogram" in text
+    assert 't_seconds_bucket{route="a\\"b",le="0.1"} 1' in text
+    assert 't_seconds_bucket{route="a\\"b",le="1"} 3' in text
+    assert 't_seconds_bucket{route="a\\"b",le="+Inf"} 4' in text
+    assert 't_seconds_sum{route="a\\"b"} 4.05' in text
+    assert 't_seconds_count{route="a\\"b"} 4' in text
+
+
+def test_snapshots_merge_across_workers_and_drop_dead_gauges(tmp_path):
+    def worker(pid, requests, in_flight):
+        reg = Registry()
+        reg.counter("t_total", "Test.", ("route",)).inc(requests, route="r")
+        reg.gauge("t_in_flight", "Test.").set(in_flight)
+        reg.histogram("t_seconds", "Test.", buckets=(1,)).observe(0.5)
+        snap = reg.snapshot()
+        snap["pid"] = pid
+        (tmp_path / f"{pid}.json").write_text(json.dumps(snap))
+
+    worker(os.getpid(), 3, 2)
+    worker(2 ** 22 + 17, 4, 5)  # no such process: its counters stay, its gauge doesn't
+    (tmp_path / "torn.json").write_text("{")
+
+    merged = metrics.merge_snapshots(metrics._read_snapshots(str(tmp_path)))
+    text = metrics.render(merged)
+    assert 't_total{route="r"} 7' in text
+    assert "t_in_flight 2" in text
+    assert 't_seconds_bucket{le="1"} 2' in text
+
+
+def test_write_snapshot_round_trips(tmp_path):
+    metrics.write_snapshot(str(tmp_path))
+    files = os.listdir(tmp_path)
+    assert files == [f"{os.getpid()}.json"]
+    assert "http_request_duration_seconds" in json.loads((tmp_path / files[0]).read_text())["metrics"]
+
+
+def test_endpoint_reports_route_templates_and_openai_usage():
+    from app.main import app
+
+    class _Client:
+        async def post(self, url, headers=None, json=None):
+            return httpx.Response(
+                200,
+                json={"model": "gpt-4o-mini", "usage": {"prompt_tokens": 1000, "completion_tokens": 500},
+                      "choices": [{"message": {"content": "ok"}, "finish_reason": "stop"}]},
+                request=httpx.Request("POST", url),
+            )
+
+    with patch.object(openai_client, "get_async_client", return_value=_Client()):
+        asyncio.run(openai_client.call_chat_completion("sys", "hi", route="t.metrics"))
+
+    client = TestClient(app)
+    client.get("/health")
+    text = client.get("/metrics").text
+
+    assert 'http_request_duration_seconds_count{method="GET",route="/health",status="200"}' in text
+    assert _sample(text, 'openai_tokens_total{route="t.metrics",model="gpt-4o-mini",kind="prompt"}') == 1000
+    assert _sample(text, 'openai_tokens_total{route="t.metrics",model="gpt-4o-mini",kind="completion"}') == 500
+    assert _sample(text, 'openai_cost_usd_total{route="t.metrics",model="gpt-4o-mini"}') == 0.00045
+    assert _sample(text, 'openai_request_duration_seconds_count{route="t.metrics",model="gpt-4o-mini"}') == 1
+    assert _sample(text, 'openai_requests_in_flight{route="t.metrics"}') == 0
+
+
+def test_unmatched_paths_share_one_label():
+    from app.main import app
+
+    client = TestClient(app)
+    client.get("/no/such/path/123")
+    text = client.get("/metrics").text
+    assert 'route="unmatched",status="404"' in text
+    assert "/no/such/path" not in text
+
+
+def test_metrics_token_is_enforced_when_set():
+    from app import main
+
+    client = TestClient(main.app)
+    with patch.object(main, "METRICS_TOKEN", "s3cret"):
+        assert client.get("/metrics").status_code == 401
+        ok = client.get("/metrics", headers={"Authorization": "Bearer s3cret"})
+    assert ok.status_code == 200
+    assert ok.headers["content-type"].startswith("text/plain; version=0.0.4")
+
+
+def _counter_snapshot(pid, total):
+    reg = Registry()
+    reg.counter("t_total", "Test.").inc(total)
+    reg.gauge("t_in_flight", "Test.").set(1)
+    snap = reg.snapshot()
+    snap["pid"] = pid
+    return snap
+
+
+def test_dead_worker_snapshots_are_retired_without_losing_totals(tmp_path):
+    dead = 2 ** 22 + 17
+    for pid, total in ((os.getpid(), 3), (dead, 4)):
+        (tmp_path / f"{pid}.json").write_text(json.dumps(_counter_snapshot(pid, total)))
+
+    metrics._retire_dead(str(tmp_path))
+    (tmp_path / f"{dead}.json").write_text(json.dumps(_counter_snapshot(dead, 5)))  # pid reused, died again
+    metrics._retire_dead(str(tmp_path))
+
+    assert sorted(os.listdir(tmp_path)) == [f"{os.getpid()}.json", metrics.RETIRED_FILE]
+    text = metrics.render(metrics.merge_snapshots(metrics._read_snapshots(str(tmp_path))))
+    assert "t_total 12" in text
+    assert "t_in_flight 1" in text
+
+
+def test_first_write_retires_a_previous_process_file_under_our_pid(tmp_path):
+    (tmp_path / f"{os.getpid()}.json").write_text(json.dumps(_counter_snapshot(os.getpid(), 4)))
+    with patch.object(metrics, "_claimed", set()):
+        metrics.write_snapshot(str(tmp_path))
+        metrics.write_snapshot(str(tmp_path))
+
+    retired = json.loads((tmp_path / metrics.RETIRED_FILE).read_text())
+    assert retired["metrics"]["t_total"]["samples"] == [[[], 4]]
+    assert "t_in_flight" not in retired["metrics"]
+    assert "http_request_duration_seconds" in json.loads((tmp_path / f"{os.getpid()}.json").read_text())["metrics"]
+
+
+def test_concurrent_snapshot_writes_never_tear_the_file(tmp_path, caplog):
+    import threading
+
+    def slow_dump(obj, f):
+        text = json.dumps(obj)
+        f.write(text[:100])
+        f.flush()
+        threading.Event().wait(0.01)  # another writer gets in mid-file
+        f.write(text[100:])
+
+    with patch.object(metrics.json, "dump", slow_dump):
+        threads = [threading.Thread(target=metrics.write_snapshot, args=(str(tmp_path),)) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    assert not [r for r in caplog.records if "snapshot write failed" in r.getMessage()]
+    assert os.listdir(tmp_path) == [f"{os.getpid()}.json"]
+    assert "http_request_duration_seconds" in json.loads((tmp_path / f"{os.getpid()}.json").read_text())["metrics"]
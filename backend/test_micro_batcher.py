@@ -0,0 +1,155 @@
+"""Micro-batching (app/services/micro_batcher.py and its use in openai_client):
+compatible tiny completions arriving together share one merged upstream call,
+with per-caller answers split back out and individual calls as the fallback.
+"""
+import asyncio
+import json
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from app.services import openai_client
+from app.services.micro_batcher import MicroBatcher, micro_batch_items
+
+
+def test_items_in_one_window_run_as_one_batch():
+    calls = []
+
+    async def run_batch(items):
+        calls.append(list(items))
+        return [ValueError("bad") if item == "b" else item.upper() for item in items]
+
+    async def main():
+        batcher = MicroBatcher("t", window=0.01, max_size=10, run_batch=run_batch)
+        return await asyncio.gather(
+            batcher.submit("g", "a"), batcher.submit("g", "b"), batcher.submit("g", "c"),
+            batcher.submit("other", "d"),
+            return_exceptions=True,
+        )
+
+    a, b, c, d = asyncio.run(main())
+    assert (a, c, d) == ("A", "C", "D")
+    assert isinstance(b, ValueError)
+    assert sorted(map(len, calls)) == [1, 3]
+
+
+def test_full_batch_flushes_without_waiting_for_the_window():
+    async def run_batch(items):
+        return items
+
+    async def main():
+        batcher = MicroBatcher("t", window=60, max_size=2, run_batch=run_batch)
+        return await asyncio.wait_for(asyncio.gather(batcher.submit("g", 1), batcher.submit("g", 2)), 1)
+
+    assert asyncio.run(main()) == [1, 2]
+
+
+class _Client:
+    """Answers merged payloads per `merged_reply`, single ones with their prompt upper-cased."""
+
+    def __init__(self, merged_reply):
+        self.merged_reply = merged_reply
+        self.sent = []
+
+    async def post(self, url, **kwargs):
+        payload = kwargs["json"]
+        self.sent.append(payload)
+        system, user = payload["messages"][0]["content"], payload["messages"][1]["content"]
+        if "BATCH MODE" in system:
+            content = self.merged_reply(json.loads(user))
+        else:
+            content = user.upper()
+        return httpx.Response(
+            200,
+            json={"model": openai_client.MODEL, "usage": {"prompt_tokens": 10, "completion_tokens": 5},
+                  "choices": [{"message": {"content": content}, "finish_reason": "stop"}]},
+            request=httpx.Request("POST", url),
+        )
+
+
+ROUTE = "profile.generate_dietary_label"
+
+
+def _run_concurrently(client, prompts):
+    async def main():
+        return await asyncio.gather(*(
+            openai_client.call_chat_completion("label it", p, max_tokens=120, temperature=0.3, route=ROUTE)
+            for p in prompts
+        ))
+
+    with patch.object(openai_client._micro_batcher, "window", 0.02), \
+         patch.object(openai_client, "get_async_client", return_value=client), \
+         patch.object(openai_client, "COMPLETION_CACHE_BACKEND", "off"), \
+         patch.object(openai_client, "_completion_cache", None):
+        return asyncio.run(main())
+
+
+def test_concurrent_calls_share_one_merged_completion():
+    client = _Client(lambda requests: json.dumps({k: {"label": v.title()} for k, v in requests.items()}))
+    answers = _run_concurrently(client, ["no dairy", "vegan", "low salt"])
+
+    assert [json.loads(a)["label"] for a in answers] == ["No Dairy", "Vegan", "Low Salt"]
+    assert len(client.sent) == 1
+    merged = client.sent[0]
+    assert merged["response_format"] == {"type": "json_object"}
+    assert merged["max_tokens"] == 360
+    assert merged["temperature"] == 0.3
+
+
+def test_unparseable_merged_answer_falls_back_to_individual_calls():
+    client = _Client(lambda requests: "sorry, I can't do that")
+    before = micro_batch_items.value(batcher="openai.chat", sent="fallback")
+    answers = _run_concurrently(client, ["no dairy", "vegan"])
+
+    assert answers == ["NO DAIRY", "VEGAN"]
+    assert len(client.sent) == 3
+    assert micro_batch_items.value(batcher="openai.chat", sent="fallback") - before == 2
+
+
+def test_missing_ids_are_retried_individually():
+    client = _Client(lambda requests: json.dumps({"1": "first"}))
+    answers = _run_concurrently(client, ["a", "b"])
+    assert answers == ["first", "B"]
+
+
+def test_routes_that_did_not_opt_in_are_never_batched():
+    client = _Client(lambda requests: pytest.fail("should not merge"))
+
+    async def main():
+        return await asyncio.gather(*(
+            openai_client.call_chat_completion("sys", p, route="recipes.generate_recipes") for p in ("x", "y")
+        ))
+
+    with patch.object(openai_client._micro_batcher, "window", 0.02), \
+         patch.object(openai_client, "get_async_client", return_value=client):
+        assert asyncio.run(main()) == ["X", "Y"]
+
+
+def test_each_seat_is_charged_its_share_of_the_merged_usage():
+    from types import SimpleNamespace
+
+    from app.services import token_budget
+    from app.services.auth import request_state_var
+
+    budget = token_budget.TokenBudget(user_tpm=10_000, model_tpm={openai_client.MODEL: 100_000})
+    client = _Client(lambda requests: json.dumps({k: v.title() for k, v in requests.items()}))
+
+    async def as_user(user_id, prompt):
+        token = request_state_var.set(SimpleNamespace(user_id=user_id))
+        try:
+            return await openai_client.call_chat_completion("label it", prompt, max_tokens=120, temperature=0.3, route=ROUTE)
+        finally:
+            request_state_var.reset(token)
+
+    async def main():
+        return await asyncio.gather(as_user("alice", "no dairy"), as_user("bob", "vegan"))
+
+    with patch.object(token_budget, "budget", budget), \
+         patch.object(openai_client._micro_batcher, "window", 0.02), \
+         patch.object(openai_client, "get_async_client", return_value=client):
+        assert asyncio.run(main()) == ["No Dairy", "Vegan"]
+    assert len(client.sent) == 1
+    assert budget._users["alice"].used + budget._users["bob"].used in (15, 16)  # 15 tokens, rounded per seat
+    assert budget._users["alice"].used > 0 and budget._users["bob"].used > 0
+    assert budget._models[openai_client.MODEL].used == 15
@@ -83,15 +83,6 @@ def test_call_chat_completion_retries_connect_error_once():
     calls = {"count": 0}
 
     class FlakyClient:
-        def __init__(self, *args, **kwargs):
-            pass
-
-        async def __aenter__(self):
-            return self
-
-        async def __aexit__(self, *exc):
-            return False
-
         async def post(self, *args, **kwargs):
             calls["count"] += 1
             if calls["count"] == 1:
@@ -109,7 +100,7 @@ def test_call_chat_completion_retries_connect_error_once():
     async def no_sleep(_seconds):
         return None
 
-    with patch.object(openai_client.httpx, "AsyncClient", FlakyClient), \
+    with patch.object(openai_client, "get_async_client", return_value=FlakyClient()), \
          patch.object(openai_client.asyncio, "sleep", no_sleep):
         result = asyncio.run(openai_client.call_chat_completion("system", "user"))
 
@@ -157,15 +148,6 @@ def test_call_chat_completion_logs_calling_route(caplog):
     url = openai_client.OPENAI_CHAT_URL
 
     class FakeClient:
-        def __init__(self, *args, **kwargs):
-            pass
-
-        async def __aenter__(self):
-            return self
-
-        async def __aexit__(self, *exc):
-            return False
-
         async def post(self, *args, **kwargs):
             return httpx.Response(
                 200,
@@ -178,7 +160,7 @@ def test_call_chat_completion_logs_calling_route(caplog):
             )
 
     with caplog.at_level(logging.INFO, logger="app.services.openai_client"), \
-         patch.object(openai_client.httpx, "AsyncClient", FakeClient):
+         patch.object(openai_client, "get_async_client", return_value=FakeClient()):
         result = asyncio.run(
             openai_client.call_chat_completion(
                 "system", "user", route="pantry.match_ingredients"
@@ -1,5 +1,5 @@
 import json
-from unittest.mock import patch, MagicMock
+from unittest.mock import AsyncMock, MagicMock, patch
 
 from fastapi import FastAPI
 from fastapi.testclient import TestClient
@@ -25,16 +25,11 @@ def make_app(user_id="test-user-uuid-1234"):
     return app
 
 
-def _mock_openai_response(payload: dict):
-    mock_message = MagicMock()
-    mock_message.content = json.dumps(payload)
-    mock_choice = MagicMock()
-    mock_choice.message = mock_message
-    mock_response = MagicMock()
-    mock_response.choices = [mock_choice]
-    mock_response.model = "gpt-4o"
-    mock_response.usage = MagicMock(prompt_tokens=100, completion_tokens=50)
-    return mock_response
+def _mock_chat(payload: dict = None, **kwargs):
+    """Patch the async OpenAI transport the vision router calls."""
+    if payload is not None:
+        kwargs["return_value"] = json.dumps(payload)
+    return patch("app.routers.vision.call_chat_messages", new_callable=AsyncMock, **kwargs)
 
 
 def test_analyze_receipt_returns_parsed_items():
@@ -47,10 +42,7 @@ def test_analyze_receipt_returns_parsed_items():
         ],
         "rejected_lines_count": 3,
     }
-    mock_client = MagicMock()
-    mock_client.chat.completions.create.return_value = _mock_openai_response(payload)
-
-    with patch("app.routers.vision.OpenAI", return_value=mock_client):
+    with _mock_chat(payload):
         response = client.post(
             "/vision/analyze-receipt",
             files={"file": ("receipt.jpg", FAKE_JPEG_BYTES, "image/jpeg")},
@@ -75,10 +67,7 @@ def test_analyze_receipt_drops_invalid_items_and_normalizes_fields():
         ],
         "rejected_lines_count": -5,
     }
-    mock_client = MagicMock()
-    mock_client.chat.completions.create.return_value = _mock_openai_response(payload)
-
-    with patch("app.routers.vision.OpenAI", return_value=mock_client):
+    with _mock_chat(payload):
         response = client.post(
             "/vision/analyze-receipt",
             files={"file": ("receipt.jpg", FAKE_JPEG_BYTES, "image/jpeg")},
@@ -107,10 +96,7 @@ def test_analyze_receipt_null_quantity_stays_null():
         ],
         "rejected_lines_count": 0,
     }
-    mock_client = MagicMock()
-    mock_client.chat.completions.create.return_value = _mock_openai_response(payload)
-
-    with patch("app.routers.vision.OpenAI", return_value=mock_client):
+    with _mock_chat(payload):
         response = client.post(
             "/vision/analyze-receipt",
             files={"file": ("receipt.jpg", FAKE_JPEG_BYTES, "image/jpeg")},
@@ -125,12 +111,7 @@ def test_analyze_receipt_null_quantity_stays_null():
 def test_analyze_receipt_no_items_found():
     client = TestClient(make_app())
 
-    mock_client = MagicMock()
-    mock_client.chat.completions.create.return_value = _mock_openai_response(
-        {"items": [], "rejected_lines_count": 0}
-    )
-
-    with patch("app.routers.vision.OpenAI", return_value=mock_client):
+    with _mock_chat({"items": [], "rejected_lines_count": 0}):
         response = client.post(
             "/vision/analyze-receipt",
             files={"file": ("receipt.jpg", FAKE_JPEG_BYTES, "image/jpeg")},
@@ -156,10 +137,7 @@ def test_analyze_receipt_image_too_large_returns_413():
 def test_analyze_receipt_openai_failure_returns_500():
     client = TestClient(make_app())
 
-    mock_client = MagicMock()
-    mock_client.chat.completions.create.side_effect = Exception("OpenAI down")
-
-    with patch("app.routers.vision.OpenAI", return_value=mock_client):
+    with _mock_chat(side_effect=Exception("OpenAI down")):
         response = client.post(
             "/vision/analyze-receipt",
             files={"file": ("receipt.jpg", FAKE_JPEG_BYTES, "image/jpeg")},
@@ -188,15 +166,14 @@ def test_analyze_receipt_rejects_bad_content_type():
     """A non-image content_type is rejected outright, no OpenAI call made."""
     client = TestClient(make_app())
 
-    mock_client = MagicMock()
-    with patch("app.routers.vision.OpenAI", return_value=mock_client):
+    with _mock_chat() as mock_chat:
         response = client.post(
             "/vision/analyze-receipt",
             files={"file": ("notes.txt", b"just some text", "text/plain")},
         )
 
     assert response.status_code == 400
-    mock_client.chat.completions.create.assert_not_called()
+    mock_chat.assert_not_called()
 
 
 def test_analyze_receipt_rejects_txt_renamed_to_jpg():
@@ -205,53 +182,73 @@ def test_analyze_receipt_rejects_txt_renamed_to_jpg():
     rejected -- no OpenAI call made."""
     client = TestClient(make_app())
 
-    mock_client = MagicMock()
-    with patch("app.routers.vision.OpenAI", return_value=mock_client):
+    with _mock_chat() as mock_chat:
         response = client.post(
             "/vision/analyze-receipt",
             files={"file": ("receipt.jpg", b"this is plain text, not a real image", "image/jpeg")},
         )
 
     assert response.status_code == 400
-    mock_client.chat.completions.create.assert_not_called()
+    mock_chat.assert_not_called()
 
 
 def test_analyze_ingredients_rejects_txt_renamed_to_jpg():
     client = TestClient(make_app())
 
-    mock_client = MagicMock()
-    with patch("app.routers.vision.OpenAI", return_value=mock_client):
+    with _mock_chat() as mock_chat:
         response = client.post(
             "/vision/analyze-ingredients",
             files={"file": ("photo.jpg", b"this is plain text, not a real image", "image/jpeg")},
         )
 
     assert response.status_code == 400
-    mock_client.chat.completions.create.assert_not_called()
+    mock_chat.assert_not_called()
 
 
 def test_analyze_ingredients_accepts_valid_image_and_reaches_openai():
     client = TestClient(make_app())
 
-    mock_message = MagicMock()
-    mock_message.content = '["banana", "apple"]'
-    mock_choice = MagicMock()
-    mock_choice.message = mock_message
-    mock_response = MagicMock()
-    mock_response.choices = [mock_choice]
-    mock_response.model = "gpt-4o"
-    mock_response.usage = MagicMock(prompt_tokens=100, completion_tokens=20)
-
-    mock_client = MagicMock()
-    mock_client.chat.completions.create.return_value = mock_response
-
-    with patch("app.routers.vision.OpenAI", return_value=mock_client):
+    with _mock_chat(return_value='["banana", "apple"]') as mock_chat:
         response = client.post(
             "/vision/analyze-ingredients",
             files={"file": ("photo.jpg", FAKE_JPEG_BYTES, "image/jpeg")},
         )
 
     assert response.status_code == 200
-    mock_client.chat.completions.create.assert_called_once()
+    mock_chat.assert_awaited_once()
     data = response.json()
     assert "banana" in data["ingredients"]
+
+
+def test_analyze_receipt_goes_through_the_shared_async_transport():
+    """The vision call is an awaited POST on the pooled OpenAI client (no
+    blocking SDK call), with the image as a content part and usage logged."""
+    import httpx
+    from app.services import openai_client
+
+    sent = {}
+
+    class FakeClient:
+        async def post(self, url, headers=None, json=None):
+            sent.update(json)
+            return httpx.Response(
+                200,
+                json={"model": "gpt-4o", "usage": {"prompt_tokens": 900, "completion_tokens": 40},
+                      "choices": [{"message": {"content": '{"items": [], "rejected_lines_count": 0}'}}]},
+                request=httpx.Request("POST", url),
+            )
+
+    client = TestClient(make_app())
+    with patch.object(openai_client, "get_async_client", return_value=FakeClient()), \
+         patch.object(openai_client, "log_openai_usage") as log_usage:
+        response = client.post(
+            "/vision/analyze-receipt",
+            files={"file": ("receipt.jpg", FAKE_JPEG_BYTES, "image/jpeg")},
+        )
+
+    assert response.status_code == 200
+    assert sent["model"] == "gpt-4o"
+    assert sent["response_format"] == {"type": "json_object"}
+    image_part = sent["messages"][1]["content"][1]
+    assert image_part["image_url"]["url"].startswith("data:image/jpeg;base64,")
+    assert log_usage.call_args.kwargs["route"] == "vision.analyze_receipt"
@@ -0,0 +1,88 @@
+"""POST /recipes/ result cache (app/services/recipe_cache.py): equivalent
+requests share one generation, anything that changes the prompt doesn't.
+"""
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from fastapi import Request
+from fastapi.testclient import TestClient
+
+from app.services import recipe_cache
+from app.services.auth import get_current_user
+from app.services.cache_backends import MemoryCacheBackend
+
+RECIPES = [
+    {"name": f"Recipe {n}", "ingredients": "1 cup rice", "instructions": "1. Cook."}
+    for n in ("A", "B", "C")
+]
+
+
+def key(ingredients, strict=False, dietary=None, language="English", difficulty=None, specific=None):
+    return recipe_cache.recipe_cache_key(specific, ingredients, strict, dietary, language, difficulty)
+
+
+def test_key_ignores_order_case_whitespace_and_duplicates():
+    assert key(["Rice", " black  beans", "rice"]) == key(["black beans", "rice"])
+
+
+@pytest.mark.parametrize("change", [
+    {"strict": True}, {"dietary": "vegan"}, {"language": "Spanish"},
+    {"difficulty": "hard"}, {"specific": "a spicy bean chili please"},
+])
+def test_key_changes_with_anything_that_shapes_the_prompt(change):
+    assert key(["rice", "beans"], **change) != key(["rice", "beans"])
+
+
+@pytest.fixture
+def api():
+    from app.main import app
+
+    def override(request: Request):
+        request.state.user_id = "recipe-cache-user"
+        return MagicMock(id="recipe-cache-user")
+
+    app.dependency_overrides[get_current_user] = override
+    with patch.object(recipe_cache, "_cache", MemoryCacheBackend(max_bytes=1 << 20)), \
+         patch("app.routers.recipes._increment_recipes_generated"):
+        try:
+            yield TestClient(app)
+        finally:
+            app.dependency_overrides.pop(get_current_user, None)
+
+
+def test_equivalent_requests_are_served_from_cache(api):
+    llm = AsyncMock(return_value=json.dumps(RECIPES))
+    hits_before = recipe_cache.recipe_cache_requests.value(result="hit")
+    with patch("app.routers.recipes.call_chat_completion", llm):
+        first = api.post("/recipes/?language=en-US", json={"ingredients": ["Rice", "beans"]})
+        second = api.post("/recipes/?language=en", json={"ingredients": ["beans ", "rice", "RICE"]})
+        other = api.post("/recipes/?language=en", json={"ingredients": ["rice", "beans"], "strict": True})
+
+    assert first.headers["X-Cache"] == "MISS"
+    assert second.headers["X-Cache"] == "HIT"
+    assert other.headers["X-Cache"] == "MISS"
+    assert second.json() == first.json()
+    assert llm.await_count == 2
+    assert recipe_cache.recipe_cache_requests.value(result="hit") - hits_before == 1
+
+
+def test_incomplete_answers_are_not_cached(api):
+    llm = AsyncMock(return_value=json.dumps(RECIPES[:1]))
+    stores_before = recipe_cache.recipe_cache_stores.value()
+    with patch("app.routers.recipes.call_chat_completion", llm):
+        api.post("/recipes/", json={"ingredients": ["kale"]})
+        again = api.post("/recipes/", json={"ingredients": ["kale"]})
+    assert again.headers["X-Cache"] == "MISS"
+    assert llm.await_count == 2
+    assert recipe_cache.recipe_cache_stores.value() == stores_before
+
+
+def test_disabled_cache_always_generates(api):
+    llm = AsyncMock(return_value=json.dumps(RECIPES))
+    with patch("app.routers.recipes.call_chat_completion", llm), \
+         patch.object(recipe_cache, "_cache", None), \
+         patch.object(recipe_cache, "RECIPE_CACHE_BACKEND", "off"):
+        for _ in range(2):
+            assert api.post("/recipes/", json={"ingredients": ["leeks"]}).headers["X-Cache"] == "MISS"
+    assert llm.await_count == 2
@@ -0,0 +1,134 @@
+"""Recipe generation jobs (POST /recipes/jobs, GET /recipes/jobs/{id}) on the
+in-process job queue (app/services/job_queue.py).
+"""
+import asyncio
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi import Request
+from fastapi.testclient import TestClient
+
+from app.routers import recipes
+from app.services import recipe_cache, recipe_similarity
+from app.services.auth import current_user_id, get_current_user
+from app.services.cache_backends import MemoryCacheBackend
+from app.services.job_queue import JobQueue
+from app.services.recipe_similarity import SimilarityIndex
+
+RECIPES = [{"name": f"Recipe {n}", "ingredients": "1 cup rice", "instructions": "1. Cook."} for n in ("A", "B", "C")]
+
+
+@pytest.fixture
+def jobs():
+    return JobQueue("recipes-test", workers=2, max_queued=10, ttl=60)
+
+
+@pytest.fixture
+def as_user(jobs):
+    """as_user(user_id) -> TestClient with the app lifespan running (the job
+    workers live on its event loop)."""
+    from app.main import app
+
+    user = {"id": None}
+
+    def override(request: Request):
+        request.state.user_id = user["id"]
+        return MagicMock(id=user["id"])
+
+    def switch(user_id):
+        user["id"] = user_id
+        return client
+
+    app.dependency_overrides[get_current_user] = override
+    with patch.object(recipes, "recipe_jobs", jobs), \
+         patch.object(recipe_cache, "_cache", MemoryCacheBackend(max_bytes=1 << 20)), \
+         patch.object(recipe_similarity, "_index", SimilarityIndex(max_entries=100)), \
+         patch("app.routers.recipes._increment_recipes_generated"), \
+         patch("app.main.http_clients.startup"), patch("app.main.http_clients.shutdown"):
+        try:
+            with TestClient(app) as client:
+                yield switch
+        finally:
+            app.dependency_overrides.pop(get_current_user, None)
+
+
+def test_job_result_is_polled_and_resubmits_reuse_the_job(as_user):
+    calls = []
+
+    async def llm(system, user, **kwargs):
+        calls.append(current_user_id())  # runs as the submitting user
+        await asyncio.sleep(0.05)
+        return json.dumps(RECIPES)
+
+    with patch.object(recipes, "call_chat_completion", llm):
+        submitted = as_user("jobs-user-1").post("/recipes/jobs", json={"ingredients": ["rice", "beans"]})
+        assert submitted.status_code == 202
+        job_id = submitted.json()["job_id"]
+        assert submitted.headers["Location"] == f"/recipes/jobs/{job_id}"
+        assert submitted.json()["status"] in ("queued", "running")
+
+        done = as_user("jobs-user-1").get(f"/recipes/jobs/{job_id}?wait=5").json()
+        again = as_user("jobs-user-1").post("/recipes/jobs", json={"ingredients": ["beans", "rice"]})
+
+    assert done["status"] == "succeeded"
+    assert [r["name"] for r in done["result"]] == ["Recipe A", "Recipe B", "Recipe C"]
+    assert again.status_code == 200 and again.json()["job_id"] == job_id
+    assert calls == ["jobs-user-1"]
+
+
+def test_jobs_are_private_to_their_owner(as_user):
+    async def llm(system, user, **kwargs):
+        return json.dumps(RECIPES)
+
+    with patch.object(recipes, "call_chat_completion", llm):
+        job_id = as_user("jobs-user-2").post("/recipes/jobs", json={"ingredients": ["kale"]}).json()["job_id"]
+        assert as_user("jobs-user-3").get(f"/recipes/jobs/{job_id}?wait=5").status_code == 404
+        assert as_user("jobs-user-2").get(f"/recipes/jobs/{job_id}?wait=5").json()["status"] == "succeeded"
+    assert as_user("jobs-user-2").get("/recipes/jobs/not-a-job").status_code == 404
+
+
+def test_failed_job_reports_the_error_and_a_resubmit_retries(as_user):
+    async def broken(system, user, **kwargs):
+        raise RuntimeError("upstream 500")
+
+    client = as_user("jobs-user-4")
+    with patch.object(recipes, "call_chat_completion", broken):
+        job_id = client.post("/recipes/jobs", json={"ingredients": ["tofu"]}).json()["job_id"]
+        failed = client.get(f"/recipes/jobs/{job_id}?wait=5").json()
+        retry = client.post("/recipes/jobs", json={"ingredients": ["tofu"]})
+    assert failed["status"] == "failed"
+    assert failed["error"]["status_code"] == 500
+    assert "result" not in failed
+    assert retry.status_code == 202 and retry.json()["job_id"] != job_id
+
+
+def test_full_queue_is_refused_with_retry_after(as_user, jobs):
+    jobs.workers, jobs.max_queued = 1, 1
+
+    async def slow(system, user, **kwargs):
+        await asyncio.sleep(30)
+
+    client = as_user("jobs-user-5")
+    with patch.object(recipes, "call_chat_completion", slow):
+        first = client.post("/recipes/jobs", json={"ingredients": ["a"]})
+        client.get(f"/recipes/jobs/{first.json()['job_id']}?wait=0.1")  # let the worker pick it up
+        second = client.post("/recipes/jobs", json={"ingredients": ["b"]})
+        third = client.post("/recipes/jobs", json={"ingredients": ["c"]})
+    assert (first.status_code, second.status_code, third.status_code) == (202, 202, 503)
+    assert int(third.headers["Retry-After"]) >= 1
+
+
+def test_shutdown_fails_unfinished_jobs():
+    async def scenario():
+        queue = JobQueue("shutdown-test", workers=1, max_queued=5, ttl=60)
+        running, _ = queue.submit("u", "a", lambda: asyncio.sleep(30))
+        queued, _ = queue.submit("u", "b", lambda: asyncio.sleep(30))
+        await asyncio.sleep(0.01)
+        await queue.shutdown()
+        return running, queued
+
+    running, queued = asyncio.run(scenario())
+    for job in (running, queued):
+        assert job.status == "failed" and job.error["status_code"] == 503
+        assert job.done.is_set()
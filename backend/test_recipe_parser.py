@@ -0,0 +1,91 @@
+"""recipe_parser: the incremental (streaming) parser yields the same
+normalized recipes as parse_recipes_text, as soon as each object closes.
+"""
+import json
+from unittest.mock import patch
+
+import pytest
+
+from app.services import recipe_parser
+from app.services.recipe_parser import IncrementalRecipeParser, parse_recipes_text
+
+RECIPES = [
+    {"name": "Garlic {Rice} Bowl", "ingredients": "1 cup rice\n2 cloves \"garlic\"", "servings": 2,
+     "nutrition": {"calories": 410, "protein": 12, "carbs": 70, "fat": 9, "fiber": 3, "sodium": 380}},
+    {"name": " Bean Chili ", "instructions": "1. Simmer.\\n2. Serve [hot]."},
+    {"name": "Kale Salad", "difficulty": "Medium"},
+]
+ARRAY = json.dumps(RECIPES, indent=2)
+
+
+def _feed_in_chunks(text, size, expected=3):
+    parser = IncrementalRecipeParser(expected=expected)
+    out = []
+    for i in range(0, len(text), size):
+        out.extend(parser.feed(text[i:i + size]))
+    return parser, out
+
+
+@pytest.mark.parametrize("text", [
+    ARRAY,
+    f"```json\n{ARRAY}\n```",
+    f"Here are your [3] recipes, enjoy:\n\n{ARRAY}\nLet me know if you want more!",
+])
+@pytest.mark.parametrize("size", [1, 7, 10_000])
+def test_matches_parse_recipes_text_for_any_chunking(text, size):
+    parser, recipes = _feed_in_chunks(text, size)
+    assert recipes == parse_recipes_text(ARRAY, expected=3)
+    assert parser.done
+
+
+def test_each_recipe_is_returned_when_its_object_closes():
+    parser = IncrementalRecipeParser()
+    first_end = ARRAY.index("\n  }") + len("\n  }")  # the first recipe's closing brace
+    assert parser.feed(ARRAY[:first_end - 1]) == []
+    assert [r["name"] for r in parser.feed(ARRAY[first_end - 1:first_end])] == ["Garlic {Rice} Bowl"]
+
+
+def test_stops_after_expected_and_skips_unparseable_objects():
+    text = '[{"name": "A"}, {"name": }, {"name": "B"}, {"name": "C"}]'
+    parser, recipes = _feed_in_chunks(text, 3, expected=2)
+    assert [r["name"] for r in recipes] == ["A", "B"]
+    assert parser.done
+    assert parser.feed('{"name": "late"}') == []
+
+
+def test_truncated_stream_keeps_what_closed():
+    parser, recipes = _feed_in_chunks(ARRAY[: ARRAY.index("Kale")], 5)
+    assert [r["name"] for r in recipes] == ["Garlic {Rice} Bowl", "Bean Chili"]
+    assert not parser.done
+
+
+def test_each_object_is_decoded_once():
+    with patch.object(recipe_parser.json, "loads", wraps=json.loads) as loads:
+        _feed_in_chunks(ARRAY, 1)
+    assert loads.call_count == 3
+
+
+def test_corpus_output_is_byte_identical_to_the_snapshot():
+    from benchmarks.recipe_parser import mismatches
+
+    assert mismatches() == []
+
+
+def test_matches_the_baseline_at_every_truncation_point():
+    from benchmarks import baseline_recipe_parser
+    from benchmarks.recipe_parser import dump, load_corpus
+
+    for case in load_corpus():
+        text = case["text"]
+        for cut in range(0, len(text), 37):
+            assert dump(parse_recipes_text(text[:cut])) == dump(baseline_recipe_parser.parse_recipes_text(text[:cut])), (case["case"], cut)
+
+
+@pytest.mark.parametrize("text", [
+    "Grilled SALMON with kale and whole grain rice", "beansalad with blueberries", "plain toast", "",
+])
+def test_keyword_heuristics_match_the_baseline(text):
+    from benchmarks import baseline_recipe_parser
+
+    assert recipe_parser.estimate_nutrition(text) == baseline_recipe_parser.estimate_nutrition(text)
+    assert recipe_parser.generate_health_benefits(text) == baseline_recipe_parser.generate_health_benefits(text)
@@ -0,0 +1,127 @@
+"""Near-duplicate recipe lookup (app/services/recipe_similarity.py): with
+?similar=true, a pantry that differs by a staple or two reuses a cached answer.
+"""
+import json
+import os
+import random
+import subprocess
+import sys
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from fastapi import Request
+from fastapi.testclient import TestClient
+
+from app.services import recipe_cache, recipe_similarity
+from app.services.auth import get_current_user
+from app.services.cache_backends import MemoryCacheBackend
+from app.services.recipe_similarity import SimilarityIndex, jaccard, minhash
+
+RECIPES = [{"name": f"Recipe {n}", "ingredients": "1 cup rice", "instructions": "1. Cook."} for n in ("A", "B", "C")]
+PANTRY = ["chicken", "rice", "broccoli", "garlic", "onion", "olive oil", "soy sauce"]
+
+
+def test_minhash_agreement_estimates_jaccard():
+    a = frozenset(f"item {i}" for i in range(40))
+    b = frozenset(f"item {i}" for i in range(10, 50))  # Jaccard 30/50
+    agree = sum(x == y for x, y in zip(minhash(a), minhash(b))) / recipe_similarity.NUM_PERM
+    assert abs(agree - jaccard(a, b)) < 0.15
+    assert minhash(a) == minhash(frozenset(sorted(a)))
+
+
+def test_bucket_ids_do_not_depend_on_the_process_hash_seed():
+    script = (
+        "from app.services.recipe_similarity import SimilarityIndex;"
+        f"print(SimilarityIndex._bands('en', frozenset({PANTRY!r})))"
+    )
+    runs = {
+        subprocess.run(
+            [sys.executable, "-c", script], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), env={**os.environ, "PYTHONHASHSEED": seed},
+        ).stdout
+        for seed in ("1", "2")
+    }
+    assert len(runs) == 1
+
+
+def test_index_finds_near_duplicates_within_a_partition_only():
+    index = SimilarityIndex(max_entries=100)
+    base = frozenset(PANTRY)
+    index.add("k1", "en", base)
+    index.add("k2", "es", base)
+    index.add("k3", "en", frozenset(["flour", "sugar", "butter", "eggs"]))
+
+    matches = index.query("en", base | {"salt"}, 0.75)
+    assert [(round(s, 3), k) for s, k, _ in matches] == [(0.875, "k1")]
+    assert index.query("en", frozenset(["chicken", "rice", "salt"]), 0.75) == []
+
+
+def test_index_is_bounded_and_eviction_empties_the_buckets():
+    index = SimilarityIndex(max_entries=50)
+    rng = random.Random(1)
+    words = [f"ingredient {i}" for i in range(200)]
+    sets = [frozenset(rng.sample(words, 6)) for _ in range(200)]
+    for i, tokens in enumerate(sets):
+        index.add(str(i), "p", tokens)
+    assert len(index) == 50
+    assert index.query("p", sets[0], 1.0) == []  # evicted
+    assert [k for _, k, _ in index.query("p", sets[-1], 1.0)] == ["199"]
+    for i in range(150, 200):
+        index.remove(str(i))
+    assert len(index) == 0 and index.bucket_count == 0
+
+
+@pytest.fixture
+def api():
+    from app.main import app
+
+    def override(request: Request):
+        request.state.user_id = "recipe-similarity-user"
+        return MagicMock(id="recipe-similarity-user")
+
+    app.dependency_overrides[get_current_user] = override
+    with patch.object(recipe_cache, "_cache", MemoryCacheBackend(max_bytes=1 << 20)), \
+         patch.object(recipe_similarity, "_index", SimilarityIndex(max_entries=100)), \
+         patch("app.routers.recipes._increment_recipes_generated"):
+        try:
+            yield TestClient(app)
+        finally:
+            app.dependency_overrides.pop(get_current_user, None)
+
+
+def test_similar_pantry_is_served_only_when_the_caller_opts_in(api):
+    llm = AsyncMock(return_value=json.dumps(RECIPES))
+    hits_before = recipe_similarity.recipe_similarity_lookups.value(result="hit")
+    with patch("app.routers.recipes.call_chat_completion", llm):
+        api.post("/recipes/", json={"ingredients": PANTRY})
+        near = api.post("/recipes/?similar=true", json={"ingredients": PANTRY[:-1] + ["salt"]})
+        assert llm.await_count == 1
+        assert near.headers["X-Cache"] == "SIMILAR"
+        assert [r["name"] for r in near.json()] == ["Recipe A", "Recipe B", "Recipe C"]
+
+        not_opted_in = api.post("/recipes/", json={"ingredients": PANTRY[:-1] + ["salt"]})
+        other_language = api.post("/recipes/?similar=true&language=es", json={"ingredients": PANTRY + ["salt"]})
+    assert not_opted_in.headers["X-Cache"] == "MISS"
+    assert other_language.headers["X-Cache"] == "MISS"
+    assert llm.await_count == 3
+    assert recipe_similarity.recipe_similarity_lookups.value(result="hit") - hits_before == 1
+
+
+def test_strict_requests_never_get_recipes_using_missing_ingredients(api):
+    llm = AsyncMock(return_value=json.dumps(RECIPES))
+    with patch("app.routers.recipes.call_chat_completion", llm):
+        api.post("/recipes/", json={"ingredients": PANTRY, "strict": True})
+        missing_one = api.post("/recipes/?similar=true", json={"ingredients": PANTRY[:-1] + ["salt"], "strict": True})
+        has_extra = api.post("/recipes/?similar=true", json={"ingredients": PANTRY + ["salt"], "strict": True})
+    assert missing_one.headers["X-Cache"] == "MISS"
+    assert has_extra.headers["X-Cache"] == "SIMILAR"
+
+
+def test_entries_whose_recipes_expired_are_dropped(api):
+    llm = AsyncMock(return_value=json.dumps(RECIPES))
+    with patch("app.routers.recipes.call_chat_completion", llm):
+        api.post("/recipes/", json={"ingredients": PANTRY})
+        recipe_cache.get_recipe_cache().clear()
+        near = api.post("/recipes/?similar=true", json={"ingredients": PANTRY + ["salt"]})
+    assert near.headers["X-Cache"] == "MISS"
+    assert len(recipe_similarity.get_similarity_index()) == 1  # only the fresh answer
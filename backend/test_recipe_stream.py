@@ -0,0 +1,175 @@
+"""POST /recipes/stream: NDJSON recipe events sent as each JSON object closes,
+normalized and padded like POST /recipes/.
+"""
+import asyncio
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi import Request
+from fastapi.testclient import TestClient
+
+from app.services import recipe_cache
+from app.services.auth import get_current_user
+from app.services.cache_backends import MemoryCacheBackend
+from app.services.circuit_breaker import CircuitOpenError
+
+
+def fake_stream(*chunks, before=None):
+    async def stream(*args, **kwargs):
+        if before is not None:
+            raise before
+        for chunk in chunks:
+            yield chunk
+    return stream
+
+
+@pytest.fixture
+def app():
+    from app.main import app
+
+    def override(request: Request):
+        request.state.user_id = "recipe-stream-user"
+        return MagicMock(id="recipe-stream-user")
+
+    app.dependency_overrides[get_current_user] = override
+    with patch.object(recipe_cache, "_cache", MemoryCacheBackend(max_bytes=1 << 20)), \
+         patch("app.routers.recipes._increment_recipes_generated") as counter:
+        app.state.counter = counter
+        try:
+            yield app
+        finally:
+            app.dependency_overrides.pop(get_current_user, None)
+
+
+def _events(app, stream, ingredients=("rice", "beans")):
+    with patch("app.routers.recipes.stream_chat_completion", stream):
+        response = TestClient(app).post("/recipes/stream", json={"ingredients": list(ingredients)})
+    return response, [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_recipes_are_normalized_and_padded_to_three(app):
+    response, events = _events(app, fake_stream('```json\n[{"name": " Rice Bowl ", "ser', 'vings": 4}, {"name": "Bean Soup"}]\n```'))
+
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert response.headers["X-Cache"] == "MISS"
+    assert [e["type"] for e in events] == ["recipe", "recipe", "recipe", "done"]
+    assert events[0]["recipe"]["name"] == "Rice Bowl"
+    assert events[0]["recipe"]["servings"] == "4"
+    assert events[1]["recipe"]["prep_time"] == "15 min"
+    assert events[2]["recipe"]["name"] == "Recipe 3"
+    assert events[3] == {"type": "done", "count": 3}
+    app.state.counter.assert_called_once_with(2)
+
+
+def test_complete_answers_are_cached_for_both_routes(app):
+    three = "[" + ",".join(json.dumps({"name": n}) for n in "ABC") + "]"
+    _events(app, fake_stream(three))
+    response, events = _events(app, fake_stream(before=AssertionError("should be cached")), ingredients=("beans", "Rice"))
+    assert response.headers["X-Cache"] == "HIT"
+    assert [e["recipe"]["name"] for e in events[:3]] == ["A", "B", "C"]
+
+
+def test_prose_answer_falls_back_to_the_full_parser(app):
+    _, events = _events(app, fake_stream("Garlic Rice: cook the rice.\n\n", "Bean Stew: simmer the beans."))
+    assert [e["recipe"]["name"] for e in events[:3]] == ["Garlic Rice", "Bean Stew", "Recipe 3"]
+
+
+def test_failure_before_the_first_token_is_an_http_error(app):
+    response, _ = _events(app, fake_stream(before=CircuitOpenError("openai", 12.0)))
+    assert response.status_code == 503
+
+
+def test_mid_stream_failure_ends_with_an_error_event(app):
+    async def stream(*args, **kwargs):
+        yield '[{"name": "A"}, '
+        raise RuntimeError("connection reset")
+
+    _, events = _events(app, stream)
+    assert events[0]["recipe"]["name"] == "A"
+    assert events[-1]["type"] == "error"
+
+
+def test_first_recipe_is_sent_before_the_model_finishes(app):
+    """The stream only continues once recipe #1 has reached the client."""
+    first_sent = asyncio.Event()
+
+    async def stream(*args, **kwargs):
+        yield '[{"name": "A"}, {"name": '
+        await asyncio.wait_for(first_sent.wait(), 2)
+        yield '"B"}, {"name": "C"}]'
+
+    body = json.dumps({"ingredients": ["rice"]}).encode()
+    scope = {
+        "type": "http", "http_version": "1.1", "method": "POST", "scheme": "http",
+        "path": "/recipes/stream", "raw_path": b"/recipes/stream", "query_string": b"", "root_path": "",
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        "client": ("127.0.0.1", 5000), "server": ("testserver", 80),
+    }
+    chunks = []
+
+    async def receive():
+        if not chunks:
+            chunks.append(b"")
+            return {"type": "http.request", "body": body, "more_body": False}
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+            if b'"index": 0' in message.get("body", b""):
+                first_sent.set()
+
+    with patch("app.routers.recipes.stream_chat_completion", stream):
+        asyncio.run(asyncio.wait_for(app(scope, receive, send), 5))
+    lines = [json.loads(line) for line in b"".join(chunks).splitlines()]
+    assert [e.get("recipe", {}).get("name") for e in lines] == ["A", "B", "C", None]
+
+
+def test_upstream_is_released_when_the_client_leaves_before_the_first_chunk(app):
+    """Disconnect before Starlette iterates the body: the stream's limiter slot
+    and in-flight gauge are released right away, not at garbage collection."""
+    import httpx
+
+    from app.services import metrics, openai_client
+    from app.services.adaptive_limiter import get_limiter
+
+    route = "recipes.generate_recipes"
+    limiter = get_limiter(route)
+    in_flight = limiter.in_flight
+    gauge = metrics.openai_requests_in_flight.value(route=route)
+
+    async def sse():
+        yield b'data: {"choices": [{"delta": {"content": "[{\\"name\\": "}}]}\n\n'
+        await asyncio.sleep(3600)
+
+    async def handler(request):
+        return httpx.Response(200, content=sse())
+
+    body = json.dumps({"ingredients": ["rice"]}).encode()
+    scope = {
+        "type": "http", "http_version": "1.1", "method": "POST", "scheme": "http",
+        "path": "/recipes/stream", "raw_path": b"/recipes/stream", "query_string": b"", "root_path": "",
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        "client": ("127.0.0.1", 5000), "server": ("testserver", 80),
+    }
+    received = []
+
+    async def receive():
+        if not received:
+            received.append(body)
+            return {"type": "http.request", "body": body, "more_body": False}
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            await asyncio.sleep(0.05)  # the disconnect is noticed first
+        assert message["type"] != "http.response.body" or not message.get("body")
+
+    async def run():
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        with patch.object(openai_client, "get_async_client", return_value=client):
+            await asyncio.wait_for(app(scope, receive, send), 5)
+            return limiter.in_flight, metrics.openai_requests_in_flight.value(route=route)
+
+    assert asyncio.run(run()) == (in_flight, gauge)
@@ -1,10 +1,23 @@
 """The app-wide recipes_generated counter is a best-effort impact metric — it
-must never affect (or break) a user's recipe request. These tests lock that
-contract on the helper that the /recipes route schedules as a background task.
+must never affect (or break) a user's recipe request. Increments are summed in
+memory (app/services/batched_counter.py) and written in batches through one
+reused Supabase client.
 """
+import asyncio
 from unittest.mock import patch, MagicMock
 
-from app.routers.recipes import _increment_recipes_generated
+import pytest
+
+from app.routers import recipes
+from app.routers.recipes import _increment_recipes_generated, _write_recipes_generated
+from app.services import batched_counter
+from app.services.batched_counter import BatchedCounter
+
+
+@pytest.fixture(autouse=True)
+def fresh_client():
+    with patch.object(recipes, "_service_client", None):
+        yield
 
 
 def test_noop_without_service_key():
@@ -12,7 +25,7 @@ def test_noop_without_service_key():
     with patch("app.routers.recipes.SUPABASE_SERVICE_KEY", ""), \
          patch("app.routers.recipes.SUPABASE_URL", "http://x.supabase.co"), \
          patch("app.routers.recipes.create_client") as mk:
-        _increment_recipes_generated(3)
+        _write_recipes_generated(3)
         mk.assert_not_called()
 
 
@@ -20,25 +33,100 @@ def test_noop_for_nonpositive_count():
     with patch("app.routers.recipes.SUPABASE_SERVICE_KEY", "svc"), \
          patch("app.routers.recipes.SUPABASE_URL", "http://x.supabase.co"), \
          patch("app.routers.recipes.create_client") as mk:
-        _increment_recipes_generated(0)
+        _write_recipes_generated(0)
         mk.assert_not_called()
 
 
-def test_calls_rpc_with_count_when_configured():
+def test_calls_rpc_with_count_reusing_one_client():
     sb = MagicMock()
     with patch("app.routers.recipes.SUPABASE_SERVICE_KEY", "svc"), \
          patch("app.routers.recipes.SUPABASE_URL", "http://x.supabase.co"), \
-         patch("app.routers.recipes.create_client", return_value=sb):
-        _increment_recipes_generated(3)
-        sb.rpc.assert_called_once_with("increment_recipes_generated", {"n": 3})
-        sb.rpc.return_value.execute.assert_called_once()
+         patch("app.routers.recipes.create_client", return_value=sb) as mk:
+        _write_recipes_generated(3)
+        _write_recipes_generated(5)
+    mk.assert_called_once()
+    assert [c.args for c in sb.rpc.call_args_list] == [
+        ("increment_recipes_generated", {"n": 3}),
+        ("increment_recipes_generated", {"n": 5}),
+    ]
 
 
-def test_swallows_errors_never_raises():
-    """A failing counter write must not propagate — the user's recipes already
-    succeeded by the time this background task runs."""
-    with patch("app.routers.recipes.SUPABASE_SERVICE_KEY", "svc"), \
-         patch("app.routers.recipes.SUPABASE_URL", "http://x.supabase.co"), \
-         patch("app.routers.recipes.create_client", side_effect=Exception("supabase down")):
-        # Must not raise.
+def test_increment_only_accumulates_and_never_raises():
+    """The request path never waits on (or sees failures of) the write."""
+    counter = BatchedCounter("test", MagicMock(), interval=60, threshold=100, max_backoff=600)
+    with patch.object(recipes, "recipes_generated_counter", counter), \
+         patch("app.routers.recipes.create_client", side_effect=Exception("supabase down")) as mk:
         _increment_recipes_generated(3)
+        _increment_recipes_generated(0)
+        _increment_recipes_generated(2)
+    assert counter.pending == 5
+    mk.assert_not_called()
+
+
+def test_increments_are_written_as_one_sum_on_the_interval():
+    writes = []
+    counter = BatchedCounter("test", writes.append, interval=0.05, threshold=100, max_backoff=1)
+
+    async def run():
+        counter.start()
+        for n in (3, 3, 2):
+            counter.add(n)
+        await asyncio.sleep(0.12)
+        await counter.close()
+
+    asyncio.run(run())
+    assert writes == [8]
+
+
+def test_threshold_flushes_early():
+    writes = []
+    counter = BatchedCounter("test", writes.append, interval=60, threshold=5, max_backoff=600)
+
+    async def run():
+        counter.start()
+        counter.add(3)
+        await asyncio.sleep(0.02)
+        counter.add(3)
+        await asyncio.sleep(0.05)
+        assert writes == [6]
+        await counter.close()
+
+    asyncio.run(run())
+
+
+def test_failed_writes_keep_the_count_and_back_off():
+    attempts = []
+
+    def flaky(n):
+        attempts.append(n)
+        if len(attempts) < 3:
+            raise RuntimeError("supabase down")
+
+    counter = BatchedCounter("test.flaky", flaky, interval=0.02, threshold=100, max_backoff=0.05)
+
+    async def run():
+        counter.start()
+        counter.add(3)
+        await asyncio.sleep(0.03)
+        counter.add(1)  # arrives while the first batch is failing
+        await asyncio.sleep(0.2)
+        await counter.close()
+
+    asyncio.run(run())
+    assert attempts[-1] == 4 and len(attempts) == 3
+    assert batched_counter.batched_written.value(counter="test.flaky") == 4 and counter.pending == 0
+    assert batched_counter.batched_failures.value(counter="test.flaky") == 2
+    assert batched_counter.batched_pending.value(counter="test.flaky") == 0
+
+
+def test_close_flushes_what_is_left():
+    writes = []
+    counter = BatchedCounter("test", writes.append, interval=60, threshold=100, max_backoff=600)
+
+    async def run():
+        counter.start()
+        counter.add(7)
+        await counter.close()
+
+    asyncio.run(run())
+    assert writes == [7]
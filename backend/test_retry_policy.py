@@ -0,0 +1,106 @@
+"""Retry timing (app/services/retry_policy.py): honor the server's Retry-After
+hints, jitter everything else, and stop retrying once the global budget is spent.
+"""
+import asyncio
+import email.utils
+import time
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from app.services import openai_client, retry_policy
+from app.services.ratio_budget import RatioBudget
+from app.services.retry_policy import backoff_delay, retry_after_seconds
+
+
+def test_retry_after_ms_takes_precedence():
+    assert retry_after_seconds({"retry-after-ms": "1500", "retry-after": "9"}) == 1.5
+
+
+def test_retry_after_seconds_and_http_date():
+    assert retry_after_seconds({"retry-after": "3"}) == 3.0
+    date = email.utils.formatdate(time.time() + 10, usegmt=True)
+    assert 8 <= retry_after_seconds({"retry-after": date}) <= 10
+
+
+def test_ratelimit_reset_only_counts_exhausted_limits():
+    headers = {
+        "x-ratelimit-remaining-requests": "12",
+        "x-ratelimit-reset-requests": "1m0s",
+        "x-ratelimit-remaining-tokens": "0",
+        "x-ratelimit-reset-tokens": "6.5s",
+    }
+    assert retry_after_seconds(headers) == 6.5
+    assert retry_after_seconds({"x-ratelimit-reset-tokens": "20ms"}) is None
+
+
+def test_garbage_headers_are_ignored():
+    assert retry_after_seconds({"retry-after": "soon"}) is None
+    assert retry_after_seconds({}) is None
+
+
+def test_decorrelated_jitter_stays_within_bounds():
+    previous = 0.0
+    for _ in range(200):
+        delay = backoff_delay(previous)
+        assert retry_policy.RETRY_BASE_SECONDS <= delay <= retry_policy.RETRY_CAP_SECONDS
+        assert delay <= max(previous, retry_policy.RETRY_BASE_SECONDS) * 3
+        previous = delay
+
+
+def test_server_hint_is_used_with_small_jitter():
+    delay = backoff_delay(0.0, retry_after=2.0)
+    assert 2.0 <= delay <= 2.0 + retry_policy.RETRY_BASE_SECONDS / 4
+
+
+def test_hint_longer_than_max_means_give_up():
+    assert backoff_delay(0.0, retry_after=retry_policy.MAX_RETRY_AFTER_SECONDS + 1) is None
+
+
+class _Client:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    async def post(self, *args, **kwargs):
+        self.calls += 1
+        return self.responses.pop(0)
+
+
+def _response(status, headers=None, json=None):
+    request = httpx.Request("POST", openai_client.OPENAI_CHAT_URL)
+    return httpx.Response(status, headers=headers, json=json or {}, request=request)
+
+
+OK = {"choices": [{"message": {"content": "ok"}}], "usage": {}}
+
+
+def _run_with(client, budget):
+    slept = []
+
+    async def fake_sleep(seconds):
+        slept.append(seconds)
+
+    with patch.object(openai_client, "get_async_client", return_value=client), \
+         patch.object(openai_client, "retry_budget", budget), \
+         patch.object(openai_client.asyncio, "sleep", fake_sleep):
+        result = asyncio.run(openai_client._post_with_retry({"messages": []}, route="t.retry"))
+    return result, slept
+
+
+def test_429_waits_for_retry_after_before_retrying():
+    client = _Client([_response(429, {"retry-after": "4"}), _response(200, json=OK)])
+    result, slept = _run_with(client, RatioBudget(ratio=1.0))
+    assert result == OK
+    assert client.calls == 2
+    assert 4.0 <= slept[0] <= 4.0 + retry_policy.RETRY_BASE_SECONDS / 4
+
+
+def test_exhausted_budget_stops_retries():
+    client = _Client([_response(503), _response(200, json=OK)])
+    empty = RatioBudget(ratio=0.0, min_per_second=0.0, max_tokens=0.0)
+    with pytest.raises(httpx.HTTPStatusError):
+        _run_with(client, empty)
+    assert client.calls == 1
+    assert empty.denied == 1
@@ -0,0 +1,176 @@
+"""Single-flight coalescing (app/services/singleflight.py) and its use in
+call_chat_completion: identical concurrent payloads must cost one upstream call.
+"""
+import asyncio
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from app.services import metrics
+from app.services.singleflight import SingleFlight
+
+
+def test_concurrent_same_key_runs_once_and_fans_out():
+    flight = SingleFlight("test")
+    calls = {"count": 0}
+    coalesced = []
+
+    async def work():
+        calls["count"] += 1
+        await asyncio.sleep(0.01)
+        return {"answer": 42}
+
+    async def run():
+        return await asyncio.gather(*(flight.do("k", work, on_coalesce=lambda: coalesced.append(1)) for _ in range(5)))
+
+    results = asyncio.run(run())
+    assert calls["count"] == 1
+    assert all(r == {"answer": 42} for r in results)
+    assert len(coalesced) == 4
+    assert flight.in_flight() == 0
+
+
+def test_different_keys_are_not_coalesced():
+    flight = SingleFlight("test")
+    coalesced = []
+
+    async def run():
+        return await asyncio.gather(*(
+            flight.do(k, _value(k), on_coalesce=lambda: coalesced.append(1)) for k in ("a", "b")
+        ))
+
+    assert asyncio.run(run()) == ["a", "b"]
+    assert coalesced == []
+
+
+def _value(v):
+    async def work():
+        await asyncio.sleep(0)
+        return v
+    return work
+
+
+def test_sequential_calls_are_not_coalesced():
+    """Coalescing is for in-flight work only — it is not a cache."""
+    flight = SingleFlight("test")
+
+    async def run():
+        return [await flight.do("k", _value(1)), await flight.do("k", _value(2))]
+
+    assert asyncio.run(run()) == [1, 2]
+
+
+def test_exception_reaches_every_waiter():
+    flight = SingleFlight("test")
+
+    async def boom():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    async def run():
+        return await asyncio.gather(flight.do("k", boom), flight.do("k", boom), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_cancelled_waiter_does_not_cancel_shared_work():
+    flight = SingleFlight("test")
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def run():
+        first = asyncio.ensure_future(flight.do("k", slow))
+        second = asyncio.ensure_future(flight.do("k", slow))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run()) == "done"
+
+
+def test_last_waiter_leaving_cancels_shared_work():
+    flight = SingleFlight("test")
+    state = {"finished": False}
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        state["finished"] = True
+
+    async def run():
+        only = asyncio.ensure_future(flight.do("k", slow))
+        await asyncio.sleep(0.01)
+        only.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await only
+        await asyncio.sleep(0.06)
+
+    asyncio.run(run())
+    assert state["finished"] is False
+
+
+@pytest.mark.parametrize("others, keep_running, outcome, finished", [
+    (0, False, "cancelled", False),
+    (1, False, "kept", True),
+    (0, True, "kept", True),
+])
+def test_on_cancel_reports_whether_shared_work_survives(others, keep_running, outcome, finished):
+    flight = SingleFlight("test")
+    state = {"finished": False}
+    outcomes = []
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        state["finished"] = True
+
+    async def run():
+        leaving = asyncio.ensure_future(flight.do("k", slow, keep_running=keep_running, on_cancel=outcomes.append))
+        staying = [asyncio.ensure_future(flight.do("k", slow)) for _ in range(others)]
+        await asyncio.sleep(0.01)
+        leaving.cancel()
+        await asyncio.gather(leaving, *staying, return_exceptions=True)
+        await asyncio.sleep(0.06)
+
+    asyncio.run(run())
+    assert outcomes == [outcome]
+    assert state["finished"] is finished
+
+
+def test_call_chat_completion_coalesces_identical_payloads():
+    from app.services import openai_client
+
+    url = openai_client.OPENAI_CHAT_URL
+    posts = {"count": 0}
+
+    class SlowClient:
+        async def post(self, *args, **kwargs):
+            posts["count"] += 1
+            await asyncio.sleep(0.02)
+            return httpx.Response(
+                200,
+                json={
+                    "model": "gpt-4o-mini",
+                    "usage": {"prompt_tokens": 10, "completion_tokens": 5},
+                    "choices": [{"message": {"content": "shared"}}],
+                },
+                request=httpx.Request("POST", url),
+            )
+
+    async def run():
+        return await asyncio.gather(
+            openai_client.call_chat_completion("sys", "same", route="test.a"),
+            openai_client.call_chat_completion("sys", "same", route="test.a"),
+            openai_client.call_chat_completion("sys", "different", route="test.a"),
+        )
+
+    coalesced = metrics.openai_calls_coalesced
+    before = coalesced.value(route="test.a")
+    with patch.object(openai_client, "get_async_client", return_value=SlowClient()):
+        results = asyncio.run(run())
+
+    assert results == ["shared", "shared", "shared"]
+    assert posts["count"] == 2
+    assert coalesced.value(route="test.a") - before == 1
@@ -0,0 +1,110 @@
+"""stream_chat_completion: SSE deltas are yielded as they arrive, usage is logged
+when the stream ends, and failures before the first byte are retried.
+"""
+import asyncio
+import json
+import logging
+from unittest.mock import patch
+
+import httpx
+
+from app.services import openai_client
+
+
+def _sse(*chunks):
+    body = "".join(f"data: {json.dumps(c)}\n\n" for c in chunks) + "data: [DONE]\n\n"
+    return body.encode("utf-8")
+
+
+def _delta(text):
+    return {"model": "gpt-4o-mini", "choices": [{"index": 0, "delta": {"content": text}}]}
+
+
+USAGE_CHUNK = {
+    "model": "gpt-4o-mini",
+    "choices": [],
+    "usage": {"prompt_tokens": 40, "completion_tokens": 3, "total_tokens": 43},
+}
+
+
+def _mock_client(handler):
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def _collect(**kwargs):
+    async def run():
+        return [d async for d in openai_client.stream_chat_completion("sys", "user", **kwargs)]
+    return asyncio.run(run())
+
+
+def test_stream_yields_deltas_and_logs_usage(caplog):
+    seen = {}
+
+    def handler(request):
+        seen["payload"] = json.loads(request.content)
+        return httpx.Response(200, content=_sse(_delta("Hel"), _delta("lo"), _delta("!"), USAGE_CHUNK))
+
+    with caplog.at_level(logging.INFO, logger="app.services.openai_client"), \
+         patch.object(openai_client, "get_async_client", return_value=_mock_client(handler)):
+        deltas = _collect(route="recipes.generate_recipes")
+
+    assert deltas == ["Hel", "lo", "!"]
+    assert seen["payload"]["stream"] is True
+    assert seen["payload"]["stream_options"] == {"include_usage": True}
+    line = next(r.getMessage() for r in caplog.records if "openai call" in r.getMessage())
+    assert "route=recipes.generate_recipes" in line
+    assert "total_tokens=43" in line
+
+
+def test_stream_retries_retryable_status_before_first_byte():
+    attempts = {"count": 0}
+
+    def handler(request):
+        attempts["count"] += 1
+        if attempts["count"] == 1:
+            return httpx.Response(503, content=b"busy")
+        return httpx.Response(200, content=_sse(_delta("ok"), USAGE_CHUNK))
+
+    async def no_sleep(_seconds):
+        return None
+
+    with patch.object(openai_client, "get_async_client", return_value=_mock_client(handler)), \
+         patch.object(openai_client.asyncio, "sleep", no_sleep):
+        deltas = _collect()
+
+    assert deltas == ["ok"]
+    assert attempts["count"] == 2
+
+
+def test_stream_retries_connect_error():
+    attempts = {"count": 0}
+
+    def handler(request):
+        attempts["count"] += 1
+        if attempts["count"] == 1:
+            raise httpx.ConnectError("refused", request=request)
+        return httpx.Response(200, content=_sse(_delta("ok")))
+
+    async def no_sleep(_seconds):
+        return None
+
+    with patch.object(openai_client, "get_async_client", return_value=_mock_client(handler)), \
+         patch.object(openai_client.asyncio, "sleep", no_sleep):
+        assert _collect() == ["ok"]
+
+
+def test_stream_logs_usage_when_consumer_stops_early(caplog):
+    def handler(request):
+        return httpx.Response(200, content=_sse(_delta("a"), _delta("b"), USAGE_CHUNK))
+
+    async def run():
+        stream = openai_client.stream_chat_completion("sys", "user", route="test.early")
+        first = await anext(stream)
+        await stream.aclose()
+        return first
+
+    with caplog.at_level(logging.INFO, logger="app.services.openai_client"), \
+         patch.object(openai_client, "get_async_client", return_value=_mock_client(handler)):
+        assert asyncio.run(run()) == "a"
+
+    assert any("route=test.early" in r.getMessage() for r in caplog.records)
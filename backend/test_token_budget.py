@@ -0,0 +1,199 @@
+"""Token budgets (app/services/token_budget.py): reserve an estimate per call
+against the user's and the model's tokens-per-minute windows, reconcile with
+real usage, and fail fast when either window is full.
+"""
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import httpx
+import pytest
+from fastapi import Request
+from fastapi.testclient import TestClient
+
+from app.services import openai_client, token_budget
+from app.services.auth import get_current_user, request_state_var
+from app.services.token_budget import TokenBudget, TokenBudgetExceeded, TokenWindow, estimate_prompt_tokens
+
+
+def test_estimate_counts_text_and_images():
+    messages = [
+        {"role": "system", "content": "x" * 400},
+        {"role": "user", "content": [
+            {"type": "text", "text": "y" * 40},
+            {"type": "image_url", "image_url": {"url": "data:image/jpeg;base64,..."}},
+        ]},
+    ]
+    assert estimate_prompt_tokens(messages) == 100 + 10 + token_budget.IMAGE_TOKENS + 2 * token_budget.MESSAGE_OVERHEAD_TOKENS
+
+
+def test_window_reports_wait_until_enough_expires():
+    window = TokenWindow(limit=1000, window=60)
+    window.charge(600, now=0)
+    window.charge(300, now=10)
+    assert window.wait_for(100, now=20) == 0
+    assert window.wait_for(200, now=20) == pytest.approx(40)  # the 600 expires at t=60
+    assert window.wait_for(200, now=61) == 0
+
+
+def test_oversized_call_runs_alone():
+    window = TokenWindow(limit=100)
+    assert window.wait_for(500, now=0) == 0
+    window.charge(500, now=0)
+    assert window.wait_for(1, now=1) > 0
+
+
+def test_user_limit_is_separate_from_model_limit():
+    budget = TokenBudget(user_tpm=1000, model_tpm={"m": 10_000})
+    rejected = token_budget.token_budget_reservations.value(model="m", result="user")
+    budget.reserve("m", 900, user_id="alice")
+    with pytest.raises(TokenBudgetExceeded) as exc_info:
+        budget.reserve("m", 200, user_id="alice")
+    assert exc_info.value.scope == "user"
+    budget.reserve("m", 200, user_id="bob")
+    assert token_budget.token_budget_reservations.value(model="m", result="user") - rejected == 1
+
+
+def test_model_limit_applies_across_users_and_nothing_is_charged_on_reject():
+    budget = TokenBudget(user_tpm=10_000, model_tpm={"m": 1000})
+    budget.reserve("m", 900, user_id="alice")
+    with pytest.raises(TokenBudgetExceeded) as exc_info:
+        budget.reserve("m", 200, user_id="bob")
+    assert exc_info.value.scope == "model"
+    assert budget._users["bob"].used == 0
+
+
+def test_reconcile_returns_overestimate_to_the_window():
+    budget = TokenBudget(user_tpm=1000, model_tpm={"m.reconcile": 10_000})
+    reservation = budget.reserve("m.reconcile", 900, user_id="alice")
+    reservation.settle_usage({"prompt_tokens": 150, "completion_tokens": 50})
+    assert budget._users["alice"].used == 200
+    reservation.settle(0)  # settling twice is a no-op
+    assert budget._users["alice"].used == 200
+    assert token_budget.token_budget_estimated_tokens.value(model="m.reconcile") == 900
+    assert token_budget.token_budget_settled_tokens.value(model="m.reconcile") == 200
+    budget.reserve("m", 800, user_id="alice")
+
+
+def test_missing_usage_keeps_the_estimate():
+    budget = TokenBudget(model_tpm={"m": 10_000})
+    reservation = budget.reserve("m", 300)
+    reservation.settle_usage(None)
+    assert budget._models["m"].used == 300
+
+
+@pytest.fixture
+def tight_budget():
+    budget = TokenBudget(user_tpm=700, model_tpm={openai_client.MODEL: 100_000})
+    with patch.object(token_budget, "budget", budget):
+        yield budget
+
+
+class _Client:
+    def __init__(self):
+        self.calls = 0
+
+    async def post(self, *args, **kwargs):
+        self.calls += 1
+        return httpx.Response(
+            200,
+            json={"model": openai_client.MODEL, "usage": {"prompt_tokens": 20, "completion_tokens": 30},
+                  "choices": [{"message": {"content": "ok"}}]},
+            request=httpx.Request("POST", openai_client.OPENAI_CHAT_URL),
+        )
+
+
+def _call_as(user_id, prompt, max_tokens=600):
+    async def run():
+        token = request_state_var.set(SimpleNamespace(user_id=user_id))
+        try:
+            return await openai_client.call_chat_completion("sys", prompt, max_tokens=max_tokens, route="t.budget")
+        finally:
+            request_state_var.reset(token)
+
+    return asyncio.run(run())
+
+
+def test_chat_completion_is_reserved_and_reconciled(tight_budget):
+    client = _Client()
+    with patch.object(openai_client, "get_async_client", return_value=client):
+        assert _call_as("alice", "first") == "ok"
+        # 600 max_tokens were reserved, 50 actually used: a second call fits.
+        assert _call_as("alice", "second") == "ok"
+        assert tight_budget._users["alice"].used == 100
+        with pytest.raises(TokenBudgetExceeded):
+            _call_as("alice", "third", max_tokens=650)
+    assert client.calls == 2
+
+
+def test_route_answers_429_with_retry_after_when_user_budget_is_spent(tight_budget):
+    from app.main import app
+
+    tight_budget.reserve(openai_client.MODEL, 700, user_id="budget-user")
+
+    def override(request: Request):
+        request.state.user_id = "budget-user"
+        return MagicMock(id="budget-user")
+
+    app.dependency_overrides[get_current_user] = override
+    try:
+        with patch.object(openai_client, "get_async_client", return_value=_Client()):
+            response = TestClient(app).post("/recipes/", json={"ingredients": ["rice", "beans"]})
+    finally:
+        app.dependency_overrides.pop(get_current_user, None)
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+
+
+def test_over_budget_user_cannot_fail_a_coalesced_caller(tight_budget):
+    tight_budget.reserve(openai_client.MODEL, 700, user_id="alice")
+    release = asyncio.Event()
+
+    class _SlowClient(_Client):
+        async def post(self, *args, **kwargs):
+            await release.wait()
+            return await super().post(*args, **kwargs)
+
+    client = _SlowClient()
+
+    async def as_user(user_id):
+        token = request_state_var.set(SimpleNamespace(user_id=user_id))
+        try:
+            return await openai_client.call_chat_completion("sys", "same", max_tokens=100, route="t.budget.shared")
+        finally:
+            request_state_var.reset(token)
+
+    async def run():
+        # Alice (over budget) asks first; Bob's identical payload would join her flight.
+        both = asyncio.gather(as_user("alice"), as_user("bob"), return_exceptions=True)
+        await asyncio.sleep(0.01)
+        release.set()
+        return await both
+
+    with patch.object(openai_client, "get_async_client", return_value=client):
+        alice, bob = asyncio.run(run())
+    assert isinstance(alice, TokenBudgetExceeded) and alice.scope == "user"
+    assert bob == "ok" and client.calls == 1
+    assert tight_budget._users["alice"].used == 700  # her refusal charged nothing
+    assert tight_budget._users["bob"].used == 50
+    assert tight_budget._models[openai_client.MODEL].used == 750
+
+
+def test_each_coalesced_caller_is_charged_its_own_request(tight_budget):
+    client = _Client()
+
+    async def as_user(user_id):
+        token = request_state_var.set(SimpleNamespace(user_id=user_id))
+        try:
+            return await openai_client.call_chat_completion("sys", "same", max_tokens=100, route="t.budget.shared")
+        finally:
+            request_state_var.reset(token)
+
+    async def run():
+        return await asyncio.gather(as_user("alice"), as_user("bob"))
+
+    with patch.object(openai_client, "get_async_client", return_value=client):
+        assert asyncio.run(run()) == ["ok", "ok"]
+    assert client.calls == 1
+    assert tight_budget._users["alice"].used == tight_budget._users["bob"].used == 50
+    assert tight_budget._models[openai_client.MODEL].used == 50
@@ -0,0 +1,106 @@
+"""max_tokens right-sizing (app/services/token_sizing.py): learn each route's
+completion sizes from log_openai_usage, shrink max_tokens to p99 + headroom,
+and back off to the call site's ceiling after a truncation.
+"""
+import asyncio
+import logging
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from app.services import openai_client, token_sizing
+from app.services.token_sizing import RouteSizer
+
+
+def _warm(sizer, tokens, n=token_sizing.MIN_SAMPLES, size_hint=1.0):
+    for _ in range(n):
+        sizer.record(tokens, size_hint, truncated=False)
+
+
+def test_uses_the_ceiling_until_there_is_enough_history():
+    sizer = RouteSizer()
+    _warm(sizer, 100, n=token_sizing.MIN_SAMPLES - 1)
+    assert sizer.recommend(4000, 1) == 4000
+
+
+def test_recommends_a_ladder_step_above_p99_with_headroom():
+    sizer = RouteSizer()
+    _warm(sizer, 1000)
+    max_tokens = sizer.recommend(4000, 1)
+    assert max_tokens in token_sizing.MAX_TOKENS_LADDER
+    assert 1000 * token_sizing.HEADROOM < max_tokens < 4000
+
+
+def test_scales_with_size_hint_and_never_exceeds_the_ceiling():
+    sizer = RouteSizer()
+    _warm(sizer, 200, size_hint=10)  # 20 tokens per ingredient line
+    assert sizer.recommend(2000, 5) == 192
+    assert sizer.recommend(2000, 100) == 2000
+
+
+def test_truncation_is_logged_and_reverts_to_the_ceiling(caplog):
+    with patch.dict(token_sizing._sizers, clear=True):
+        sizer = token_sizing.get_sizer("t.trunc")
+        _warm(sizer, 100)
+        truncations = token_sizing.openai_truncations.value(route="t.trunc")
+        with caplog.at_level(logging.WARNING, logger="app.services.token_sizing"):
+            token_sizing.record_completion("t.trunc", 192, "length", max_tokens=192)
+        assert "openai truncation route=t.trunc max_tokens=192" in caplog.text
+        assert token_sizing.choose_max_tokens("t.trunc", 2000) == 2000
+        for _ in range(token_sizing.TRUNCATION_COOLDOWN):
+            token_sizing.record_completion("t.trunc", 100, "stop")
+        assert token_sizing.choose_max_tokens("t.trunc", 2000) < 2000
+        assert token_sizing.openai_truncations.value(route="t.trunc") - truncations == 1
+
+
+def test_observe_mode_never_changes_max_tokens():
+    with patch.dict(token_sizing._sizers, clear=True), patch.object(token_sizing, "SIZING_MODE", "observe"):
+        _warm(token_sizing.get_sizer("t.observe"), 10)
+        assert token_sizing.choose_max_tokens("t.observe", 2000) == 2000
+        assert token_sizing.max_tokens_recommended.value(route="t.observe") < 2000
+
+
+class _Client:
+    def __init__(self, finish_reason="stop"):
+        self.sent = []
+        self.finish_reason = finish_reason
+
+    async def post(self, url, headers=None, json=None):
+        self.sent.append(json)
+        return httpx.Response(
+            200,
+            json={"model": openai_client.MODEL, "usage": {"prompt_tokens": 40, "completion_tokens": 60},
+                  "choices": [{"message": {"content": "[]"}, "finish_reason": self.finish_reason}]},
+            request=httpx.Request("POST", url),
+        )
+
+
+@pytest.fixture
+def clean_sizers():
+    with patch.dict(token_sizing._sizers, clear=True):
+        yield
+
+
+def test_completion_calls_are_recorded_and_sized(clean_sizers):
+    client = _Client()
+    with patch.object(openai_client, "get_async_client", return_value=client):
+        for i in range(token_sizing.MIN_SAMPLES):
+            asyncio.run(openai_client.call_chat_completion("sys", f"line {i}", max_tokens=2000, route="t.sized", size_hint=3))
+        asyncio.run(openai_client.call_chat_completion("sys", "one more", max_tokens=2000, route="t.sized", size_hint=3))
+    assert client.sent[0]["max_tokens"] == 2000
+    # 60 tokens for 3 lines = 20/line; 3 lines * 20 * 1.3 + 32 -> 128
+    assert client.sent[-1]["max_tokens"] == 128
+
+
+def test_truncated_answers_are_not_cached(clean_sizers):
+    from app.services.cache_backends import MemoryCacheBackend
+
+    cache = MemoryCacheBackend(max_bytes=1 << 20)
+    route = "recipes.parse_ingredients"
+    truncations = token_sizing.openai_truncations.value(route=route)
+    with patch.object(openai_client, "get_async_client", return_value=_Client(finish_reason="length")), \
+         patch.object(openai_client, "_completion_cache", cache):
+        asyncio.run(openai_client.call_chat_completion("sys", "1 cup rice", max_tokens=2000, route=route, size_hint=1))
+    assert len(cache) == 0
+    assert token_sizing.openai_truncations.value(route=route) - truncations == 1
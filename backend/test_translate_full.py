@@ -0,0 +1,110 @@
+"""POST /recipes/translate-full: packed single call for small requests,
+bounded concurrent per-recipe calls otherwise, originals kept on failure.
+"""
+import asyncio
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi import Request
+from fastapi.testclient import TestClient
+
+from app.routers import recipes
+from app.services import translation_memory
+from app.services.auth import get_current_user
+from app.services.cache_backends import MemoryCacheBackend
+
+
+@pytest.fixture
+def api():
+    from app.main import app
+
+    def override(request: Request):
+        request.state.user_id = "translate-full-user"
+        return MagicMock(id="translate-full-user")
+
+    app.dependency_overrides[get_current_user] = override
+    with patch.object(translation_memory, "_memory", MemoryCacheBackend(max_bytes=1 << 20)):
+        try:
+            yield TestClient(app)
+        finally:
+            app.dependency_overrides.pop(get_current_user, None)
+
+
+def _recipes(n):
+    return [{"name": f"Dish {i}", "difficulty": "Easy", "servings": 2} for i in range(n)]
+
+
+def _fields_of(user_prompt):
+    return json.loads(user_prompt[user_prompt.index("\n") + 1:])
+
+
+def test_large_requests_fan_out_with_bounded_concurrency(api):
+    running = peak = 0
+
+    async def fake_call(system, user, **kwargs):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        fields = _fields_of(user)
+        if fields["name"] == "Dish 3":
+            raise RuntimeError("upstream 500")
+        return json.dumps({k: v.upper() for k, v in fields.items()})
+
+    with patch.object(recipes, "call_chat_completion", fake_call), \
+         patch.object(recipes, "TRANSLATE_FULL_PACKED_MAX_CHARS", 0):
+        response = api.post("/recipes/translate-full", json={"recipes": _recipes(10), "language": "es"})
+
+    body = response.json()
+    assert peak == recipes.TRANSLATE_FULL_CONCURRENCY
+    assert body[0] == {"name": "DISH 0", "difficulty": "EASY", "servings": 2}
+    assert body[3] == {"name": "Dish 3", "difficulty": "Easy", "servings": 2}
+    assert [r["name"] for r in body] == [f"DISH {i}" if i != 3 else "Dish 3" for i in range(10)]
+
+
+def test_small_requests_use_one_packed_call_and_retry_what_it_missed(api):
+    singles = []
+
+    async def fake_messages(messages, **kwargs):
+        assert kwargs["response_format"] == {"type": "json_object"}
+        packed = _fields_of(messages[1]["content"])
+        assert list(packed) == ["0", "2"]  # recipe 1 has nothing to translate
+        return json.dumps({"0": {"name": "Plato 0", "difficulty": "Fácil", "servings": 99}, "2": "garbled"})
+
+    async def fake_call(system, user, **kwargs):
+        singles.append(_fields_of(user))
+        return json.dumps({"name": "Plato 2", "difficulty": "Fácil"})
+
+    payload = [{"name": "Dish 0", "difficulty": "Easy", "servings": 2}, {"servings": 4}, {"name": "Dish 2", "difficulty": "Easy"}]
+    with patch.object(recipes, "call_chat_messages", fake_messages), patch.object(recipes, "call_chat_completion", fake_call):
+        body = api.post("/recipes/translate-full", json={"recipes": payload, "language": "es"}).json()
+
+    assert body == [
+        {"name": "Plato 0", "difficulty": "Fácil", "servings": 2},
+        {"servings": 4},
+        {"name": "Plato 2", "difficulty": "Fácil"},
+    ]
+    assert singles == [{"name": "Dish 2", "difficulty": "Easy"}]
+
+
+def test_failed_packed_call_falls_back_to_per_recipe_calls(api):
+    async def broken(messages, **kwargs):
+        raise RuntimeError("timeout")
+
+    async def fake_call(system, user, **kwargs):
+        return json.dumps({k: v + "!" for k, v in _fields_of(user).items()})
+
+    with patch.object(recipes, "call_chat_messages", broken), patch.object(recipes, "call_chat_completion", fake_call):
+        body = api.post("/recipes/translate-full", json={"recipes": _recipes(2), "language": "fr"}).json()
+    assert [r["name"] for r in body] == ["Dish 0!", "Dish 1!"]
+
+
+def test_non_object_translation_keeps_the_original(api):
+    async def fake_call(system, user, **kwargs):
+        return '["not", "an", "object"]'
+
+    with patch.object(recipes, "call_chat_completion", fake_call):
+        body = api.post("/recipes/translate-full", json={"recipes": _recipes(1), "language": "de"}).json()
+    assert body == _recipes(1)
@@ -0,0 +1,103 @@
+"""Translation memory (app/services/translation_memory.py): translate-names and
+translate-full only send strings that haven't been translated before.
+"""
+import asyncio
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi import Request
+from fastapi.testclient import TestClient
+
+from app.routers import recipes
+from app.services import translation_memory
+from app.services.auth import get_current_user
+from app.services.cache_backends import MemoryCacheBackend
+
+
+@pytest.fixture
+def api():
+    from app.main import app
+
+    def override(request: Request):
+        request.state.user_id = "translation-memory-user"
+        return MagicMock(id="translation-memory-user")
+
+    app.dependency_overrides[get_current_user] = override
+    with patch.object(translation_memory, "_memory", MemoryCacheBackend(max_bytes=1 << 20)):
+        try:
+            yield TestClient(app)
+        finally:
+            app.dependency_overrides.pop(get_current_user, None)
+
+
+class _NamesModel:
+    """Answers the translate-names prompt with "<name> (<lang>)" per line."""
+
+    def __init__(self, drop_last=False):
+        self.sent = []
+        self.drop_last = drop_last
+
+    async def __call__(self, system, user, **kwargs):
+        lang = system.split("Translate recipe names to ")[1].split(".")[0]
+        names = [line.split(". ", 1)[1] for line in user.splitlines()[1:]]
+        self.sent.append(names)
+        if self.drop_last:
+            names = names[:-1]
+        return "\n".join(f"{i + 1}. {n} ({lang})" for i, n in enumerate(names))
+
+
+def test_names_only_send_what_memory_lacks(api):
+    model = _NamesModel()
+    with patch.object(recipes, "call_chat_completion", model):
+        first = api.post("/recipes/translate-names", json={"names": ["Soup", "Stew"], "language": "es"}).json()
+        second = api.post("/recipes/translate-names", json={"names": ["Stew", "Pie", "Soup"], "language": "es-MX"}).json()
+        french = api.post("/recipes/translate-names", json={"names": ["Soup"], "language": "fr"}).json()
+        again = api.post("/recipes/translate-names", json={"names": ["Soup", "Pie"], "language": "es"}).json()
+
+    assert first == ["Soup (Spanish)", "Stew (Spanish)"]
+    assert second == ["Stew (Spanish)", "Pie (Spanish)", "Soup (Spanish)"]
+    assert french == ["Soup (French)"]
+    assert again == ["Soup (Spanish)", "Pie (Spanish)"]
+    assert model.sent == [["Soup", "Stew"], ["Pie"], ["Soup"]]
+
+
+def test_misaligned_name_answers_are_not_remembered(api):
+    stores_before = translation_memory.translation_memory_stores.value()
+    with patch.object(recipes, "call_chat_completion", _NamesModel(drop_last=True)):
+        assert api.post("/recipes/translate-names", json={"names": ["Soup", "Stew"], "language": "de"}).json() == ["Soup (German)", "Stew"]
+    assert asyncio.run(translation_memory.lookup_many(["Soup", "Stew"], "German")) == {}
+    assert translation_memory.translation_memory_stores.value() == stores_before
+
+
+def test_full_recipes_reuse_fields_and_individual_lines(api):
+    sent = []
+
+    async def model(system, user, **kwargs):
+        fields = json.loads(user[user.index("\n") + 1:])
+        sent.append(fields)
+        return json.dumps({k: v.upper() for k, v in fields.items()})
+
+    first = {"name": "Rice Bowl", "difficulty": "Easy", "ingredients": "1 cup rice\n\n  1 tbsp olive oil", "servings": 2}
+    second = {"name": "Bean Bowl", "difficulty": "Easy", "ingredients": "1 can beans\n  1 tbsp olive oil"}
+    with patch.object(recipes, "call_chat_completion", model):
+        api.post("/recipes/translate-full", json={"recipes": [first], "language": "es"})
+        body = api.post("/recipes/translate-full", json={"recipes": [second], "language": "es"}).json()
+
+    assert sent[1] == {"name": "Bean Bowl", "ingredients.0": "1 can beans"}
+    assert body == [{"name": "BEAN BOWL", "difficulty": "EASY", "ingredients": "1 CAN BEANS\n  1 TBSP OLIVE OIL"}]
+
+
+def test_fully_remembered_request_makes_no_call_and_counts_hits(api):
+    async def model(system, user, **kwargs):
+        return json.dumps({k: f"[{v}]" for k, v in json.loads(user[user.index("\n") + 1:]).items()})
+
+    recipe = {"name": "Kale Salad", "budget_tip": "Buy in bulk"}
+    with patch.object(recipes, "call_chat_completion", model):
+        api.post("/recipes/translate-full", json={"recipes": [recipe], "language": "ja"})
+
+    hits_before = translation_memory.translation_memory_lookups.value(result="hit")
+    with patch.object(recipes, "call_chat_completion", side_effect=AssertionError("should be remembered")):
+        body = api.post("/recipes/translate-full", json={"recipes": [recipe], "language": "ja"}).json()
+    assert body == [{"name": "[Kale Salad]", "budget_tip": "[Buy in bulk]"}]
+    assert translation_memory.translation_memory_lookups.value(result="hit") - hits_before == 2